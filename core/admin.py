@@ -1,11 +1,21 @@
 # core/admin.py
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
 from .models import (
     Mitglied, Fahrzeug, Abrollbehaelter, Anhaenger, Zusatzstelle, Einsatzmittel,
     MeldendeStelle, Brandumfang, Brandausbreitung, Brandgut, Brandobjekt,
     Loeschwasserentnahmestelle, Schadensereignis, PersonenrettungTyp,
-    Sicherheitswache, Fehlalarm, Sonstige, Ortsfeuerwehr, Einsatzstichwort, MailEmpfaenger
+    Sicherheitswache, Fehlalarm, Sonstige, Ortsfeuerwehr, Einsatzstichwort, MailEmpfaenger,
+    Auftrag, MailAusgang, Nummernkreis, Sammelauftrag,
 )
+from .services import auftraege
+from pdfs.export import zip_response
 
 # WICHTIG: Keine pauschale for-Schleife mehr – sonst doppelte Registrierung!
 
@@ -106,7 +116,112 @@ class EinsatzstichwortAdmin(admin.ModelAdmin):
     list_filter = ("kategorie", "aktiv")
     search_fields = ("code", "bezeichnung")
 
+class MailEmpfaengerForm(forms.ModelForm):
+    kategorien = forms.MultipleChoiceField(
+        choices=Einsatzstichwort.KATEGORIE_CHOICES,
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+        help_text=MailEmpfaenger._meta.get_field("kategorien").help_text,
+    )
+
+    class Meta:
+        model = MailEmpfaenger
+        fields = ("email", "aktiv", "kategorien")
+
 @admin.register(MailEmpfaenger)
 class MailEmpfaengerAdmin(admin.ModelAdmin):
-    list_display = ("email", "aktiv")
+    form = MailEmpfaengerForm
+    list_display = ("email", "aktiv", "kategorien_anzeige")
+    list_filter = ("aktiv",)
     search_fields = ("email",)
+
+    def kategorien_anzeige(self, obj):
+        labels = dict(Einsatzstichwort.KATEGORIE_CHOICES)
+        return ", ".join(labels.get(k, k) for k in obj.kategorien) or "alle Berichte"
+    kategorien_anzeige.short_description = "Kategorien"
+
+@admin.register(Auftrag)
+class AuftragAdmin(admin.ModelAdmin):
+    list_display = ("aufgabe", "objekt_typ", "objekt_id", "status", "versuche", "naechster_versuch", "erstellt_am")
+    list_filter = ("status", "aufgabe", "sammelauftrag")
+    raw_id_fields = ("sammelauftrag",)
+    search_fields = ("aufgabe", "letzter_fehler")
+    readonly_fields = ("erstellt_am", "aktualisiert_am", "erledigt_am")
+    actions = ["action_requeue"]
+
+    @admin.action(description="Erneut einplanen")
+    def action_requeue(self, request, queryset):
+        n = queryset.exclude(status=Auftrag.STATUS_LAEUFT).update(
+            status=Auftrag.STATUS_OFFEN, versuche=0, naechster_versuch=timezone.now(),
+        )
+        messages.success(request, f"{n} Auftrag/Aufträge erneut eingeplant.")
+
+
+@admin.register(Nummernkreis)
+class NummernkreisAdmin(admin.ModelAdmin):
+    list_display = ("kreis", "jahr", "letzte_nummer")
+    list_filter = ("kreis",)
+
+@admin.register(Sammelauftrag)
+class SammelauftragAdmin(admin.ModelAdmin):
+    list_display = ("bezeichnung", "erstellt_von", "erstellt_am", "fortschritt_link")
+    readonly_fields = ("bezeichnung", "erstellt_von", "erstellt_am")
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom = [
+            path(
+                "<int:pk>/fortschritt/",
+                self.admin_site.admin_view(self.fortschritt_view),
+                name="core_sammelauftrag_fortschritt",
+            ),
+            path(
+                "<int:pk>/export.zip",
+                self.admin_site.admin_view(self.zip_view),
+                name="core_sammelauftrag_zip",
+            ),
+        ]
+        return custom + urls
+
+    def fortschritt_link(self, obj):
+        return format_html('<a href="{}">Fortschritt</a>', reverse("admin:core_sammelauftrag_fortschritt", args=[obj.pk]))
+    fortschritt_link.short_description = "Fortschritt"
+
+    def fortschritt_view(self, request, pk: int, *args, **kwargs):
+        gruppe = get_object_or_404(Sammelauftrag, pk=pk)
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": gruppe.bezeichnung,
+            "gruppe": gruppe,
+            "stand": auftraege.fortschritt(gruppe),
+            "fehler": gruppe.auftraege.filter(status=Auftrag.STATUS_FEHLER).order_by("pk")[:50],
+            "zip_export": auftraege.ist_zip_export(gruppe),
+        }
+        return TemplateResponse(request, "admin/core/sammelauftrag/fortschritt.html", context)
+
+    def zip_view(self, request, pk: int, *args, **kwargs):
+        # Download eines großen ZIP-Exports, nachdem der auftrag_worker die PDFs vorgerendert hat
+        gruppe = get_object_or_404(Sammelauftrag, pk=pk)
+        export = auftraege.zip_export(gruppe)
+        if export is None:
+            raise Http404("Kein ZIP-Export.")
+        return zip_response(*export)
+
+@admin.register(MailAusgang)
+class MailAusgangAdmin(admin.ModelAdmin):
+    list_display = ("betreff", "objekt_typ", "objekt_id", "status", "versuche", "naechster_versuch", "gesendet_am")
+    list_filter = ("status",)
+    search_fields = ("betreff", "letzter_fehler")
+    readonly_fields = ("erstellt_am", "aktualisiert_am", "gesendet_am")
+    actions = ["action_requeue"]
+
+    @admin.action(description="Erneut einplanen")
+    def action_requeue(self, request, queryset):
+        n = queryset.exclude(status__in=[MailAusgang.STATUS_LAEUFT, MailAusgang.STATUS_SAMMELN]).update(
+            status=MailAusgang.STATUS_OFFEN, versuche=0, naechster_versuch=timezone.now(),
+        )
+        messages.success(request, f"{n} Mail(s) erneut eingeplant.")
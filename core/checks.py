@@ -0,0 +1,27 @@
+# core/checks.py
+from django.core.checks import Info, Tags, Warning, register
+from django.db import connections
+
+from core.utils.sqlite import effective_pragmas, mismatches
+
+
+@register(Tags.database)
+def check_sqlite_pragmas(app_configs, databases=None, **kwargs):
+    """
+    Läuft bei `manage.py check --database default` (und vor migrate): meldet die effektiven
+    PRAGMAs und warnt, wenn SQLite einen Wert nicht übernommen hat (z. B. kein WAL auf einem
+    Netzlaufwerk, mmap_size über dem Kompilierlimit).
+    """
+    messages = []
+    for alias in databases or []:
+        if connections[alias].vendor != "sqlite":
+            continue
+        for name, (wanted, actual) in mismatches(alias).items():
+            messages.append(Warning(
+                f"SQLite '{alias}': PRAGMA {name} ist {actual!r}, konfiguriert ist {wanted!r}.",
+                hint="SQLITE_PRAGMAS in den Einstellungen bzw. Dateisystem der Datenbank prüfen.",
+                id="core.W001",
+            ))
+        effective = ", ".join(f"{k}={v}" for k, v in effective_pragmas(alias).items())
+        messages.append(Info(f"SQLite '{alias}': {effective}", id="core.I001"))
+    return messages
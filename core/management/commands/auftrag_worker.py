@@ -0,0 +1,105 @@
+# core/management/commands/auftrag_worker.py
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+
+from core.services import auftraege
+from core.utils.pool import default_processes, process_pool, terminate
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Arbeitet Hintergrundaufträge (PDF rendern, Mail senden) in einem Prozess-Pool ab. Läuft dauerhaft."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=None, help="Anzahl Pool-Prozesse (Standard: PDF_POOL_PROCESSES)")
+        parser.add_argument("--poll", type=float, default=2.0, help="Abfrageintervall in Sekunden")
+        parser.add_argument("--once", action="store_true", help="nur fällige Aufträge abarbeiten und dann beenden")
+        parser.add_argument(
+            "--requeue-interval", type=float, default=60.0,
+            help="Sekunden zwischen zwei Prüfungen auf hängende Aufträge",
+        )
+        parser.add_argument(
+            "--grace", type=float, default=30.0,
+            help="Beim Beenden (SIGTERM/Strg+C) so lange auf laufende Aufträge warten, danach freigeben",
+        )
+
+    def handle(self, *args, **opts):
+        processes = opts["processes"] or default_processes()
+        poll = opts["poll"]
+
+        # systemctl restart (update.sh) sendet SIGTERM: nichts mehr beanspruchen, Laufendes abschließen
+        # oder freigeben – sonst bleiben Aufträge bis zum nächsten requeue_stale "läuft"
+        stop = threading.Event()
+
+        def _stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        self.stdout.write(f"Auftrag-Worker gestartet ({processes} Prozesse).")
+
+        running = {}
+        next_requeue = 0.0
+        pool = process_pool(processes, detach_signals=True)
+        try:
+            while not stop.is_set():
+                if time.monotonic() >= next_requeue:
+                    # eigene laufende Aufträge auffrischen, damit nur wirklich verwaiste zurückgesetzt werden
+                    auftraege.heartbeat(running.values())
+                    stale = auftraege.requeue_stale()
+                    if stale:
+                        self.stdout.write(self.style.WARNING(f"{stale} hängende Aufträge zurückgesetzt."))
+                    next_requeue = time.monotonic() + opts["requeue_interval"]
+
+                free = processes - len(running)
+                if free > 0:
+                    for pk in auftraege.claim_due(free):
+                        try:
+                            running[pool.submit(auftraege.run, pk)] = pk
+                        except BrokenProcessPool as exc:
+                            # Pool unbrauchbar: Auftrag freigeben, Prozess beenden (systemd startet neu)
+                            auftraege.mark_failed(pk, f"{type(exc).__name__}: {exc}")
+                            raise
+
+                if not running:
+                    if opts["once"]:
+                        break
+                    stop.wait(poll)
+                    continue
+
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                self._collect(done, running)
+
+            if running:
+                self.stdout.write(f"Beende – warte bis zu {opts['grace']:g} s auf {len(running)} laufende Aufträge …")
+                done, _ = wait(running, timeout=opts["grace"])
+                self._collect(done, running, stopping=True)
+        finally:
+            if running:
+                released = auftraege.release(running.values())
+                self.stdout.write(self.style.WARNING(f"{released} unterbrochene Aufträge wieder freigegeben."))
+                terminate(pool)
+            else:
+                pool.shutdown(wait=True)
+
+    def _collect(self, done, running: dict, stopping: bool = False) -> None:
+        for future in done:
+            exc = future.exception()
+            if exc is not None and stopping:
+                # beim Beenden abgebrochen – bleibt in `running` und wird freigegeben
+                continue
+            pk = running.pop(future)
+            if exc is not None:
+                # z. B. abgestürzter Pool-Prozess – Auftrag regulär wiederholen
+                logger.error("Auftrag %s: Pool-Fehler %r", pk, exc)
+                auftraege.mark_failed(pk, f"{type(exc).__name__}: {exc}")
+            else:
+                self.stdout.write(f"Auftrag {pk}: {future.result()}")
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from core.services.mail import send_mail_with_pdf_to_active, send_mail_text
-from core.services.mail import get_active_recipients
+from core.services.mail import get_all_active_recipients
 
 class Command(BaseCommand):
     help = "Sendet eine Test-E-Mail an alle aktiven Empfänger"
@@ -10,7 +10,7 @@ class Command(BaseCommand):
         parser.add_argument("--with-pdf", action="store_true", help="kleinen PDF-Anhang mitsenden")
 
     def handle(self, *args, **opts):
-        recipients = get_active_recipients()
+        recipients = get_all_active_recipients()
         if not recipients:
             self.stdout.write(self.style.WARNING("Keine aktiven Empfänger definiert."))
             return
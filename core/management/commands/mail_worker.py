@@ -0,0 +1,127 @@
+# core/management/commands/mail_worker.py
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.services import postausgang
+
+logger = logging.getLogger(__name__)
+
+
+def _send_batch(pks):
+    # Läuft im Thread: eigene DB-Verbindung danach schließen
+    try:
+        return postausgang.send_batch(pks)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Versendet Mails aus dem Postausgang (Backoff bei Fehlern, begrenzte Parallelität). Läuft dauerhaft."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=None,
+            help="parallele SMTP-Verbindungen (Standard: MAIL_WORKER_THREADS)",
+        )
+        parser.add_argument("--batch", type=int, default=20, help="Mails je SMTP-Verbindung")
+        parser.add_argument("--poll", type=float, default=5.0, help="Abfrageintervall in Sekunden")
+        parser.add_argument("--once", action="store_true", help="nur fällige Mails versenden und dann beenden")
+        parser.add_argument(
+            "--sammel-sofort", action="store_true",
+            help="vorgemerkte Berichte einmalig beim Start zu Sammelmails bündeln (Sammelfenster ignorieren)",
+        )
+        parser.add_argument(
+            "--requeue-interval", type=float, default=60.0,
+            help="Sekunden zwischen zwei Prüfungen auf hängende Mails",
+        )
+        parser.add_argument(
+            "--grace", type=float, default=30.0,
+            help="Beim Beenden (SIGTERM/Strg+C) so lange auf laufende Pakete warten, danach freigeben",
+        )
+
+    def handle(self, *args, **opts):
+        threads = max(opts["threads"] or getattr(settings, "MAIL_WORKER_THREADS", 2), 1)
+        batch = max(opts["batch"], 1)
+        poll = opts["poll"]
+
+        # systemctl restart (update.sh) sendet SIGTERM: nichts mehr beanspruchen, laufende Pakete
+        # abschließen oder freigeben – sonst bleiben Mails bis zum nächsten requeue_stale "wird gesendet"
+        stop = threading.Event()
+
+        def _stop(signum, frame):
+            stop.set()
+
+        previous = {sig: signal.signal(sig, _stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+        self.stdout.write(f"Mail-Worker gestartet ({threads} Verbindungen, je {batch} Mails).")
+
+        running = {}
+        next_requeue = 0.0
+        sammel_sofort = opts["sammel_sofort"]
+        pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="mail")
+        try:
+            while not stop.is_set():
+                if time.monotonic() >= next_requeue:
+                    postausgang.heartbeat([pk for pks in running.values() for pk in pks])
+                    stale = postausgang.requeue_stale()
+                    if stale:
+                        self.stdout.write(self.style.WARNING(f"{stale} hängende Mails zurückgesetzt."))
+                    next_requeue = time.monotonic() + opts["requeue_interval"]
+
+                try:
+                    digests = postausgang.flush_digests(force=sammel_sofort)
+                except Exception:
+                    # z. B. Archiv nicht schreibbar – Einzelmails weiter versenden, nächste Runde erneut
+                    logger.exception("Postausgang: Sammelmails konnten nicht gebildet werden")
+                else:
+                    if digests:
+                        self.stdout.write(f"Postausgang: {digests} Sammelmail(s) eingereiht")
+                # --sammel-sofort bündelt einmalig beim Start, danach gilt wieder das Sammelfenster
+                sammel_sofort = False
+
+                # nie mehr als `threads` Pakete gleichzeitig – begrenzt Last auf dem Mailserver
+                while len(running) < threads:
+                    pks = postausgang.claim_due(batch)
+                    if not pks:
+                        break
+                    running[pool.submit(_send_batch, pks)] = pks
+
+                if not running:
+                    if opts["once"]:
+                        break
+                    stop.wait(poll)
+                    continue
+
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                self._collect(done, running)
+
+            if running:
+                self.stdout.write(f"Beende – warte bis zu {opts['grace']:g} s auf {len(running)} laufende Pakete …")
+                done, _ = wait(running, timeout=opts["grace"])
+                self._collect(done, running)
+        finally:
+            if running:
+                released = postausgang.release([pk for pks in running.values() for pk in pks])
+                self.stdout.write(self.style.WARNING(f"{released} nicht versendete Mails wieder freigegeben."))
+            pool.shutdown(wait=False, cancel_futures=True)
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    def _collect(self, done, running: dict) -> None:
+        for future in done:
+            pks = running.pop(future)
+            exc = future.exception()
+            if exc is not None:
+                # Paket abgebrochen (z. B. DB-Fehler): noch nicht versendete Mails regulär wiederholen
+                logger.error("Postausgang: Paket abgebrochen: %r", exc)
+                postausgang.fail_running(pks, f"{type(exc).__name__}: {exc}")
+                continue
+            counts = future.result()
+            self.stdout.write(f"Postausgang: {counts['gesendet']} gesendet, {counts['fehler']} fehlgeschlagen")
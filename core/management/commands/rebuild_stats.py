@@ -0,0 +1,45 @@
+# core/management/commands/rebuild_stats.py
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import statistik
+
+MODELS = {"einsatz": "einsatz.Einsatz", "dienst": "dienst.Dienst"}
+
+
+class Command(BaseCommand):
+    help = "Berechnet die gespeicherten Kennzahlen (stat_*) von Einsätzen/Diensten neu oder prüft sie (--check)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=sorted(MODELS), help="nur Einsätze oder nur Dienste")
+        parser.add_argument("--year", type=int, help="nur dieses Jahr")
+        parser.add_argument("--check", action="store_true", help="nur prüfen, nichts schreiben (Exit-Code 1 bei Abweichungen)")
+        parser.add_argument("--batch", type=int, default=500, help="Berichte je Schreibvorgang")
+
+    def handle(self, *args, **opts):
+        names = [opts["only"]] if opts["only"] else sorted(MODELS)
+        total_diffs = 0
+        for name in names:
+            model = apps.get_model(MODELS[name])
+            qs = model._default_manager.all()
+            if opts["year"]:
+                qs = qs.filter(year=opts["year"])
+
+            if opts["check"]:
+                diffs = statistik.verify(model, qs)
+                for pk, feld, gespeichert, berechnet in diffs[:50]:
+                    self.stdout.write(f"{name} #{pk}: {feld} gespeichert={gespeichert} berechnet={berechnet}")
+                if len(diffs) > 50:
+                    self.stdout.write(f"… und {len(diffs) - 50} weitere")
+                total_diffs += len(diffs)
+                self.stdout.write(f"{name}: {len(diffs)} Abweichung(en)")
+                continue
+
+            pks = list(qs.order_by("pk").values_list("pk", flat=True))
+            batch = max(opts["batch"], 1)
+            for i in range(0, len(pks), batch):
+                statistik.refresh(model, pks[i:i + batch])
+            self.stdout.write(self.style.SUCCESS(f"{name}: Kennzahlen für {len(pks)} Berichte neu berechnet"))
+
+        if opts["check"] and total_diffs:
+            raise CommandError(f"{total_diffs} Abweichung(en) – 'manage.py rebuild_stats' ausführen.")
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_mitglied_jugendfeuerwehr'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Auftrag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aufgabe', models.CharField(max_length=120)),
+                ('objekt_typ', models.CharField(max_length=80)),
+                ('objekt_id', models.PositiveBigIntegerField()),
+                ('status', models.CharField(choices=[('offen', 'Offen'), ('laeuft', 'Läuft'), ('erledigt', 'Erledigt'), ('fehler', 'Fehlgeschlagen')], default='offen', max_length=12)),
+                ('versuche', models.PositiveIntegerField(default=0)),
+                ('max_versuche', models.PositiveIntegerField(default=5)),
+                ('naechster_versuch', models.DateTimeField(default=django.utils.timezone.now)),
+                ('letzter_fehler', models.TextField(blank=True)),
+                ('erstellt_am', models.DateTimeField(auto_now_add=True)),
+                ('aktualisiert_am', models.DateTimeField(auto_now=True)),
+                ('erledigt_am', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Hintergrundauftrag',
+                'verbose_name_plural': 'Hintergrundaufträge',
+                'ordering': ['-erstellt_am'],
+                'indexes': [models.Index(fields=['status', 'naechster_versuch'], name='auftrag_faellig_idx'), models.Index(fields=['objekt_typ', 'objekt_id'], name='auftrag_objekt_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_auftrag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailAusgang',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('betreff', models.CharField(max_length=255)),
+                ('text', models.TextField(blank=True)),
+                ('absender', models.CharField(blank=True, max_length=255)),
+                ('an', models.JSONField(blank=True, default=list)),
+                ('bcc', models.JSONField(blank=True, default=list)),
+                ('anhang_pfad', models.CharField(blank=True, max_length=255)),
+                ('anhang_name', models.CharField(blank=True, max_length=160)),
+                ('anhang_mime', models.CharField(blank=True, default='application/pdf', max_length=80)),
+                ('objekt_typ', models.CharField(blank=True, max_length=80)),
+                ('objekt_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('offen', 'Offen'), ('laeuft', 'Wird gesendet'), ('gesendet', 'Gesendet'), ('fehler', 'Fehlgeschlagen')], default='offen', max_length=12)),
+                ('versuche', models.PositiveIntegerField(default=0)),
+                ('max_versuche', models.PositiveIntegerField(default=8)),
+                ('naechster_versuch', models.DateTimeField(default=django.utils.timezone.now)),
+                ('letzter_fehler', models.TextField(blank=True)),
+                ('erstellt_am', models.DateTimeField(auto_now_add=True)),
+                ('aktualisiert_am', models.DateTimeField(auto_now=True)),
+                ('gesendet_am', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Mail im Postausgang',
+                'verbose_name_plural': 'Postausgang',
+                'ordering': ['-erstellt_am'],
+                'indexes': [models.Index(fields=['status', 'naechster_versuch'], name='mailausgang_faellig_idx'), models.Index(fields=['objekt_typ', 'objekt_id'], name='mailausgang_objekt_idx')],
+            },
+        ),
+    ]
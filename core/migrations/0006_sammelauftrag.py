@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_mailausgang'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sammelauftrag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bezeichnung', models.CharField(max_length=160)),
+                ('erstellt_am', models.DateTimeField(auto_now_add=True)),
+                ('erstellt_von', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sammelauftrag',
+                'verbose_name_plural': 'Sammelaufträge',
+                'ordering': ['-erstellt_am'],
+            },
+        ),
+        migrations.AddField(
+            model_name='auftrag',
+            name='sammelauftrag',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='auftraege', to='core.sammelauftrag'),
+        ),
+    ]
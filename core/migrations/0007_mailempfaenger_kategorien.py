@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_sammelauftrag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailempfaenger',
+            name='kategorien',
+            field=models.JSONField(blank=True, default=list, help_text='Nur Einsatzberichte dieser Kategorien erhalten; leer = alle Berichte.'),
+        ),
+    ]
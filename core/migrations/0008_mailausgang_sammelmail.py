@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_mailempfaenger_kategorien'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailausgang',
+            name='kurztext',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='mailausgang',
+            name='sammelmails',
+            field=models.ManyToManyField(blank=True, related_name='bestandteile', to='core.mailausgang'),
+        ),
+        migrations.AlterField(
+            model_name='mailausgang',
+            name='status',
+            field=models.CharField(choices=[('offen', 'Offen'), ('laeuft', 'Wird gesendet'), ('gesendet', 'Gesendet'), ('fehler', 'Fehlgeschlagen'), ('sammeln', 'Für Sammelmail vorgemerkt'), ('gebuendelt', 'In Sammelmail')], default='offen', max_length=12),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_mailausgang_sammelmail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Nummernkreis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kreis', models.CharField(max_length=80)),
+                ('jahr', models.PositiveIntegerField()),
+                ('letzte_nummer', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Nummernkreis',
+                'verbose_name_plural': 'Nummernkreise',
+                'constraints': [models.UniqueConstraint(fields=('kreis', 'jahr'), name='unique_nummernkreis_kreis_jahr')],
+            },
+        ),
+    ]
@@ -1,5 +1,20 @@
 # core/models.py
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from core.services.statistik import live_annotations
+
+class BerichtQuerySet(models.QuerySet):
+    """QuerySet für Einsatz und Dienst."""
+
+    def with_stats(self):
+        """Kennzahlen (live_*) per Unterabfrage in derselben Query – z. B. für eine Listenseite."""
+        return self.annotate(**live_annotations(self.model))
+
+    def touch(self):
+        """updated_at setzen, ohne save() – z. B. wenn sich nur Teilnahme-/Fahrzeugzeilen geändert haben."""
+        return self.update(updated_at=timezone.now())
 
 class Mitglied(models.Model):
     name = models.CharField(max_length=80)
@@ -129,6 +144,140 @@ class Einsatzstichwort(models.Model):
 class MailEmpfaenger(models.Model):
     email = models.EmailField(unique=True)
     aktiv = models.BooleanField(default=True)
+    # Einsatzstichwort-Kategorien (z. B. ["brand"]); leer = alle Berichte (Einsätze und Dienste)
+    kategorien = models.JSONField(
+        default=list, blank=True,
+        help_text="Nur Einsatzberichte dieser Kategorien erhalten; leer = alle Berichte.",
+    )
 
     def __str__(self):
         return self.email
+
+class Nummernkreis(models.Model):
+    """Zähler für laufende Nummern je Modell und Jahr (z. B. Einsatz 012/2025), siehe core.services.nummernkreis."""
+    kreis = models.CharField(max_length=80)  # Model-Label, z. B. "einsatz.einsatz"
+    jahr = models.PositiveIntegerField()
+    letzte_nummer = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Nummernkreis"
+        verbose_name_plural = "Nummernkreise"
+        constraints = [models.UniqueConstraint(fields=["kreis", "jahr"], name="unique_nummernkreis_kreis_jahr")]
+
+    def __str__(self):
+        return f"{self.kreis} {self.jahr}: {self.letzte_nummer}"
+
+class Sammelauftrag(models.Model):
+    """Gruppe von Hintergrundaufträgen aus einer Admin-Sammelaktion (Fortschrittsanzeige)."""
+    bezeichnung = models.CharField(max_length=160)
+    erstellt_von = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    erstellt_am = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Sammelauftrag"
+        verbose_name_plural = "Sammelaufträge"
+        ordering = ["-erstellt_am"]
+
+    def __str__(self):
+        return f"{self.bezeichnung} ({self.erstellt_am:%d.%m.%Y %H:%M})"
+
+class Auftrag(models.Model):
+    """
+    Hintergrundauftrag für einen Datensatz (z. B. PDF rendern + Mail für neuen Einsatz).
+    Abgearbeitet von `manage.py auftrag_worker`; `aufgabe` ist der Importpfad der Funktion,
+    die mit dem Datensatz aufgerufen wird.
+    """
+    STATUS_OFFEN = "offen"
+    STATUS_LAEUFT = "laeuft"
+    STATUS_ERLEDIGT = "erledigt"
+    STATUS_FEHLER = "fehler"
+    STATUS_CHOICES = [
+        (STATUS_OFFEN, "Offen"),
+        (STATUS_LAEUFT, "Läuft"),
+        (STATUS_ERLEDIGT, "Erledigt"),
+        (STATUS_FEHLER, "Fehlgeschlagen"),
+    ]
+    aufgabe = models.CharField(max_length=120)
+    objekt_typ = models.CharField(max_length=80)  # Model-Label, z. B. "einsatz.einsatz"
+    objekt_id = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_OFFEN)
+    versuche = models.PositiveIntegerField(default=0)
+    max_versuche = models.PositiveIntegerField(default=5)
+    naechster_versuch = models.DateTimeField(default=timezone.now)
+    letzter_fehler = models.TextField(blank=True)
+    erstellt_am = models.DateTimeField(auto_now_add=True)
+    aktualisiert_am = models.DateTimeField(auto_now=True)
+    erledigt_am = models.DateTimeField(null=True, blank=True)
+    sammelauftrag = models.ForeignKey(
+        Sammelauftrag, on_delete=models.CASCADE, null=True, blank=True, related_name="auftraege"
+    )
+
+    class Meta:
+        verbose_name = "Hintergrundauftrag"
+        verbose_name_plural = "Hintergrundaufträge"
+        ordering = ["-erstellt_am"]
+        indexes = [
+            models.Index(fields=["status", "naechster_versuch"], name="auftrag_faellig_idx"),
+            models.Index(fields=["objekt_typ", "objekt_id"], name="auftrag_objekt_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.aufgabe} ({self.objekt_typ} #{self.objekt_id}): {self.get_status_display()}"
+
+class MailAusgang(models.Model):
+    """
+    Postausgang: eine zu versendende Mail (ggf. mit PDF-Anhang aus dem Archiv).
+    Abgearbeitet von `manage.py mail_worker`; bei Fehlern Wiederholung mit exponentiellem Backoff.
+    """
+    STATUS_OFFEN = "offen"
+    STATUS_LAEUFT = "laeuft"
+    STATUS_GESENDET = "gesendet"
+    STATUS_FEHLER = "fehler"
+    STATUS_SAMMELN = "sammeln"        # wartet auf die nächste Sammelmail (MAIL_SAMMEL_KATEGORIEN)
+    STATUS_GEBUENDELT = "gebuendelt"  # in Sammelmail(s) aufgegangen, siehe `sammelmails`
+    STATUS_CHOICES = [
+        (STATUS_OFFEN, "Offen"),
+        (STATUS_LAEUFT, "Wird gesendet"),
+        (STATUS_GESENDET, "Gesendet"),
+        (STATUS_FEHLER, "Fehlgeschlagen"),
+        (STATUS_SAMMELN, "Für Sammelmail vorgemerkt"),
+        (STATUS_GEBUENDELT, "In Sammelmail"),
+    ]
+    betreff = models.CharField(max_length=255)
+    text = models.TextField(blank=True)
+    absender = models.CharField(max_length=255, blank=True)  # leer = DEFAULT_FROM_EMAIL
+    an = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    # Anhang als Verweis (relativ zu PDF_ARCHIVE_DIR), nicht als Bytes in der Datenbank
+    anhang_pfad = models.CharField(max_length=255, blank=True)
+    anhang_name = models.CharField(max_length=160, blank=True)
+    anhang_mime = models.CharField(max_length=80, blank=True, default="application/pdf")
+    # Bezug (optional), z. B. "einsatz.einsatz" / 12
+    objekt_typ = models.CharField(max_length=80, blank=True)
+    objekt_id = models.PositiveBigIntegerField(null=True, blank=True)
+    # Zeile für die Übersichtstabelle der Sammelmail, z. B. "Einsatz 012/2025 · 14.10.2025 22:13 · THL 1"
+    kurztext = models.CharField(max_length=255, blank=True)
+    sammelmails = models.ManyToManyField("self", symmetrical=False, blank=True, related_name="bestandteile")
+
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_OFFEN)
+    versuche = models.PositiveIntegerField(default=0)
+    max_versuche = models.PositiveIntegerField(default=8)
+    naechster_versuch = models.DateTimeField(default=timezone.now)
+    letzter_fehler = models.TextField(blank=True)
+    erstellt_am = models.DateTimeField(auto_now_add=True)
+    aktualisiert_am = models.DateTimeField(auto_now=True)
+    gesendet_am = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Mail im Postausgang"
+        verbose_name_plural = "Postausgang"
+        ordering = ["-erstellt_am"]
+        indexes = [
+            models.Index(fields=["status", "naechster_versuch"], name="mailausgang_faellig_idx"),
+            models.Index(fields=["objekt_typ", "objekt_id"], name="mailausgang_objekt_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.betreff} ({self.get_status_display()})"
@@ -0,0 +1,232 @@
+# core/services/auftraege.py
+"""
+Dauerhafte Hintergrundaufträge (Tabelle core.Auftrag).
+
+Der Request legt den Auftrag in derselben Transaktion wie den Datensatz an und leitet
+sofort weiter; `manage.py auftrag_worker` holt fällige Aufträge ab und führt sie in einem
+Prozess-Pool aus. Fehlschläge werden mit exponentiellem Backoff wiederholt.
+"""
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Auftrag, MailAusgang, Sammelauftrag
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(aufgabe: str, obj, max_versuche: int | None = None) -> Auftrag:
+    """Plant `aufgabe(obj)` ein. Innerhalb von transaction.atomic() aufrufen, dann ist der Auftrag mit dem Datensatz committet."""
+    return Auftrag.objects.create(
+        aufgabe=aufgabe,
+        objekt_typ=obj._meta.label_lower,
+        objekt_id=obj.pk,
+        max_versuche=max_versuche or getattr(settings, "AUFTRAG_MAX_VERSUCHE", 5),
+    )
+
+
+def enqueue_many(aufgabe: str, queryset, bezeichnung: str, user=None) -> Sammelauftrag:
+    """
+    Plant `aufgabe(obj)` für alle Datensätze des QuerySets als ein Sammelauftrag ein
+    (z. B. Admin-Sammelaktion). Es werden nur Primärschlüssel gelesen – der Request bleibt kurz.
+    """
+    label = queryset.model._meta.label_lower
+    max_versuche = getattr(settings, "AUFTRAG_MAX_VERSUCHE", 5)
+    with transaction.atomic():
+        gruppe = Sammelauftrag.objects.create(
+            bezeichnung=bezeichnung,
+            erstellt_von=user if user is not None and user.is_authenticated else None,
+        )
+        Auftrag.objects.bulk_create(
+            [
+                Auftrag(aufgabe=aufgabe, objekt_typ=label, objekt_id=pk, max_versuche=max_versuche, sammelauftrag=gruppe)
+                for pk in queryset.order_by().values_list("pk", flat=True).iterator()
+            ],
+            batch_size=500,
+        )
+    return gruppe
+
+
+def fortschritt(gruppe: Sammelauftrag) -> dict:
+    """
+    Zähler für die Fortschrittsanzeige: Aufträge je Status und – für Mail-Aufgaben – die
+    daraus entstandenen Mails im Postausgang.
+    """
+    counts = gruppe.auftraege.aggregate(
+        gesamt=Count("pk"),
+        offen=Count("pk", filter=Q(status=Auftrag.STATUS_OFFEN)),
+        laeuft=Count("pk", filter=Q(status=Auftrag.STATUS_LAEUFT)),
+        erledigt=Count("pk", filter=Q(status=Auftrag.STATUS_ERLEDIGT)),
+        fehler=Count("pk", filter=Q(status=Auftrag.STATUS_FEHLER)),
+        wiederholt=Count("pk", filter=Q(status=Auftrag.STATUS_OFFEN, versuche__gt=0)),
+    )
+    first = gruppe.auftraege.only("objekt_typ").first()
+    mails = MailAusgang.objects.none()
+    if first is not None:
+        mails = MailAusgang.objects.filter(
+            objekt_typ=first.objekt_typ,
+            objekt_id__in=gruppe.auftraege.values("objekt_id"),
+            erstellt_am__gte=gruppe.erstellt_am,
+        )
+    # vorgemerkte/gebündelte Mails zählen nach dem Stand ihrer Sammelmail(s)
+    sammelmails = MailAusgang.objects.filter(bestandteile=OuterRef("pk"))
+    mails = mails.annotate(
+        sammel_wartet=Exists(sammelmails.filter(status__in=[MailAusgang.STATUS_OFFEN, MailAusgang.STATUS_LAEUFT])),
+        sammel_fehler=Exists(sammelmails.filter(status=MailAusgang.STATUS_FEHLER)),
+    )
+    gebuendelt = Q(status=MailAusgang.STATUS_GEBUENDELT)
+    counts["mails"] = mails.aggregate(
+        gesamt=Count("pk"),
+        wartend=Count("pk", filter=Q(status__in=[
+            MailAusgang.STATUS_OFFEN, MailAusgang.STATUS_LAEUFT, MailAusgang.STATUS_SAMMELN,
+        ]) | (gebuendelt & Q(sammel_wartet=True))),
+        gesendet=Count("pk", filter=Q(status=MailAusgang.STATUS_GESENDET)
+                       | (gebuendelt & Q(sammel_wartet=False, sammel_fehler=False))),
+        fehler=Count("pk", filter=Q(status=MailAusgang.STATUS_FEHLER)
+                     | (gebuendelt & Q(sammel_wartet=False, sammel_fehler=True))),
+    )
+    counts["fertig"] = counts["offen"] + counts["laeuft"] + counts["mails"]["wartend"] == 0
+    counts["prozent"] = round(100 * (counts["erledigt"] + counts["fehler"]) / counts["gesamt"]) if counts["gesamt"] else 100
+    return counts
+
+
+# Sammelaufträge, die PDFs für einen großen ZIP-Export vorab rendern: aufgabe → (ZIP-Datenstrom, Dateiname)
+ZIP_EXPORTE = {
+    "einsatz.services.cache_einsatz_pdf": ("einsatz.services.iter_einsatz_zip", "Einsaetze.zip"),
+    "dienst.services.cache_dienst_pdf": ("dienst.services.iter_dienst_zip", "Dienste.zip"),
+}
+
+
+def ist_zip_export(gruppe: Sammelauftrag) -> bool:
+    return gruppe.auftraege.filter(aufgabe__in=ZIP_EXPORTE).exists()
+
+
+def zip_export(gruppe: Sammelauftrag):
+    """
+    (ZIP-Datenstrom, Dateiname) über die erfolgreich vorgerenderten Datensätze eines ZIP-Export-
+    Sammelauftrags – die PDFs kommen aus dem PDF-Cache. None, wenn die Gruppe kein Export ist.
+    """
+    first = gruppe.auftraege.filter(aufgabe__in=ZIP_EXPORTE).only("aufgabe", "objekt_typ").first()
+    if first is None:
+        return None
+    stream, filename = ZIP_EXPORTE[first.aufgabe]
+    model = apps.get_model(first.objekt_typ)
+    queryset = model._default_manager.filter(
+        pk__in=gruppe.auftraege.filter(status=Auftrag.STATUS_ERLEDIGT).values("objekt_id")
+    )
+    return import_string(stream)(queryset), filename
+
+
+def latest_for(obj) -> Auftrag | None:
+    return (
+        Auftrag.objects.filter(objekt_typ=obj._meta.label_lower, objekt_id=obj.pk)
+        .order_by("-erstellt_am", "-pk")
+        .first()
+    )
+
+
+def backoff(versuche: int, base: int | None = None) -> timedelta:
+    if base is None:
+        base = int(getattr(settings, "AUFTRAG_RETRY_BASIS_SEKUNDEN", 60))
+    return timedelta(seconds=min(base * 2 ** max(versuche - 1, 0), 3600))
+
+
+def claim_due(limit: int) -> list[int]:
+    """Markiert bis zu `limit` fällige Aufträge als laufend (bedingtes UPDATE → auch mit mehreren Workern sicher)."""
+    claimed = []
+    candidates = (
+        Auftrag.objects.filter(status=Auftrag.STATUS_OFFEN, naechster_versuch__lte=timezone.now())
+        .order_by("naechster_versuch", "pk")
+        .values_list("pk", flat=True)[:limit]
+    )
+    for pk in candidates:
+        updated = Auftrag.objects.filter(pk=pk, status=Auftrag.STATUS_OFFEN).update(
+            status=Auftrag.STATUS_LAEUFT,
+            versuche=F("versuche") + 1,
+            aktualisiert_am=timezone.now(),
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale(older_than: timedelta = timedelta(minutes=15)) -> int:
+    """Setzt Aufträge zurück, die ein abgestürzter Worker als laufend hinterlassen hat."""
+    return Auftrag.objects.filter(
+        status=Auftrag.STATUS_LAEUFT,
+        aktualisiert_am__lt=timezone.now() - older_than,
+    ).update(status=Auftrag.STATUS_OFFEN, naechster_versuch=timezone.now())
+
+
+def heartbeat(pks) -> int:
+    """Laufende Aufträge als lebendig markieren – lange Aufträge gelten so nicht als hängend."""
+    if not pks:
+        return 0
+    return Auftrag.objects.filter(pk__in=list(pks), status=Auftrag.STATUS_LAEUFT).update(
+        aktualisiert_am=timezone.now()
+    )
+
+
+def release(pks) -> int:
+    """
+    Beanspruchte, aber nicht beendete Aufträge sofort wieder freigeben (Worker wird beendet).
+    Der abgebrochene Lauf zählt nicht als Versuch.
+    """
+    if not pks:
+        return 0
+    return Auftrag.objects.filter(pk__in=list(pks), status=Auftrag.STATUS_LAEUFT).update(
+        status=Auftrag.STATUS_OFFEN,
+        versuche=Greatest(F("versuche") - 1, 0),
+        naechster_versuch=timezone.now(),
+        aktualisiert_am=timezone.now(),
+    )
+
+
+def mark_failed(pk: int, error: str) -> None:
+    auftrag = Auftrag.objects.get(pk=pk)
+    auftrag.letzter_fehler = error[:4000]
+    if auftrag.versuche >= auftrag.max_versuche:
+        auftrag.status = Auftrag.STATUS_FEHLER
+    else:
+        auftrag.status = Auftrag.STATUS_OFFEN
+        auftrag.naechster_versuch = timezone.now() + backoff(auftrag.versuche)
+    auftrag.save(update_fields=["status", "letzter_fehler", "naechster_versuch", "aktualisiert_am"])
+
+
+def run(pk: int) -> str:
+    """Führt einen (bereits beanspruchten) Auftrag aus. Läuft im Pool-Prozess."""
+    auftrag = Auftrag.objects.get(pk=pk)
+    try:
+        model = apps.get_model(auftrag.objekt_typ)
+        obj = model._default_manager.get(pk=auftrag.objekt_id)
+    except (LookupError, ObjectDoesNotExist) as exc:
+        # Datensatz gelöscht oder Typ unbekannt – Wiederholen ist zwecklos
+        Auftrag.objects.filter(pk=pk).update(
+            status=Auftrag.STATUS_FEHLER,
+            letzter_fehler=f"{type(exc).__name__}: {exc}",
+            aktualisiert_am=timezone.now(),
+        )
+        return Auftrag.STATUS_FEHLER
+
+    try:
+        import_string(auftrag.aufgabe)(obj)
+    except Exception as exc:
+        logger.exception("Auftrag %s (%s) fehlgeschlagen, Versuch %s", pk, auftrag.aufgabe, auftrag.versuche)
+        mark_failed(pk, f"{type(exc).__name__}: {exc}")
+        return Auftrag.STATUS_FEHLER
+
+    Auftrag.objects.filter(pk=pk).update(
+        status=Auftrag.STATUS_ERLEDIGT,
+        erledigt_am=timezone.now(),
+        aktualisiert_am=timezone.now(),
+        letzter_fehler="",
+    )
+    return Auftrag.STATUS_ERLEDIGT
@@ -0,0 +1,79 @@
+# core/services/jahresuebersicht.py
+"""
+Jahresübersicht je Berichtsart für Startseite und Jahres-Tabs der Listen:
+{jahr: {"anzahl", "erste_seq", "letzte_seq"}} plus Zeitpunkt der letzten Änderung.
+
+Statt bei jedem Seitenaufruf COUNT und DISTINCT year zu rechnen, liegt die Übersicht im
+gemeinsamen Django-Cache (CACHES, dateibasiert – alle gunicorn-Worker sehen denselben Stand).
+Der Schlüssel enthält eine Version; Anlegen/Löschen eines Berichts setzt eine neue Version
+(Signale der Apps), die alten Einträge laufen über das Timeout aus.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
+
+from core.utils.cache import invalidate_now_and_on_commit
+
+MODELS = {"einsatz": "einsatz.Einsatz", "dienst": "dienst.Dienst"}
+
+
+def _timeout() -> int:
+    return getattr(settings, "JAHRESUEBERSICHT_CACHE_SEKUNDEN", 3600)
+
+
+def _version_key(art: str) -> str:
+    return f"jahresuebersicht:{art}:version"
+
+
+def version(art: str) -> int:
+    """Aktuelle Version (Zeitstempel in ns der letzten Änderung bzw. des ersten Aufbaus)."""
+    v = cache.get(_version_key(art))
+    if v is None:
+        v = time.time_ns()
+        # add(): ein parallel neu gesetzter Stand gewinnt
+        if not cache.add(_version_key(art), v, None):
+            v = cache.get(_version_key(art), v)
+    return v
+
+
+def _bump(art: str) -> None:
+    cache.set(_version_key(art), time.time_ns(), None)
+
+
+def invalidate(art: str) -> None:
+    invalidate_now_and_on_commit(lambda: _bump(art))
+
+
+def build(art: str) -> dict:
+    model = apps.get_model(MODELS[art])
+    rows = (
+        model._default_manager.exclude(year=None).order_by()
+        .values("year").annotate(anzahl=Count("pk"), erste_seq=Min("seq"), letzte_seq=Max("seq"))
+    )
+    return {
+        row["year"]: {"anzahl": row["anzahl"], "erste_seq": row["erste_seq"], "letzte_seq": row["letzte_seq"]}
+        for row in rows
+    }
+
+
+def snapshot(art: str) -> dict:
+    """{"jahre": {jahr: {...}}, "geaendert": Unix-Zeit der letzten Änderung} aus dem Cache."""
+    v = version(art)
+    key = f"jahresuebersicht:{art}:{v}"
+    data = cache.get(key)
+    if data is None:
+        data = {"jahre": build(art), "geaendert": v / 1e9}
+        cache.set(key, data, _timeout())
+    return data
+
+
+def years(art: str) -> list[int]:
+    """Jahre mit Berichten, neueste zuerst (für die Jahres-Tabs)."""
+    return sorted(snapshot(art)["jahre"], reverse=True)
+
+
+def count(art: str, jahr: int) -> int:
+    return snapshot(art)["jahre"].get(jahr, {}).get("anzahl", 0)
@@ -1,14 +1,62 @@
 # core/services/mail.py
+import logging
+from dataclasses import dataclass
 from typing import Iterable, Optional, Sequence
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import EmailMessage, get_connection
-from core.models import MailEmpfaenger
+from core.models import Einsatzstichwort, MailEmpfaenger
 from core.utils.files import safe_filename
 
-def get_active_recipients() -> list[str]:
-    return list(MailEmpfaenger.objects.filter(aktiv=True).values_list("email", flat=True))
+logger = logging.getLogger(__name__)
 
-def send_mail_text(
+# Empfängertabelle im gemeinsamen Django-Cache (CACHES), invalidiert per Signal (core.signals)
+RECIPIENTS_CACHE_KEY = "mail:empfaenger:v1"
+ALLE = "*"  # Schlüssel für wirklich alle aktiven Empfänger (Testmail, "gibt es überhaupt welche?")
+
+
+def build_recipient_table() -> dict[str, list[str]]:
+    """
+    Vorberechnete Zuordnung Kategorie → Empfänger:
+      ""   – Empfänger ohne Einschränkung (Dienste, Einsätze ohne Kategorie)
+      "<k>" – Empfänger ohne Einschränkung plus alle, die Kategorie k abonniert haben
+      "*"  – alle aktiven Empfänger
+    """
+    kategorien = [k for k, _ in Einsatzstichwort.KATEGORIE_CHOICES]
+    table = {"": [], ALLE: [], **{k: [] for k in kategorien}}
+    rows = MailEmpfaenger.objects.filter(aktiv=True).order_by("email").values_list("email", "kategorien")
+    for email, abo in rows:
+        table[ALLE].append(email)
+        if not abo:
+            table[""].append(email)
+        for k in abo or kategorien:
+            table.setdefault(k, []).append(email)
+    return table
+
+
+def invalidate_recipients() -> None:
+    cache.delete(RECIPIENTS_CACHE_KEY)
+
+
+def _recipient_table() -> dict[str, list[str]]:
+    table = cache.get(RECIPIENTS_CACHE_KEY)
+    if table is None:
+        table = build_recipient_table()
+        cache.set(RECIPIENTS_CACHE_KEY, table, getattr(settings, "MAIL_EMPFAENGER_CACHE_SEKUNDEN", 3600))
+    return table
+
+
+def get_active_recipients(kategorie: Optional[str] = None) -> list[str]:
+    """Aktive Empfänger für einen Bericht; `kategorie` = Einsatzstichwort.kategorie (None bei Diensten)."""
+    table = _recipient_table()
+    return list(table.get(kategorie or "", table[""]))
+
+
+def get_all_active_recipients() -> list[str]:
+    return list(_recipient_table()[ALLE])
+
+def build_message(
     subject: str,
     body_text: str,
     to: Optional[Sequence[str]] = None,
@@ -16,42 +64,99 @@ def send_mail_text(
     from_email: Optional[str] = None,
     attachments: Optional[Iterable[tuple[str, bytes, str]]] = None,
     headers: Optional[dict] = None,
-    fail_silently: bool = False,
-) -> int:
-    from_email = from_email or settings.DEFAULT_FROM_EMAIL
-    conn = get_connection(timeout=getattr(settings, "EMAIL_TIMEOUT", None))
+) -> EmailMessage:
     msg = EmailMessage(
         subject=f"{getattr(settings,'EMAIL_SUBJECT_PREFIX','')}{subject}".strip(),
         body=body_text,
-        from_email=from_email,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
         to=list(to or []),
         bcc=list(bcc or []),
         headers=headers or {},
-        connection=conn,
     )
     if attachments:
         for name, data, mime in attachments:
             msg.attach(safe_filename(name), data, mime)
-    return msg.send(fail_silently=fail_silently)
+    return msg
 
-def send_mail_with_pdf_to_active(
+def build_pdf_message_to_active(
     subject: str,
     body_text: str,
     pdf_bytes: bytes,
     filename: str,
     use_bcc: bool = True,
-    fail_silently: bool = False,
-) -> int:
-    recipients = get_active_recipients()
+    recipients: Optional[Sequence[str]] = None,
+) -> Optional[EmailMessage]:
+    """Mail mit PDF an alle aktiven Empfänger – oder None, wenn es keine gibt."""
+    recipients = get_active_recipients() if recipients is None else list(recipients)
     if not recipients:
-        return 0
-    to = recipients if not use_bcc else []
-    bcc = recipients if use_bcc else []
-    return send_mail_text(
+        return None
+    return build_message(
         subject=subject,
         body_text=body_text,
-        to=to,
-        bcc=bcc,
+        to=recipients if not use_bcc else [],
+        bcc=recipients if use_bcc else [],
         attachments=[(filename, pdf_bytes, "application/pdf")],
-        fail_silently=fail_silently,
     )
+
+def send_mail_text(
+    subject: str,
+    body_text: str,
+    to: Optional[Sequence[str]] = None,
+    bcc: Optional[Sequence[str]] = None,
+    from_email: Optional[str] = None,
+    attachments: Optional[Iterable[tuple[str, bytes, str]]] = None,
+    headers: Optional[dict] = None,
+    fail_silently: bool = False,
+) -> int:
+    msg = build_message(subject, body_text, to=to, bcc=bcc, from_email=from_email,
+                        attachments=attachments, headers=headers)
+    msg.connection = get_connection(timeout=getattr(settings, "EMAIL_TIMEOUT", None))
+    return msg.send(fail_silently=fail_silently)
+
+def send_mail_with_pdf_to_active(
+    subject: str,
+    body_text: str,
+    pdf_bytes: bytes,
+    filename: str,
+    use_bcc: bool = True,
+    fail_silently: bool = False,
+) -> int:
+    msg = build_pdf_message_to_active(subject, body_text, pdf_bytes, filename, use_bcc=use_bcc)
+    if msg is None:
+        return 0
+    msg.connection = get_connection(timeout=getattr(settings, "EMAIL_TIMEOUT", None))
+    return msg.send(fail_silently=fail_silently)
+
+@dataclass
+class SendResult:
+    """Ergebnis je Nachricht aus send_messages_batch()."""
+    message: EmailMessage
+    ok: bool
+    recipients: int = 0
+    error: str = ""
+
+def send_messages_batch(messages: Iterable[EmailMessage]) -> list[SendResult]:
+    """
+    Sendet viele Nachrichten über eine einzige SMTP-Verbindung (ein TLS-Handshake, ein Login).
+    Fehler einzelner Nachrichten werden im Ergebnis vermerkt, der Rest wird trotzdem versendet.
+    Nur ein Fehler beim Verbindungsaufbau wird durchgereicht (dann wurde nichts versendet).
+    """
+    results = []
+    conn = get_connection(timeout=getattr(settings, "EMAIL_TIMEOUT", None))
+    with conn:
+        for msg in messages:
+            msg.connection = conn
+            try:
+                sent = conn.send_messages([msg])
+            except Exception as exc:
+                logger.warning("Mail '%s' fehlgeschlagen: %s", msg.subject, exc)
+                results.append(SendResult(msg, ok=False, error=f"{type(exc).__name__}: {exc}"))
+                # Verbindung kann nach einem Fehler unbrauchbar sein – für den Rest neu aufbauen
+                conn.close()
+                try:
+                    conn.open()
+                except Exception:
+                    pass  # nächste Nachricht versucht es erneut und landet ggf. ebenfalls als Fehler im Ergebnis
+                continue
+            results.append(SendResult(msg, ok=bool(sent), recipients=len(msg.recipients()) if sent else 0))
+    return results
@@ -0,0 +1,95 @@
+# core/services/nummernkreis.py
+"""
+Laufende Nummern je Modell und Jahr über eine Zählertabelle (core.Nummernkreis).
+
+Statt MAX(seq) zu lesen (select_for_update ist unter SQLite wirkungslos, zwei gleichzeitige
+Speichervorgänge bekamen dieselbe Nummer) wird der Zähler mit einem einzigen
+`UPDATE … SET letzte_nummer = letzte_nummer + 1` hochgezählt. Das UPDATE sperrt die Zeile bzw.
+unter SQLite die Datenbank bis zum Ende der Transaktion; der Datensatz wird in derselben
+Transaktion gespeichert. Rollback nimmt damit auch die Nummer zurück – es entstehen keine Lücken.
+"""
+import logging
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.models import Nummernkreis
+
+logger = logging.getLogger(__name__)
+
+
+def _kreis(model) -> str:
+    return model._meta.label_lower
+
+
+def _max_seq(model, jahr: int) -> int:
+    return model._default_manager.filter(year=jahr).aggregate(m=Max("seq"))["m"] or 0
+
+
+def next_number(model, jahr: int) -> int:
+    """Nächste Nummer für (Modell, Jahr). Innerhalb der Transaktion aufrufen, die den Datensatz speichert."""
+    kreis = _kreis(model)
+    with transaction.atomic():
+        updated = Nummernkreis.objects.filter(kreis=kreis, jahr=jahr).update(letzte_nummer=F("letzte_nummer") + 1)
+        if not updated:
+            # Erster Datensatz des Jahres: Zähler einmalig aus dem Bestand übernehmen
+            try:
+                with transaction.atomic():
+                    Nummernkreis.objects.create(kreis=kreis, jahr=jahr, letzte_nummer=_max_seq(model, jahr) + 1)
+            except IntegrityError:
+                # parallel angelegt – dann regulär hochzählen
+                Nummernkreis.objects.filter(kreis=kreis, jahr=jahr).update(letzte_nummer=F("letzte_nummer") + 1)
+        return Nummernkreis.objects.filter(kreis=kreis, jahr=jahr).values_list("letzte_nummer", flat=True).get()
+
+
+def resync(model, jahr: int) -> None:
+    """Zieht den Zähler auf den Bestand nach (z. B. nach Import von Datensätzen an der Tabelle vorbei)."""
+    Nummernkreis.objects.filter(kreis=_kreis(model), jahr=jahr).update(
+        letzte_nummer=Greatest(F("letzte_nummer"), _max_seq(model, jahr))
+    )
+
+
+def assign_running_number(instance) -> None:
+    """Setzt year (aus start_dt, sonst aktuelles Jahr) und seq, sofern noch nicht vergeben."""
+    if getattr(instance, "year", None) and getattr(instance, "seq", None):
+        return
+    start = getattr(instance, "start_dt", None)
+    instance.year = start.year if start else timezone.now().year
+    instance.seq = next_number(type(instance), instance.year)
+
+
+def _is_locked(exc: OperationalError) -> bool:
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+def save_with_number(instance, clean: bool = True, versuche: int = 5) -> None:
+    """
+    Vergibt die Nummer, prüft (full_clean, ohne die Eindeutigkeit von year/seq – die sichert
+    die Datenbank) und speichert den Datensatz (Savepoint). Bei Konflikten wird wiederholt:
+      - IntegrityError auf (year, seq): Zähler lag hinter dem Bestand → nachziehen, neue Nummer
+      - "database is locked" (nur außerhalb einer äußeren Transaktion wiederholbar)
+    """
+    for versuch in range(1, versuche + 1):
+        try:
+            with transaction.atomic():
+                assign_running_number(instance)
+                if clean:
+                    instance.full_clean(validate_constraints=False)
+                instance.save(force_insert=True)
+            return
+        except IntegrityError:
+            if versuch == versuche:
+                raise
+            logger.warning("Nummernkreis %s/%s: Konflikt bei seq %s, Zähler wird nachgezogen",
+                           _kreis(type(instance)), instance.year, instance.seq)
+            resync(type(instance), instance.year)
+        except OperationalError as exc:
+            if versuch == versuche or connection.in_atomic_block or not _is_locked(exc):
+                raise
+            time.sleep(0.05 * 2 ** versuch)
+        instance.pk = None
+        instance._state.adding = True
+        instance.seq = None
@@ -0,0 +1,323 @@
+# core/services/postausgang.py
+"""
+Dauerhafter Postausgang (Tabelle core.MailAusgang).
+
+Mails werden nur eingereiht; `manage.py mail_worker` versendet sie in Paketen über je eine
+SMTP-Verbindung (core.services.mail.send_messages_batch). Fehlschläge – z. B. ein kurz nicht
+erreichbarer Mailserver – werden mit exponentiellem Backoff wiederholt, bis max_versuche
+erreicht ist. PDF-Anhänge werden als Pfad ins Archiv (PDF_ARCHIVE_DIR) gespeichert.
+
+Sammelmail: Berichte der Kategorien in MAIL_SAMMEL_KATEGORIEN werden nur vorgemerkt und
+nach MAIL_SAMMEL_FENSTER_MINUTEN zu einer Mail je Empfänger zusammengefasst – ein
+gemeinsames PDF plus Übersichtstabelle (`flush_digests`, aufgerufen vom mail_worker).
+"""
+import io
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch, prefetch_related_objects
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.models import MailAusgang
+from core.services.auftraege import backoff
+from core.services.mail import build_message, get_active_recipients, send_messages_batch
+from core.utils.files import atomic_write
+from pdfs.merge import check_pdf_file, concat_pdf_files
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(
+    subject: str,
+    body_text: str,
+    to: Optional[Sequence[str]] = None,
+    bcc: Optional[Sequence[str]] = None,
+    anhang_pfad: str = "",
+    anhang_name: str = "",
+    obj=None,
+    kurztext: str = "",
+    status: str = MailAusgang.STATUS_OFFEN,
+) -> MailAusgang:
+    """Reiht eine Mail ein. `anhang_pfad` ist relativ zu PDF_ARCHIVE_DIR."""
+    return MailAusgang.objects.create(
+        betreff=subject,
+        text=body_text,
+        an=list(to or []),
+        bcc=list(bcc or []),
+        anhang_pfad=anhang_pfad,
+        anhang_name=anhang_name,
+        objekt_typ=obj._meta.label_lower if obj is not None else "",
+        objekt_id=obj.pk if obj is not None else None,
+        kurztext=kurztext[:255],
+        status=status,
+        max_versuche=getattr(settings, "MAIL_MAX_VERSUCHE", 8),
+    )
+
+
+def enqueue_pdf_to_active(
+    subject: str,
+    body_text: str,
+    anhang_pfad: str,
+    filename: str,
+    obj=None,
+    kategorie: Optional[str] = None,
+    kurztext: str = "",
+) -> Optional[MailAusgang]:
+    """
+    Mail mit Archiv-PDF an die aktiven Empfänger (BCC) einreihen – bei Einsätzen nur an die,
+    die die Stichwort-`kategorie` erhalten. None, wenn es keine Empfänger gibt.
+    Kategorien im Sammelmodus werden nur für die nächste Sammelmail vorgemerkt.
+    """
+    recipients = get_active_recipients(kategorie)
+    if not recipients:
+        return None
+    return enqueue(
+        subject, body_text, bcc=recipients, anhang_pfad=anhang_pfad, anhang_name=filename, obj=obj,
+        kurztext=kurztext,
+        status=MailAusgang.STATUS_SAMMELN if is_digest_category(kategorie) else MailAusgang.STATUS_OFFEN,
+    )
+
+
+def is_digest_category(kategorie: Optional[str]) -> bool:
+    """Sammelmodus für die Kategorie? Dienstberichte (ohne Kategorie) laufen unter "dienst"."""
+    return (kategorie or "dienst") in getattr(settings, "MAIL_SAMMEL_KATEGORIEN", [])
+
+
+def _digest_text(items: list[MailAusgang]) -> str:
+    von = timezone.localtime(items[0].erstellt_am)
+    lines = [
+        f"Automatische Sammelmeldung: {len(items)} neue Bericht(e) seit {von:%d.%m.%Y %H:%M}.",
+        "",
+        "Nr. | Bericht",
+        "----+" + "-" * 60,
+    ]
+    for n, item in enumerate(items, 1):
+        lines.append(f"{n:>3} | {item.kurztext or item.betreff}")
+    lines += ["", "Die Berichte liegen in dieser Reihenfolge als ein gemeinsames PDF bei."]
+    return "\n".join(lines)
+
+
+def flush_digests(force: bool = False) -> int:
+    """
+    Bildet Sammelmails aus allen vorgemerkten Berichten, sobald der älteste länger als
+    MAIL_SAMMEL_FENSTER_MINUTEN wartet (force=True: sofort). Empfänger mit denselben Berichten
+    erhalten gemeinsam eine Mail (BCC), Anhang ist ein zusammengefügtes PDF aus dem Archiv.
+    Liefert die Anzahl neu eingereihter Sammelmails.
+    """
+    pending = MailAusgang.objects.filter(status=MailAusgang.STATUS_SAMMELN)
+    oldest = pending.order_by("erstellt_am").values_list("erstellt_am", flat=True).first()
+    if oldest is None:
+        return 0
+    window = timedelta(minutes=getattr(settings, "MAIL_SAMMEL_FENSTER_MINUTEN", 60))
+    now = timezone.now()
+    if not force and oldest > now - window:
+        return 0
+
+    archive_dir = Path(settings.PDF_ARCHIVE_DIR)
+    created = 0
+    with transaction.atomic():
+        items = []
+        for item in pending.order_by("erstellt_am", "pk"):
+            fehler = ""
+            if item.anhang_pfad:
+                path = archive_dir / item.anhang_pfad
+                # ein beschädigtes Archiv-PDF darf nicht die ganze Sammelmail (und den Worker) blockieren
+                fehler = check_pdf_file(path) if path.is_file() else "Anhang fehlt im Archiv"
+            if fehler:
+                item.status = MailAusgang.STATUS_FEHLER
+                item.letzter_fehler = f"Sammelmail: {fehler}"[:4000]
+                item.save(update_fields=["status", "letzter_fehler", "aktualisiert_am"])
+                logger.warning("Postausgang: Mail %s nicht gebündelt: %s", item.pk, fehler)
+                continue
+            items.append(item)
+
+        # Empfänger mit identischer Berichtsliste teilen sich eine Mail
+        per_recipient = defaultdict(list)
+        for item in items:
+            for email in dict.fromkeys([*item.an, *item.bcc]):
+                per_recipient[email].append(item)
+        groups = defaultdict(list)
+        for email, own in per_recipient.items():
+            groups[tuple(i.pk for i in own)].append(email)
+
+        by_pk = {item.pk: item for item in items}
+        for n, (pks, emails) in enumerate(groups.items(), 1):
+            bundle = [by_pk[pk] for pk in pks]
+            anhang_pfad = f"sammelmail/{now:%Y}/sammelmail-{now:%Y%m%d-%H%M%S}-{n}.pdf"
+            buf = io.BytesIO()
+            concat_pdf_files([str(archive_dir / i.anhang_pfad) for i in bundle if i.anhang_pfad], buf)
+            atomic_write(archive_dir / anhang_pfad, buf.getvalue())
+            digest = enqueue(
+                subject=f"Sammelmeldung: {len(bundle)} neue Bericht(e)",
+                body_text=_digest_text(bundle),
+                bcc=emails,
+                anhang_pfad=anhang_pfad,
+                anhang_name=f"Sammelmeldung_{timezone.localtime(now):%Y-%m-%d_%H%M}.pdf",
+            )
+            digest.bestandteile.add(*bundle)
+            created += 1
+
+        MailAusgang.objects.filter(pk__in=by_pk).update(
+            status=MailAusgang.STATUS_GEBUENDELT, aktualisiert_am=timezone.now(),
+        )
+    if created:
+        logger.info("Postausgang: %s Sammelmail(s) aus %s Berichten gebildet", created, len(items))
+    return created
+
+
+def latest_for(obj) -> MailAusgang | None:
+    item = (
+        MailAusgang.objects.filter(objekt_typ=obj._meta.label_lower, objekt_id=obj.pk)
+        .order_by("-erstellt_am", "-pk")
+        .first()
+    )
+    if item is not None and item.status == MailAusgang.STATUS_GEBUENDELT:
+        # Detailseite und stand() lesen die Sammelmails – einmal laden statt je Zugriff
+        prefetch_related_objects([item], Prefetch("sammelmails", queryset=MailAusgang.objects.order_by("pk")))
+    return item
+
+
+def stand(item: MailAusgang | None) -> tuple | None:
+    """Stand einer Mail für ETags – bei gebündelten Mails zählt auch der ihrer Sammelmail(s)."""
+    if item is None:
+        return None
+    sammel = ()
+    if item.status == MailAusgang.STATUS_GEBUENDELT:
+        sammel = tuple(sorted((m.pk, m.status, m.gesendet_am, m.aktualisiert_am) for m in item.sammelmails.all()))
+    return (item.pk, item.status, item.aktualisiert_am, item.gesendet_am, sammel)
+
+
+def claim_due(limit: int) -> list[int]:
+    """Markiert bis zu `limit` fällige Mails als "wird gesendet" (bedingtes UPDATE, mehrere Worker möglich)."""
+    claimed = []
+    candidates = (
+        MailAusgang.objects.filter(status=MailAusgang.STATUS_OFFEN, naechster_versuch__lte=timezone.now())
+        .order_by("naechster_versuch", "pk")
+        .values_list("pk", flat=True)[:limit]
+    )
+    for pk in candidates:
+        updated = MailAusgang.objects.filter(pk=pk, status=MailAusgang.STATUS_OFFEN).update(
+            status=MailAusgang.STATUS_LAEUFT,
+            versuche=F("versuche") + 1,
+            aktualisiert_am=timezone.now(),
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale(older_than: timedelta = timedelta(minutes=15)) -> int:
+    """Setzt Mails zurück, die ein abgestürzter Worker als "wird gesendet" hinterlassen hat."""
+    return MailAusgang.objects.filter(
+        status=MailAusgang.STATUS_LAEUFT,
+        aktualisiert_am__lt=timezone.now() - older_than,
+    ).update(status=MailAusgang.STATUS_OFFEN, naechster_versuch=timezone.now())
+
+
+def heartbeat(pks) -> int:
+    """Mails in laufenden Paketen als lebendig markieren – lange SMTP-Sitzungen gelten nicht als hängend."""
+    if not pks:
+        return 0
+    return MailAusgang.objects.filter(pk__in=list(pks), status=MailAusgang.STATUS_LAEUFT).update(
+        aktualisiert_am=timezone.now()
+    )
+
+
+def release(pks) -> int:
+    """Beanspruchte, noch nicht versendete Mails sofort wieder freigeben (Worker wird beendet)."""
+    if not pks:
+        return 0
+    return MailAusgang.objects.filter(pk__in=list(pks), status=MailAusgang.STATUS_LAEUFT).update(
+        status=MailAusgang.STATUS_OFFEN,
+        versuche=Greatest(F("versuche") - 1, 0),
+        naechster_versuch=timezone.now(),
+        aktualisiert_am=timezone.now(),
+    )
+
+
+def fail_running(pks, error: str) -> int:
+    """Mails eines abgebrochenen Pakets, die noch "wird gesendet" sind, regulär wiederholen."""
+    pending = list(
+        MailAusgang.objects.filter(pk__in=list(pks), status=MailAusgang.STATUS_LAEUFT).values_list("pk", flat=True)
+    )
+    for pk in pending:
+        mark_failed(pk, error)
+    return len(pending)
+
+
+def mark_failed(pk: int, error: str) -> None:
+    item = MailAusgang.objects.get(pk=pk)
+    item.letzter_fehler = error[:4000]
+    if item.versuche >= item.max_versuche:
+        item.status = MailAusgang.STATUS_FEHLER
+    else:
+        item.status = MailAusgang.STATUS_OFFEN
+        item.naechster_versuch = timezone.now() + backoff(
+            item.versuche, base=int(getattr(settings, "MAIL_RETRY_BASIS_SEKUNDEN", 60))
+        )
+    item.save(update_fields=["status", "letzter_fehler", "naechster_versuch", "aktualisiert_am"])
+
+
+def _build(item: MailAusgang):
+    attachments = None
+    if item.anhang_pfad:
+        data = (Path(settings.PDF_ARCHIVE_DIR) / item.anhang_pfad).read_bytes()
+        attachments = [(item.anhang_name or Path(item.anhang_pfad).name, data, item.anhang_mime)]
+    # EMAIL_SUBJECT_PREFIX ergänzt build_message erst beim Versand
+    return build_message(
+        subject=item.betreff,
+        body_text=item.text,
+        to=item.an,
+        bcc=item.bcc,
+        from_email=item.absender or None,
+        attachments=attachments,
+    )
+
+
+def send_batch(pks: Sequence[int]) -> dict:
+    """
+    Versendet die (bereits beanspruchten) Mails über eine SMTP-Verbindung.
+    Liefert Zähler {"gesendet": n, "fehler": m}.
+    """
+    counts = {"gesendet": 0, "fehler": 0}
+    items, messages = [], []
+    for item in MailAusgang.objects.filter(pk__in=pks).order_by("pk"):
+        try:
+            messages.append(_build(item))
+            items.append(item)
+        except OSError as exc:
+            # Anhang fehlt/unlesbar – ebenfalls wiederholen (z. B. Archiv-Volume kurz weg)
+            mark_failed(item.pk, f"Anhang: {type(exc).__name__}: {exc}")
+            counts["fehler"] += 1
+    if not messages:
+        return counts
+
+    try:
+        results = send_messages_batch(messages)
+    except Exception as exc:
+        # Verbindung kam nicht zustande – nichts wurde versendet
+        logger.warning("Postausgang: SMTP-Verbindung fehlgeschlagen: %s", exc)
+        for item in items:
+            mark_failed(item.pk, f"{type(exc).__name__}: {exc}")
+        counts["fehler"] += len(items)
+        return counts
+
+    for item, result in zip(items, results):
+        if result.ok:
+            MailAusgang.objects.filter(pk=item.pk).update(
+                status=MailAusgang.STATUS_GESENDET,
+                gesendet_am=timezone.now(),
+                aktualisiert_am=timezone.now(),
+                letzter_fehler="",
+            )
+            counts["gesendet"] += 1
+        else:
+            mark_failed(item.pk, result.error or "nicht versendet")
+            counts["fehler"] += 1
+    return counts
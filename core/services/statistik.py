@@ -0,0 +1,137 @@
+# core/services/statistik.py
+"""
+Gespeicherte Kennzahlen (Spalten stat_*) für Einsatz und Dienst.
+
+Teilnehmende (davon hauptamtlich), km und Fahrzeugstunden werden nicht mehr je Zugriff
+per Aggregat-Query ermittelt, sondern beim Speichern des Berichts bzw. seiner Teilnahme-,
+Fahrzeug- und Anhänger-Zeilen neu berechnet (Signale der Apps, gleiche Transaktion).
+Die Dauer braucht keine Spalte – sie ergibt sich aus Beginn und Ende (dauer_stunden).
+Mehrere Änderungen hintereinander (Formsets, Admin-Inlines) lassen sich mit `gesammelt()`
+zu einer Neuberechnung je Bericht zusammenfassen; `danach()` fasst dort auch andere Folgearbeiten
+(PDF-Cache, Änderungsstempel) je Bericht zusammen.
+
+Änderungen an Signalen vorbei (queryset.update, bulk_create) müssen `refresh()` selbst aufrufen;
+`manage.py rebuild_stats` berechnet alles neu bzw. prüft den Bestand.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, IntegerField, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce
+
+FELDER = ("stat_teilnehmer", "stat_hauptamtlich", "stat_kilometer", "stat_fahrzeugstunden")
+
+_local = threading.local()
+
+
+def _relations(model):
+    # Fremdschlüssel in den Through-Tabellen heißt wie das Modell ("einsatz" / "dienst")
+    return model._meta.model_name, model.teilnahmen.through, model.fahrzeuge.through, model.anhaenger.through
+
+
+def _subquery(child, fk: str, aggregate, output_field):
+    qs = child.objects.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(v=aggregate).values("v")
+    return Coalesce(Subquery(qs, output_field=output_field), Value(0), output_field=output_field)
+
+
+def annotations(model) -> dict:
+    """Korrelierte Unterabfragen für die Kennzahlen – eine Query für beliebig viele Berichte."""
+    fk, teilnahme, fahrzeug, anhaenger = _relations(model)
+    dec = DecimalField(max_digits=9, decimal_places=2)
+    return {
+        "_teilnehmer": _subquery(teilnahme, fk, Count("pk"), IntegerField()),
+        "_hauptamtlich": _subquery(teilnahme, fk, Count("pk", filter=Q(mitglied__hauptamtlich=True)), IntegerField()),
+        "_km_fahrzeuge": _subquery(fahrzeug, fk, Sum("kilometer"), IntegerField()),
+        "_km_anhaenger": _subquery(anhaenger, fk, Sum("kilometer"), IntegerField()),
+        "_std_fahrzeuge": _subquery(fahrzeug, fk, Sum("stunden"), dec),
+        "_std_anhaenger": _subquery(anhaenger, fk, Sum("stunden"), dec),
+    }
+
+
+def live_annotations(model) -> dict:
+    """
+    Annotationen für QuerySet.with_stats(): Kennzahlen live aus den Zeilen, in derselben Query.
+    Die Properties (teilnehmer_anzahl, summe_kilometer, …) bevorzugen diese Werte vor stat_*.
+    """
+    ann = annotations(model)
+    dec = DecimalField(max_digits=9, decimal_places=2)
+    return {
+        "live_teilnehmer": ann["_teilnehmer"],
+        "live_hauptamtlich": ann["_hauptamtlich"],
+        "live_kilometer": ExpressionWrapper(ann["_km_fahrzeuge"] + ann["_km_anhaenger"], output_field=IntegerField()),
+        "live_fahrzeugstunden": ExpressionWrapper(ann["_std_fahrzeuge"] + ann["_std_anhaenger"], output_field=dec),
+    }
+
+
+def compute(queryset) -> dict[int, dict]:
+    """Berechnet die Kennzahlen der Berichte im QuerySet aus den Zeilen: {pk: {stat_feld: wert}}."""
+    ann = annotations(queryset.model)
+    rows = queryset.order_by().annotate(**ann).values("pk", *ann)
+    return {
+        row["pk"]: {
+            "stat_teilnehmer": row["_teilnehmer"],
+            "stat_hauptamtlich": row["_hauptamtlich"],
+            "stat_kilometer": row["_km_fahrzeuge"] + row["_km_anhaenger"],
+            "stat_fahrzeugstunden": (Decimal(row["_std_fahrzeuge"]) + Decimal(row["_std_anhaenger"])).quantize(Decimal("0.01")),
+        }
+        for row in rows
+    }
+
+
+def refresh(model, pks: Iterable[int]) -> int:
+    """Kennzahlen der Berichte `pks` neu berechnen und speichern (innerhalb von gesammelt(): vormerken)."""
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return 0
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending.setdefault(model, set()).update(pks)
+        return 0
+    values = compute(model._default_manager.filter(pk__in=pks))
+    # update() statt save(): keine Signale, keine Cache-Invalidierung für reine Kennzahlen
+    objs = [model(pk=pk, **v) for pk, v in values.items()]
+    model._default_manager.bulk_update(objs, FELDER, batch_size=500)
+    return len(objs)
+
+
+@contextmanager
+def gesammelt():
+    """Neuberechnungen innerhalb des Blocks sammeln und am Ende einmal je Bericht ausführen."""
+    if getattr(_local, "pending", None) is not None:
+        yield  # bereits in einem äußeren Block
+        return
+    _local.pending, _local.danach = {}, {}
+    try:
+        yield
+        pending, danach_ = _local.pending, _local.danach
+    finally:
+        _local.pending = _local.danach = None
+    for model, pks in pending.items():
+        refresh(model, pks)
+    for fn in danach_.values():
+        fn()
+
+
+def danach(key, fn) -> None:
+    """`fn` sofort ausführen – innerhalb von gesammelt() einmal je `key` am Ende des Blocks."""
+    pending = getattr(_local, "danach", None)
+    if pending is None:
+        fn()
+    else:
+        pending.setdefault(key, fn)
+
+
+def verify(model, queryset=None) -> list[tuple[int, str, object, object]]:
+    """Abweichungen zwischen gespeicherten und berechneten Kennzahlen: [(pk, feld, gespeichert, berechnet)]."""
+    queryset = model._default_manager.all() if queryset is None else queryset
+    stored = {row["pk"]: row for row in queryset.values("pk", *FELDER)}
+    diffs = []
+    for pk, values in compute(queryset).items():
+        for feld, berechnet in values.items():
+            if stored[pk][feld] != berechnet:
+                diffs.append((pk, feld, stored[pk][feld], berechnet))
+    return diffs
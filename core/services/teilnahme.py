@@ -0,0 +1,76 @@
+# core/services/teilnahme.py
+"""
+Teilnahme-Zeilen (EinsatzTeilnahme/DienstTeilnahme) aus der Checkboxliste speichern.
+
+Statt je Mitglied full_clean() + save() (eine Query für mitglied.agt plus ein INSERT je Zeile)
+werden alle Zeilen gegen eine einzige Mitglieder-Abfrage im Speicher geprüft und mit
+bulk_create/bulk_update/einem DELETE geschrieben – konstant viele Queries, egal wie groß
+der Einsatz ist. bulk_create sendet keine Signale, daher werden die Kennzahlen (stat_*)
+hier selbst nachgezogen.
+"""
+from django.core.exceptions import ValidationError
+
+from core.models import Mitglied
+from core.services import statistik
+
+FELDER = ("fahrzeug_funktion", "agt_minuten")
+
+
+def _report_field(model, bericht) -> str:
+    """Name des Fremdschlüssels vom Teilnahme-Modell auf den Bericht (einsatz bzw. dienst)."""
+    for field in model._meta.concrete_fields:
+        if field.many_to_one and field.related_model is type(bericht):
+            return field.name
+    raise ValueError(f"{model.__name__} verweist nicht auf {type(bericht).__name__}.")
+
+
+def speichern(bericht, model, rows) -> dict:
+    """
+    Übernimmt die Auswahl `rows` (cleaned_data von TeilnahmeAlleMitgliederForm) für `bericht`:
+    ausgewählte Mitglieder anlegen bzw. aktualisieren, abgewählte löschen.
+    AGT-Minuten werden – wie bisher – nur bei AGT-Mitgliedern übernommen.
+    Liefert Zähler {"neu": n, "geaendert": m, "geloescht": k}.
+    """
+    feld = _report_field(model, bericht)
+    selected = {}
+    for cd in rows:
+        if cd.get("selected"):
+            selected[cd["mitglied_id"]] = cd
+
+    agt = dict(Mitglied.objects.filter(pk__in=selected).values_list("pk", "agt"))
+    unbekannt = sorted(set(selected) - set(agt))
+    if unbekannt:
+        raise ValidationError(f"Unbekannte Mitglieder: {', '.join(map(str, unbekannt))}")
+
+    existing = {t.mitglied_id: t for t in model._default_manager.filter(**{feld: bericht})}
+    create, update = [], []
+    for mid, cd in selected.items():
+        agt_min = cd.get("agt_minuten")
+        if agt_min is not None and agt_min < 0:
+            raise ValidationError("AGT-Minuten dürfen nicht negativ sein.")
+        values = {
+            "fahrzeug_funktion": cd.get("fahrzeug_funktion") or "",
+            "agt_minuten": agt_min if agt[mid] else None,
+        }
+        obj = existing.get(mid)
+        if obj is None:
+            create.append(model(**{feld: bericht}, mitglied_id=mid, **values))
+        elif any(getattr(obj, k) != v for k, v in values.items()):
+            for k, v in values.items():
+                setattr(obj, k, v)
+            update.append(obj)
+    delete = [t.pk for mid, t in existing.items() if mid not in selected]
+
+    # Löschsignale der Teilnahme lösen je Zeile eine Neuberechnung aus – hier nur einmal
+    with statistik.gesammelt():
+        if create:
+            model._default_manager.bulk_create(create, batch_size=500)
+        if update:
+            model._default_manager.bulk_update(update, FELDER, batch_size=500)
+        if delete:
+            model._default_manager.filter(pk__in=delete).delete()
+        if create or update or delete:
+            statistik.refresh(type(bericht), [bericht.pk])
+            # bulk_create/bulk_update senden keine Signale – Änderungsstempel (ETag) selbst setzen
+            type(bericht)._default_manager.filter(pk=bericht.pk).touch()
+    return {"neu": len(create), "geaendert": len(update), "geloescht": len(delete)}
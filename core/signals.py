@@ -0,0 +1,41 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save
+
+from . import models
+from .models import MailEmpfaenger
+from .services.mail import invalidate_recipients
+from .utils import conditional
+from .utils.cache import invalidate_now_and_on_commit
+
+# Stammdaten, deren Namen in Berichten (Detailseite, PDF, Liste) erscheinen
+STAMMDATEN = (
+    models.Mitglied, models.Fahrzeug, models.Abrollbehaelter, models.Anhaenger, models.Zusatzstelle,
+    models.Einsatzmittel, models.MeldendeStelle, models.Brandumfang, models.Brandausbreitung,
+    models.Brandgut, models.Brandobjekt, models.Loeschwasserentnahmestelle, models.Schadensereignis,
+    models.PersonenrettungTyp, models.Sicherheitswache, models.Fehlalarm, models.Sonstige,
+    models.Ortsfeuerwehr, models.Einsatzstichwort,
+)
+
+
+def _empfaenger_changed(sender, instance, **kwargs):
+    invalidate_now_and_on_commit(invalidate_recipients)
+
+
+def _stammdaten_changed(sender, instance, **kwargs):
+    # ETags gerenderter Berichte ungültig machen
+    invalidate_now_and_on_commit(conditional.bump_stammdaten)
+
+
+def connect():
+    for signal in (post_save, post_delete):
+        signal.connect(
+            _empfaenger_changed,
+            sender=MailEmpfaenger,
+            dispatch_uid=f"core_mail_empfaenger_{signal is post_save}",
+        )
+        for model in STAMMDATEN:
+            signal.connect(
+                _stammdaten_changed,
+                sender=model,
+                dispatch_uid=f"core_stammdaten_{model._meta.model_name}_{signal is post_save}",
+            )
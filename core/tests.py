@@ -1,3 +1,203 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from pypdf import PdfWriter
+
+from core.models import Auftrag, MailAusgang, Nummernkreis, Sammelauftrag
+from core.services import auftraege, nummernkreis, postausgang
+from core.utils import keyset
+from core.utils.sqlite import effective_pragmas, mismatches
+from dienst.models import Dienst
+
+
+class SQLiteTuningTests(TransactionTestCase):
+    """PRAGMAs aus settings.SQLITE_PRAGMAS greifen und parallele Schreiber laufen ohne "database is locked"."""
+
+    THREADS = 6
+    SAVES_PER_THREAD = 20
+
+    def test_pragmas_are_applied(self):
+        self.assertEqual(mismatches(), {})
+        self.assertEqual(str(effective_pragmas()["journal_mode"]).lower(), "wal")
+
+    def test_concurrent_writers_do_not_lock(self):
+        errors = []
+        start = threading.Barrier(self.THREADS)
+
+        def writer(n):
+            try:
+                start.wait()
+                for i in range(self.SAVES_PER_THREAD):
+                    now = timezone.now()
+                    # wie im View: Nummer und Datensatz in einer (äußeren) Transaktion
+                    with transaction.atomic():
+                        dienst = Dienst(titel=f"T{n}-{i}", start_dt=now, ende_dt=now + timedelta(hours=1))
+                        nummernkreis.save_with_number(dienst)
+            except OperationalError as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        total = self.THREADS * self.SAVES_PER_THREAD
+        year = timezone.now().year
+        seqs = sorted(Dienst.objects.filter(year=year).values_list("seq", flat=True))
+        self.assertEqual(seqs, list(range(1, total + 1)))
+        self.assertEqual(Nummernkreis.objects.get(kreis="dienst.dienst", jahr=year).letzte_nummer, total)
+
+
+class MailWorkerTests(TransactionTestCase):
+    """Abgebrochene Pakete und beendete Worker hinterlassen keine Mails im Zustand "wird gesendet"."""
+
+    def test_batch_exception_is_recovered(self):
+        item = postausgang.enqueue("Betreff", "Text", to=["a@example.org"])
+        with mock.patch("core.services.postausgang.send_batch", side_effect=RuntimeError("kaputt")):
+            call_command("mail_worker", "--once", "--threads", "1", stdout=io.StringIO())
+
+        item.refresh_from_db()
+        self.assertEqual(item.status, MailAusgang.STATUS_OFFEN)
+        self.assertEqual(item.versuche, 1)
+        self.assertIn("RuntimeError: kaputt", item.letzter_fehler)
+        self.assertGreater(item.naechster_versuch, timezone.now())
+
+    def test_release_returns_claimed_mails(self):
+        item = postausgang.enqueue("Betreff", "Text", to=["a@example.org"])
+        self.assertEqual(postausgang.claim_due(10), [item.pk])
+
+        self.assertEqual(postausgang.release([item.pk]), 1)
+        item.refresh_from_db()
+        self.assertEqual(item.status, MailAusgang.STATUS_OFFEN)
+        self.assertEqual(item.versuche, 0)
+        self.assertEqual(postausgang.claim_due(10), [item.pk])
+
+
+class SammelmailTests(TransactionTestCase):
+    """Ein beschädigtes Archiv-PDF blockiert weder die Sammelmail noch den Mail-Worker."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive = Path(tmp.name)
+        override = override_settings(PDF_ARCHIVE_DIR=str(self.archive))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _vormerken(self, name: str, data: bytes, obj=None) -> MailAusgang:
+        (self.archive / name).write_bytes(data)
+        return postausgang.enqueue(
+            "Bericht", "Text", bcc=["a@example.org"], anhang_pfad=name, obj=obj, status=MailAusgang.STATUS_SAMMELN,
+        )
+
+    def _pdf(self) -> bytes:
+        writer = PdfWriter()
+        writer.add_blank_page(100, 100)
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    def test_corrupt_attachment_is_marked_failed(self):
+        gut = self._vormerken("gut.pdf", self._pdf())
+        kaputt = self._vormerken("kaputt.pdf", self._pdf()[:200])
+
+        self.assertEqual(postausgang.flush_digests(force=True), 1)
+
+        gut.refresh_from_db()
+        kaputt.refresh_from_db()
+        self.assertEqual(gut.status, MailAusgang.STATUS_GEBUENDELT)
+        self.assertEqual(kaputt.status, MailAusgang.STATUS_FEHLER)
+        self.assertIn("Sammelmail:", kaputt.letzter_fehler)
+        digest = gut.sammelmails.get()
+        self.assertEqual(list(digest.bestandteile.all()), [gut])
+        self.assertTrue((self.archive / digest.anhang_pfad).is_file())
+
+    def test_worker_survives_flush_error(self):
+        with mock.patch("core.services.postausgang.flush_digests", side_effect=RuntimeError("kaputt")):
+            call_command("mail_worker", "--once", stdout=io.StringIO())
+
+    def test_fortschritt_waits_for_digest(self):
+        now = timezone.now()
+        dienst = Dienst(titel="Übung", start_dt=now, ende_dt=now + timedelta(hours=1))
+        nummernkreis.save_with_number(dienst)
+        gruppe = Sammelauftrag.objects.create(bezeichnung="Mails erneut senden")
+        Auftrag.objects.create(
+            aufgabe="x", objekt_typ="dienst.dienst", objekt_id=dienst.pk,
+            status=Auftrag.STATUS_ERLEDIGT, sammelauftrag=gruppe,
+        )
+        item = self._vormerken("dienst.pdf", self._pdf(), obj=dienst)
+
+        stand = auftraege.fortschritt(gruppe)
+        self.assertEqual(stand["mails"]["wartend"], 1)
+        self.assertFalse(stand["fertig"])
+
+        postausgang.flush_digests(force=True)
+        self.assertFalse(auftraege.fortschritt(gruppe)["fertig"])
+
+        item.sammelmails.update(status=MailAusgang.STATUS_GESENDET)
+        stand = auftraege.fortschritt(gruppe)
+        self.assertEqual((stand["mails"]["wartend"], stand["mails"]["gesendet"]), (0, 1))
+        self.assertTrue(stand["fertig"])
+
+
+class KeysetTests(TestCase):
+    """Blättern per Cursor vor und zurück; manipulierte Cursor führen zur ersten Seite statt zu einem Fehler."""
+
+    ORDERING = ("-year", "-seq")
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(5):
+            nummernkreis.save_with_number(Dienst(titel=f"D{i}", start_dt=now, ende_dt=now + timedelta(hours=1)))
+
+    def _page(self, **kwargs):
+        page = keyset.paginate(Dienst.objects.all(), self.ORDERING, per_page=2, **kwargs)
+        return page, [d.seq for d in page]
+
+    def test_forward_and_backward(self):
+        first, seqs = self._page()
+        self.assertEqual(seqs, [5, 4])
+        self.assertTrue(first.has_next)
+        self.assertFalse(first.has_previous)
+
+        second, seqs = self._page(nach=first.next_cursor)
+        self.assertEqual(seqs, [3, 2])
+        self.assertTrue(second.has_previous)
+
+        last, seqs = self._page(nach=second.next_cursor)
+        self.assertEqual(seqs, [1])
+        self.assertFalse(last.has_next)
+
+        back, seqs = self._page(vor=last.previous_cursor)
+        self.assertEqual(seqs, [3, 2])
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+
+        _, seqs = self._page(vor=back.previous_cursor)
+        self.assertEqual(seqs, [5, 4])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        for cursor in (
+            "kein-cursor!",
+            keyset.encode_cursor(["x", "y"]),
+            keyset.encode_cursor([[1], {"a": 2}]),
+            keyset.encode_cursor([2026]),
+        ):
+            for param in ("nach", "vor"):
+                with self.subTest(cursor=cursor, param=param):
+                    page, seqs = self._page(**{param: cursor})
+                    self.assertEqual(seqs, [5, 4])
+                    self.assertFalse(page.has_previous)
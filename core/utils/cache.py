@@ -0,0 +1,15 @@
+# core/utils/cache.py
+"""Hilfen für den gemeinsamen Django-Cache (alle gunicorn-Worker sehen denselben Stand)."""
+from typing import Callable
+
+from django.db import transaction
+
+
+def invalidate_now_and_on_commit(invalidate: Callable[[], None]) -> None:
+    """
+    Cache-Eintrag sofort und noch einmal nach dem Commit ungültig machen: sonst könnte ein anderer
+    Worker den alten Stand zwischen Änderung und Commit erneut in den Cache schreiben.
+    Ohne offene Transaktion führt on_commit die Funktion direkt ein zweites Mal aus (harmlos).
+    """
+    invalidate()
+    transaction.on_commit(invalidate)
@@ -0,0 +1,69 @@
+# core/utils/conditional.py
+"""
+ETags für bedingte GETs (django.views.decorators.http.condition): ein erneuter Aufruf mit
+If-None-Match wird mit 304 beantwortet, bevor Relationen geladen oder Templates gerendert werden.
+
+Seiten enthalten Benutzername und CSRF-Token (Logout-Formular) – `page_etag` bezieht beides ein.
+Stehen Meldungen (django.contrib.messages) aus, gibt es kein ETag, damit sie angezeigt werden.
+
+Berichte zeigen Namen aus Stammdaten (Fahrzeug, Ortsfeuerwehr, Mitglied …), deren Änderung den
+Bericht nicht anfasst: `stammdaten_version()` wird über Signale (core.signals) hochgezählt und
+gehört wie `app_version()` (Templates des Deployments) in jedes ETag gerenderter Inhalte.
+"""
+import functools
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import django
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.template import engines
+
+STAMMDATEN_KEY = "conditional:stammdaten:version"
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def page_etag(request, *parts) -> Optional[str]:
+    if len(messages.get_messages(request)):
+        return None
+    user = getattr(request, "user", None)
+    return fingerprint(*parts, getattr(user, "pk", ""), request.META.get("CSRF_COOKIE", ""))
+
+
+def stammdaten_version() -> int:
+    v = cache.get(STAMMDATEN_KEY)
+    if v is None:
+        v = time.time_ns()
+        # add(): ein parallel neu gesetzter Stand gewinnt
+        if not cache.add(STAMMDATEN_KEY, v, None):
+            v = cache.get(STAMMDATEN_KEY, v)
+    return v
+
+
+def bump_stammdaten() -> None:
+    cache.set(STAMMDATEN_KEY, time.time_ns(), None)
+
+
+@functools.cache
+def app_version() -> str:
+    """Stand der Templates dieses Deployments (einmal je Prozess; update.sh startet gunicorn neu)."""
+    base = Path(settings.BASE_DIR).resolve()
+    h = hashlib.sha256(django.get_version().encode())
+    for engine in engines.all():
+        for directory in getattr(engine, "template_dirs", ()):
+            directory = Path(directory).resolve()
+            if not directory.is_relative_to(base):
+                continue  # Templates aus site-packages deckt die Django-Version ab
+            for root, dirs, files in os.walk(directory):
+                dirs.sort()
+                for name in sorted(files):
+                    st = os.stat(os.path.join(root, name))
+                    h.update(f"{root}/{name}:{st.st_mtime_ns}:{st.st_size}\0".encode())
+    return h.hexdigest()[:16]
@@ -1,6 +1,28 @@
 # core/utils/files.py
+import os
+import tempfile
+from pathlib import Path
+
 def safe_filename(name: str) -> str:
     # Ersetzt problematische Pfadtrenner durch Unterstrich.
     # Primär gewünscht: Slash → Unterstrich.
     # Backslash wird der Vollständigkeit halber ebenfalls ersetzt.
     return str(name).replace("/", "_").replace("\\", "_").strip()
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    # Erst in eine temporäre Datei im Zielordner, dann umbenennen:
+    # Leser sehen nie eine halb geschriebene Datei.
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,47 @@
+# core/utils/htmx.py
+"""
+HTMX-Teilantworten der Listen: Suche während der Eingabe lädt nur das Ergebnis (Tabelle und
+Blättern) statt der ganzen Seite mit base.html, Tailwind und htmx.
+
+Die gerenderten Fragmente werden kurz im gemeinsamen Django-Cache gehalten (LISTE_CACHE_SEKUNDEN,
+0 = aus) – Tippen, Löschen und erneutes Tippen trifft dann denselben Eintrag. Der Schlüssel
+enthält denselben Stand der Liste wie ihr ETag (Version der Jahresübersicht, jüngstes updated_at,
+Stammdaten- und Template-Version, siehe die Listen-Views): neue, gelöschte und geänderte Berichte
+sind sofort sichtbar.
+"""
+import hashlib
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+
+
+def is_partial(request) -> bool:
+    """HTMX-Anfrage, die nur ein Fragment erwartet (nicht die Wiederherstellung aus dem Verlauf)."""
+    return request.headers.get("HX-Request") == "true" and not request.headers.get("HX-History-Restore-Request")
+
+
+def cache_key(name: str, version, params) -> str:
+    """Schlüssel für ein Fragment; `version` muss sich mit jedem Inhalt der Liste ändern."""
+    raw = "&".join(f"{k}={v}" for k, v in sorted(params.lists()))
+    return f"htmx:{name}:{version}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def vary(response: HttpResponse) -> HttpResponse:
+    # Vollseite und Fragment unter derselben URL – Browser-/Proxy-Caches müssen unterscheiden
+    patch_vary_headers(response, ["HX-Request"])
+    return response
+
+
+def partial_response(request, template: str, context: Callable[[], dict], key: str = "") -> HttpResponse:
+    """Fragment rendern bzw. aus dem Cache liefern; `context` wird nur bei einem Fehltreffer aufgerufen."""
+    timeout = getattr(settings, "LISTE_CACHE_SEKUNDEN", 30)
+    html = cache.get(key) if key and timeout else None
+    if html is None:
+        html = render_to_string(template, context(), request=request)
+        if key and timeout:
+            cache.set(key, html, timeout)
+    return vary(HttpResponse(html))
@@ -0,0 +1,138 @@
+# core/utils/keyset.py
+"""
+Blättern per Cursor (Keyset) statt Paginator: kein COUNT(*) über die ganze Auswahl und kein
+OFFSET – jede Seite ist ein "WHERE (year, seq) < (…) ORDER BY … LIMIT n" über den Index,
+egal wie weit hinten sie liegt.
+
+Der Cursor enthält die Sortierwerte der ersten bzw. letzten Zeile einer Seite (Base64-JSON),
+die Sortierung muss daher eindeutig sein (bei Einsatz/Dienst: year, seq). Annotationen wie
+`such_rang` der Volltextsuche dürfen vorangestellt werden.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> Optional[list]:
+    """Cursor → Sortierwerte; None bei ungültigem/fremdem Cursor (dann erste Seite)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    # nur Skalare – Listen/Objekte aus einem manipulierten Cursor nicht bis in die Abfrage reichen
+    if not all(v is None or isinstance(v, (int, float, str)) for v in values):
+        return None
+    return values
+
+
+def _split(ordering: Sequence[str]) -> list[tuple[str, bool]]:
+    return [(f[1:], True) if f.startswith("-") else (f, False) for f in ordering]
+
+
+def _after(fields: list[tuple[str, bool]], values: list) -> Q:
+    """Zeilen, die in der Sortierung `fields` echt hinter `values` liegen (lexikografisch)."""
+    cond = Q()
+    for i, (name, desc) in enumerate(fields):
+        step = Q(**{n: v for (n, _), v in zip(fields[:i], values[:i])})
+        step &= Q(**{f"{name}__{'lt' if desc else 'gt'}": values[i]})
+        cond |= step
+    return cond
+
+
+def approx_count(queryset, cap: int) -> tuple[int, bool]:
+    """Anzahl, aber höchstens bis `cap` gezählt: (anzahl, genau). Begrenzt die Kosten auf `cap` Zeilen."""
+    n = queryset.order_by().values("pk")[: cap + 1].count()
+    return min(n, cap), n <= cap
+
+
+def _page_queryset(queryset, ordering, fields, values, backwards: bool):
+    if backwards:
+        # rückwärts lesen: umgekehrte Sortierung, danach die Seite wieder umdrehen
+        reverse = [(name, not desc) for name, desc in fields]
+        return queryset.filter(_after(reverse, values)).order_by(*[f"-{n}" if d else n for n, d in reverse])
+    if values is not None:
+        queryset = queryset.filter(_after(fields, values))
+    return queryset.order_by(*ordering)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    has_previous: bool
+    next_cursor: str = ""
+    previous_cursor: str = ""
+    anzahl: Optional[int] = None
+    anzahl_genau: bool = field(default=True)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(
+    queryset,
+    ordering: Sequence[str],
+    nach: str = "",
+    vor: str = "",
+    per_page: int = 20,
+    count_cap: int = 0,
+) -> KeysetPage:
+    """
+    Eine Seite von `queryset` in der (eindeutigen) Sortierung `ordering`.
+    `nach`: Seite hinter diesem Cursor ("Weiter"), `vor`: Seite davor ("Zurück"), sonst erste Seite.
+    `count_cap` > 0 ergänzt eine Gesamtzahl, die nur bis zu dieser Grenze gezählt wird.
+    """
+    fields = _split(ordering)
+    backwards = False
+    values = decode_cursor(nach, len(fields))
+    if values is None:
+        values = decode_cursor(vor, len(fields))
+        backwards = values is not None
+
+    try:
+        qs = _page_queryset(queryset, ordering, fields, values, backwards)
+    except (ValueError, TypeError, ValidationError):
+        # Cursor passt nicht zu den Feldtypen (z. B. ["x", "y"] für year/seq) – erste Seite
+        values, backwards = None, False
+        qs = _page_queryset(queryset, ordering, fields, values, backwards)
+
+    rows = list(qs[: per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = True, more
+    else:
+        has_next, has_previous = more, values is not None
+
+    def cursor(obj):
+        return encode_cursor([getattr(obj, name) for name, _ in fields])
+
+    page = KeysetPage(
+        object_list=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=cursor(rows[-1]) if rows else "",
+        previous_cursor=cursor(rows[0]) if rows else "",
+    )
+    if count_cap > 0:
+        page.anzahl, page.anzahl_genau = approx_count(queryset, count_cap)
+    return page
@@ -0,0 +1,58 @@
+# core/utils/pool.py
+"""
+Prozess-Pool für CPU-lastige Arbeit (WeasyPrint-Layout) außerhalb des Request-Zyklus.
+
+Startmethode "spawn": Kind-Prozesse erben weder offene DB-Verbindungen noch
+cffi-/Pango-Zustand des Elternprozesses. Jedes Kind richtet Django selbst ein und
+wärmt bei Bedarf die PDF-Engine vor. Dieses Modul darf deshalb keine Models importieren.
+"""
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _init_child(warmup_pdf: bool, detach_signals: bool = False):
+    if detach_signals:
+        # SIGTERM/SIGINT gehen an die ganze Prozessgruppe – das Beenden steuert der Elternprozess
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    import django
+
+    django.setup()
+    if warmup_pdf:
+        from pdfs.engine import warmup
+
+        warmup()
+
+
+def default_processes() -> int:
+    from django.conf import settings
+
+    configured = getattr(settings, "PDF_POOL_PROCESSES", None)
+    return max(1, int(configured or (os.cpu_count() or 2) - 1 or 1))
+
+
+def process_pool(
+    max_workers: int | None = None, warmup_pdf: bool = True, detach_signals: bool = False
+) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=max_workers or default_processes(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_child,
+        initargs=(warmup_pdf, detach_signals),
+    )
+
+
+def terminate(pool: ProcessPoolExecutor) -> None:
+    """Pool sofort beenden: wartende Aufgaben verwerfen, laufende Kind-Prozesse abbrechen."""
+    # _processes ist nicht öffentlich, aber seit Python 3.2 unverändert – shutdown() allein
+    # wartet auf laufende Aufgaben bzw. lässt die Kinder bis zum Ende weiterarbeiten
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for proc in processes:
+        if proc.is_alive():
+            proc.kill()
+    for proc in processes:
+        proc.join(timeout=5)
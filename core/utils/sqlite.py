@@ -0,0 +1,42 @@
+# core/utils/sqlite.py
+"""Effektive SQLite-PRAGMAs einer Verbindung, verglichen mit settings.SQLITE_PRAGMAS."""
+from django.conf import settings
+from django.db import connections
+
+# SQLite liefert diese PRAGMAs als Zahl zurück
+_NUMERIC = {
+    "synchronous": {"off": 0, "normal": 1, "full": 2, "extra": 3},
+    "temp_store": {"default": 0, "file": 1, "memory": 2},
+}
+
+
+def effective_pragmas(using: str = "default") -> dict:
+    conn = connections[using]
+    names = getattr(settings, "SQLITE_PRAGMAS", {})
+    with conn.cursor() as cursor:
+        result = {}
+        for name in names:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            result[name] = row[0] if row else None
+    return result
+
+
+def _normalize(name: str, value):
+    if isinstance(value, str):
+        value = value.strip().lower()
+        value = _NUMERIC.get(name, {}).get(value, value)
+        if isinstance(value, str) and value.lstrip("-").isdigit():
+            value = int(value)
+    return value
+
+
+def mismatches(using: str = "default") -> dict:
+    """{pragma: (konfiguriert, effektiv)} für alle Abweichungen."""
+    wanted = getattr(settings, "SQLITE_PRAGMAS", {})
+    effective = effective_pragmas(using)
+    return {
+        name: (value, effective.get(name))
+        for name, value in wanted.items()
+        if _normalize(name, value) != _normalize(name, effective.get(name))
+    }
@@ -2,6 +2,7 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from .models import Mitglied
+from .services import jahresuebersicht
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 
@@ -21,15 +22,11 @@ def index(request):
     else:
         overview_year = timezone.now().year
 
-    # Zähler für das angezeigte Jahr
-    einsatz_count = Einsatz.objects.filter(year=overview_year).count()
-    dienst_count = Dienst.objects.filter(year=overview_year).count()
-
-    # Jahres-Tabs für Startseite: verfügbare Jahre je Typ
-    einsatz_years_qs = Einsatz.objects.order_by("-year").values_list("year", flat=True).distinct()
-    einsatz_years = [y for y in einsatz_years_qs if y is not None]
-    dienst_years_qs = Dienst.objects.order_by("-year").values_list("year", flat=True).distinct()
-    dienst_years = [y for y in dienst_years_qs if y is not None]
+    # Zähler und Jahres-Tabs aus der gecachten Jahresübersicht (keine COUNT/DISTINCT-Scans)
+    einsatz_count = jahresuebersicht.count("einsatz", overview_year)
+    dienst_count = jahresuebersicht.count("dienst", overview_year)
+    einsatz_years = jahresuebersicht.years("einsatz")
+    dienst_years = jahresuebersicht.years("dienst")
 
     # Ggf. per GET-Parameter gefilterte Anzeige (recent lists)
 
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin, messages
 from django.db import transaction
 from django.db.models import Max
@@ -6,14 +7,15 @@ from django.urls import path, reverse
 from django.utils.html import format_html
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
-from django.template.loader import render_to_string
-from django.templatetags.static import static
 
-from weasyprint import HTML  # für PDF
-
-from core.services.mail import send_mail_with_pdf_to_active
+from core.services import auftraege, statistik
+from core.services.mail import get_all_active_recipients
+from core.utils import keyset
 from core.utils.files import safe_filename
 
+from pdfs.export import zip_response
+
+from .services import iter_dienst_zip, mail_dienst_pdf, render_dienst_pdf
 from .models import (
     Dienst,
     DienstFahrzeug,
@@ -50,21 +52,18 @@ class DienstTeilnahmeInline(admin.TabularInline):
     fields = ("mitglied", "fahrzeug_funktion", "agt_minuten")
     autocomplete_fields = ("mitglied",)
 
-def _render_html_to_pdf_bytes(html: str, base_url=None) -> bytes:
-    return HTML(string=html, base_url=base_url).write_pdf()
-
 @admin.register(Dienst)
 class DienstAdmin(admin.ModelAdmin):
     date_hierarchy = "start_dt"
-    list_display = ("nummer_formatiert", "titel", "start_dt", "ende_dt", "obj_actions")
+    list_display = ("nummer_formatiert", "titel", "start_dt", "ende_dt", "personal", "summe_km", "obj_actions")
     search_fields = ("titel",)
     list_filter = ("year",)
-    readonly_fields = ("year", "seq", "nummer_formatiert", "dauer_stunden")
+    readonly_fields = ("year", "seq", "nummer_formatiert", "dauer_stunden", "pdf_sha256", "pdf_archiviert_am")
 
     fieldsets = (
         ("Allgemein", {"fields": ("titel", "start_dt", "ende_dt", "beschreibung")}),
         ("Nummer/Meta", {
-            "fields": ("year", "seq", "nummer_formatiert", "dauer_stunden"),
+            "fields": ("year", "seq", "nummer_formatiert", "dauer_stunden", "pdf_archiviert_am", "pdf_sha256"),
             "classes": ("collapse",),
         }),
     )
@@ -81,6 +80,25 @@ class DienstAdmin(admin.ModelAdmin):
         )
     obj_actions.short_description = "Aktionen"
 
+    def get_queryset(self, request):
+        # Kennzahlen der Liste per Unterabfrage in derselben Query (sortierbar)
+        return super().get_queryset(request).with_stats()
+
+    def personal(self, obj):
+        return obj.teilnehmer_anzahl
+    personal.short_description = "Personal"
+    personal.admin_order_field = "live_teilnehmer"
+
+    def summe_km(self, obj):
+        return obj.summe_kilometer
+    summe_km.short_description = "km"
+    summe_km.admin_order_field = "live_kilometer"
+
+    def save_related(self, request, form, formsets, change):
+        # Inlines: Kennzahlen (stat_*) einmal statt je Zeile neu berechnen
+        with statistik.gesammelt():
+            super().save_related(request, form, formsets, change)
+
     def get_urls(self):
         urls = super().get_urls()
         custom = [
@@ -91,8 +109,7 @@ class DienstAdmin(admin.ModelAdmin):
 
     def view_pdf(self, request, pk: int, *args, **kwargs):
         obj = get_object_or_404(Dienst, pk=pk)
-        html = render_to_string("dienst/pdf.html", {"obj": obj})
-        pdf = _render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
+        pdf = render_dienst_pdf(obj, base_url=request.build_absolute_uri("/"))
         resp = HttpResponse(pdf, content_type="application/pdf")
         safe_name = safe_filename(f"Dienst_{obj.nummer_formatiert}.pdf")  # <-- safe
         resp["Content-Disposition"] = f'inline; filename="{safe_name}"'
@@ -100,33 +117,54 @@ class DienstAdmin(admin.ModelAdmin):
 
     def resend_mail(self, request, pk: int, *args, **kwargs):
         obj = get_object_or_404(Dienst, pk=pk)
-        css_url = request.build_absolute_uri(static('css/print.css'))
-        html = render_to_string("dienst/pdf.html", {"obj": obj, "print_css_url": css_url})
-        pdf = _render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
-        sent = send_mail_with_pdf_to_active(
-            subject="Neue Dienstliste eingegangen",
-            body_text="Automatische Nachricht: Eine neue Dienstliste wurde erfasst.",
-            pdf_bytes=pdf,
-            filename=f"Dienst_{obj.nummer_formatiert}.pdf",
-            fail_silently=False,  # im Admin Fehler anzeigen
-        )
-        messages.success(request, f"E-Mail für Dienst {obj.nummer_formatiert} erneut versendet ({sent} Empfänger).")
+        n = mail_dienst_pdf(obj)
+        if n:
+            messages.success(request, f"E-Mail für Dienst {obj.nummer_formatiert} in den Postausgang gelegt ({n} Empfänger).")
+        else:
+            messages.warning(request, "Keine aktiven Mail-Empfänger hinterlegt – nichts versendet.")
         return HttpResponseRedirect(reverse("admin:dienst_dienst_change", args=[obj.pk]))
 
-    # Bulk-Action: Mails erneut senden
+    # Bulk-Action: Mails erneut senden – als Sammelauftrag im Hintergrund (auftrag_worker rendert
+    # die PDFs im Prozess-Pool, mail_worker versendet gebündelt); der Request kehrt sofort zurück.
     @admin.action(description="PDF per Mail erneut senden")
     def action_resend_mail(self, request, queryset):
-        total_sent = 0
-        for obj in queryset:
-            html = render_to_string("dienst/pdf.html", {"obj": obj})
-            pdf = _render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
-            total_sent += send_mail_with_pdf_to_active(
-                subject="Neue Dienstliste eingegangen",
-                body_text="Automatische Nachricht: Eine neue Dienstliste wurde erfasst.",
-                pdf_bytes=pdf,
-                filename=f"Dienst_{obj.nummer_formatiert}.pdf",
-                fail_silently=False,
-            )
-        messages.success(request, f"E-Mails erneut versendet für {queryset.count()} Dienst(e) (Summe Empfänger: {total_sent}).")
-
-    actions = ["action_resend_mail"]
+        if not get_all_active_recipients():
+            messages.warning(request, "Keine aktiven Mail-Empfänger hinterlegt – nichts versendet.")
+            return
+        gruppe = auftraege.enqueue_many(
+            "dienst.services.mail_dienst_pdf",
+            queryset,
+            bezeichnung=f"Mail erneut senden: {queryset.count()} Dienste",
+            user=request.user,
+        )
+        messages.success(request, "Versand wird im Hintergrund vorbereitet.")
+        return HttpResponseRedirect(reverse("admin:core_sammelauftrag_fortschritt", args=[gruppe.pk]))
+
+    @admin.action(description="PDFs als ZIP herunterladen")
+    def action_export_zip(self, request, queryset):
+        if keyset.approx_count(queryset, settings.EXPORT_ZIP_MAX_BERICHTE)[1]:
+            return zip_response(iter_dienst_zip(queryset), "Dienste.zip")
+        # große Auswahl: PDFs rendert der auftrag_worker vorab in den PDF-Cache, der Download
+        # (Link auf der Fortschrittsseite) braucht danach keinen Prozess-Pool im Request
+        gruppe = auftraege.enqueue_many(
+            "dienst.services.cache_dienst_pdf",
+            queryset,
+            bezeichnung=f"ZIP-Export: {queryset.count()} Dienste",
+            user=request.user,
+        )
+        messages.success(request, "PDFs werden im Hintergrund vorbereitet – danach steht hier der ZIP-Download bereit.")
+        return HttpResponseRedirect(reverse("admin:core_sammelauftrag_fortschritt", args=[gruppe.pk]))
+
+    # wie "erneut senden": Rendern übernimmt der auftrag_worker, der Request kehrt sofort zurück
+    @admin.action(description="Archiv-PDF neu erzeugen (nach Korrektur)")
+    def action_rearchive_pdf(self, request, queryset):
+        gruppe = auftraege.enqueue_many(
+            "dienst.services.rearchive_dienst_pdf",
+            queryset,
+            bezeichnung=f"Archiv-PDF neu erzeugen: {queryset.count()} Dienste",
+            user=request.user,
+        )
+        messages.success(request, "Archiv-PDFs werden im Hintergrund neu erzeugt.")
+        return HttpResponseRedirect(reverse("admin:core_sammelauftrag_fortschritt", args=[gruppe.pk]))
+
+    actions = ["action_resend_mail", "action_export_zip", "action_rearchive_pdf"]
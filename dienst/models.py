@@ -1,8 +1,7 @@
 # dienst/models.py
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Sum
-from core.models import Mitglied, Fahrzeug, Abrollbehaelter, Anhaenger
+from core.models import BerichtQuerySet, Mitglied, Fahrzeug, Abrollbehaelter, Anhaenger
 
 class Dienst(models.Model):
     year = models.PositiveIntegerField(editable=False)
@@ -18,6 +17,22 @@ class Dienst(models.Model):
     anhaenger = models.ManyToManyField(Anhaenger, through="DienstAnhaenger", blank=True)
     teilnahmen = models.ManyToManyField(Mitglied, through="DienstTeilnahme", related_name="dienst_teilnahmen", blank=True)
 
+    # Änderungsstempel für ETag/If-None-Match; Zeilen-Änderungen setzen ihn per Signal (touch)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Archiviertes (eingefrorenes) PDF, siehe pdfs.archive
+    pdf_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    pdf_archiviert_am = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Gespeicherte Kennzahlen (aktualisiert per Signal in derselben Transaktion, siehe
+    # core.services.statistik; Backfill/Prüfung: manage.py rebuild_stats)
+    stat_teilnehmer = models.PositiveIntegerField(default=0, editable=False)
+    stat_hauptamtlich = models.PositiveIntegerField(default=0, editable=False)
+    stat_kilometer = models.PositiveIntegerField(default=0, editable=False)
+    stat_fahrzeugstunden = models.DecimalField(max_digits=9, decimal_places=2, default=0, editable=False)
+
+    objects = BerichtQuerySet.as_manager()
+
     class Meta:
         constraints = [models.UniqueConstraint(fields=["year", "seq"], name="unique_dienst_year_seq")]
         ordering = ["-year", "-seq"]
@@ -30,13 +45,14 @@ class Dienst(models.Model):
         if self.start_dt and self.ende_dt and self.start_dt >= self.ende_dt:
             raise ValidationError("Ende muss nach Beginn liegen.")
 
+    # Kennzahlen: Annotation aus with_stats() (live_*), sonst die gespeicherten Spalten (stat_*)
     @property
     def teilnehmer_anzahl(self):
-        return self.dienstteilnahme_set.count()
+        return getattr(self, "live_teilnehmer", self.stat_teilnehmer)
 
     @property
     def teilnehmer_hauptamtlich(self):
-        return self.dienstteilnahme_set.filter(mitglied__hauptamtlich=True).count()
+        return getattr(self, "live_hauptamtlich", self.stat_hauptamtlich)
 
     @property
     def teilnehmer_ehrenamtlich(self):
@@ -55,15 +71,11 @@ class Dienst(models.Model):
 
     @property
     def summe_kilometer(self):
-        df_km = self.dienstfahrzeug_set.aggregate(s=Sum("kilometer"))["s"] or 0
-        da_km = self.dienstanhaenger_set.aggregate(s=Sum("kilometer"))["s"] or 0
-        return (df_km or 0) + (da_km or 0)
+        return getattr(self, "live_kilometer", self.stat_kilometer)
 
     @property
     def summe_fahrzeugstunden(self):
-        df_st = self.dienstfahrzeug_set.aggregate(s=Sum("stunden"))["s"] or 0
-        da_st = self.dienstanhaenger_set.aggregate(s=Sum("stunden"))["s"] or 0
-        return float(df_st or 0) + float(da_st or 0)
+        return float(getattr(self, "live_fahrzeugstunden", self.stat_fahrzeugstunden) or 0)
 
 class DienstFahrzeug(models.Model):
     dienst = models.ForeignKey(Dienst, on_delete=models.CASCADE)
@@ -1,39 +1,80 @@
 # dienst/services.py
-from django.db import transaction
-from django.db.models import Max
 from django.utils import timezone
-from django.contrib.staticfiles import finders
-from weasyprint import HTML, CSS
+from django.template.loader import render_to_string
+
+from core.services import nummernkreis, postausgang
+from core.utils.files import safe_filename
+from pdfs import archive as pdf_archive
+from pdfs import cache as pdf_cache
+from pdfs import profiles as pdf_profiles
+from pdfs.engine import render_html_to_pdf_bytes  # zentrale WeasyPrint-Engine
+from pdfs.export import iter_pdfs, iter_zip
 
 from .models import Dienst
 
 def assign_running_number(instance):
+    """Vergibt year/seq über den Nummernkreis (core.services.nummernkreis)."""
+    nummernkreis.assign_running_number(instance)
+
+def render_dienst_html(obj) -> str:
+    return render_to_string("dienst/pdf.html", {"obj": obj})
+
+def render_dienst_pdf(obj, base_url=None, profile=None) -> bytes:
+    """
+    PDF zum Dienst – über den PDF-Cache (gleiches HTML + gleiche print.css + gleiches Profil = gleiches PDF).
+    """
+    html = render_dienst_html(obj)
+    return pdf_cache.get_or_render(
+        html,
+        lambda: render_html_to_pdf_bytes(html, base_url=base_url, profile=profile),
+        tag=pdf_cache.tag_for(obj),
+        profile=profile,
+    )
+
+def render_dienst_pdf_by_pk(pk: int) -> bytes:
+    """Pool-Aufgabe: PDF zu einem Dienst (nutzt und füllt den gemeinsamen PDF-Cache)."""
+    return render_dienst_pdf(Dienst.objects.get(pk=pk))
+
+def cache_dienst_pdf(obj) -> None:
+    """Hintergrundauftrag für große ZIP-Exporte: PDF vorab in den PDF-Cache rendern."""
+    render_dienst_pdf(obj)
+
+def iter_dienst_zip(queryset, processes=None):
+    """ZIP-Datenstrom mit je einem PDF pro Dienst (chronologisch)."""
+    objs = queryset.order_by("year", "seq")
+    entries = (
+        (safe_filename(f"Dienst_{obj.nummer_formatiert}.pdf"), data)
+        for obj, data in iter_pdfs(objs, render_dienst_html, render_dienst_pdf_by_pk, processes=processes)
+    )
+    return iter_zip(entries)
+
+def archive_dienst_pdf(obj, refresh: bool = False) -> bytes:
+    """
+    Eingefrorenes PDF zum Dienst (Mail-Profil): aus dem Archiv oder einmal rendern und archivieren.
+    refresh=True erzeugt es neu (z. B. nach einer Korrektur im Admin).
+    """
+    if not refresh and pdf_archive.is_archived(obj):
+        return pdf_archive.read(obj)
+    pdf_bytes = render_dienst_pdf(obj, profile=pdf_profiles.mail_profile())
+    pdf_archive.store(obj, pdf_bytes)
+    return pdf_bytes
+
+def rearchive_dienst_pdf(obj) -> None:
+    """Hintergrundauftrag (Admin-Sammelaktion): Archiv-PDF nach einer Korrektur neu erzeugen."""
+    archive_dienst_pdf(obj, refresh=True)
+
+def mail_dienst_pdf(obj) -> int:
     """
-    Vergibt eine laufende Nummer pro Jahr (seq) transaktional – nur für Dienst.
+    Hintergrundauftrag nach Neuanlage: PDF archivieren und die Mail in den Postausgang legen.
+    Versand (mit Wiederholungen) übernimmt manage.py mail_worker. Liefert die Anzahl Empfänger.
     """
-    if getattr(instance, "year", None) and getattr(instance, "seq", None):
-        return
-    with transaction.atomic():
-        # Jahr aus start_dt ableiten, falls gesetzt
-        year = None
-        try:
-            if getattr(instance, "start_dt", None):
-                year = instance.start_dt.year
-        except Exception:
-            year = None
-        if not year:
-            year = timezone.now().year
-        max_seq = Dienst.objects.select_for_update().filter(year=year).aggregate(Max("seq"))["seq__max"] or 0
-        instance.year = year
-        instance.seq = max_seq + 1
-
-def render_html_to_pdf_bytes(html: str, base_url=None, extra_css_paths: list[str] | None = None) -> bytes:
-    stylesheets = []
-    css_path = finders.find('css/print.css')
-    if css_path:
-        stylesheets.append(CSS(filename=css_path))
-    if extra_css_paths:
-        for p in extra_css_paths:
-            if p:
-                stylesheets.append(CSS(filename=p))
-    return HTML(string=html, base_url=base_url).write_pdf(stylesheets=stylesheets or None)
+    archive_dienst_pdf(obj)
+    item = postausgang.enqueue_pdf_to_active(
+        subject="Neue Dienstliste eingegangen",
+        body_text="Automatische Nachricht: Eine neue Dienstliste wurde erfasst.",
+        anhang_pfad=pdf_archive.relative_path(obj),
+        filename=safe_filename(f"Dienst_{obj.nummer_formatiert}.pdf"),
+        obj=obj,
+        kurztext=f"Dienst {obj.nummer_formatiert} · {timezone.localtime(obj.start_dt):%d.%m.%Y %H:%M} · {obj.titel}",
+    )
+    return len(item.bcc) if item else 0
@@ -0,0 +1,108 @@
+# dienst/signals.py
+import threading
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from core.models import Mitglied
+from core.services import jahresuebersicht, statistik
+from pdfs import cache as pdf_cache
+
+from .models import (
+    Dienst,
+    DienstFahrzeug,
+    DienstAbrollbehaelter,
+    DienstAnhaenger,
+    DienstTeilnahme,
+)
+
+# Alle Modelle, die am Dienst hängen und im PDF erscheinen
+DIENST_CHILD_MODELS = (
+    DienstFahrzeug,
+    DienstAbrollbehaelter,
+    DienstAnhaenger,
+    DienstTeilnahme,
+)
+
+# Zeilen, aus denen die gespeicherten Kennzahlen (stat_*) berechnet werden
+DIENST_STAT_MODELS = (DienstTeilnahme, DienstFahrzeug, DienstAnhaenger)
+
+_local = threading.local()
+
+
+def _dienst_changed(sender, instance, **kwargs):
+    pdf_cache.invalidate(pdf_cache.tag_for(instance))
+
+
+def _dienst_pre_delete(sender, instance, **kwargs):
+    _geloescht().add(instance.pk)
+
+
+def _dienst_post_delete(sender, instance, **kwargs):
+    _geloescht().discard(instance.pk)
+
+
+def _geloescht() -> set:
+    # Dienst-pks, deren Löschung gerade läuft (pre_delete bis post_delete, je Thread)
+    pks = getattr(_local, "geloescht", None)
+    if pks is None:
+        pks = _local.geloescht = set()
+    return pks
+
+
+def _child_changed(sender, instance, **kwargs):
+    pk = instance.dienst_id
+    if pk in _geloescht():
+        return  # Kaskade beim Löschen des Dienstes: _dienst_changed invalidiert einmal für alle Zeilen
+    statistik.danach(("dienst_pdf", pk), lambda: _bericht_geaendert(pk))
+
+
+def _bericht_geaendert(pk):
+    pdf_cache.invalidate(pdf_cache.tag_for_pk(Dienst, pk))
+    Dienst.objects.filter(pk=pk).touch()
+
+
+def _dienst_saved_stats(sender, instance, **kwargs):
+    statistik.refresh(Dienst, [instance.pk])
+
+
+def _stat_child_changed(sender, instance, **kwargs):
+    if instance.dienst_id not in _geloescht():
+        statistik.refresh(Dienst, [instance.dienst_id])
+
+
+def _mitglied_saved(sender, instance, **kwargs):
+    # "hauptamtlich" fließt in die Kennzahlen aller Berichte des Mitglieds ein
+    pks = list(DienstTeilnahme.objects.filter(mitglied=instance).values_list("dienst_id", flat=True))
+    statistik.refresh(Dienst, pks)
+    # Name/Status erscheinen in Detailseite und PDF
+    Dienst.objects.filter(pk__in=pks).touch()
+
+
+def _dienst_created_or_deleted(sender, instance, created=True, **kwargs):
+    # Jahresübersicht (Startseite, Jahres-Tabs) hängt nur an Anlegen/Löschen
+    if created:
+        jahresuebersicht.invalidate("dienst")
+
+
+def connect():
+    for signal in (post_save, post_delete):
+        signal.connect(_dienst_changed, sender=Dienst, dispatch_uid=f"dienst_pdf_cache_{signal is post_save}")
+        for model in DIENST_CHILD_MODELS:
+            signal.connect(
+                _child_changed,
+                sender=model,
+                dispatch_uid=f"dienst_pdf_cache_{model.__name__}_{signal is post_save}",
+            )
+        for model in DIENST_STAT_MODELS:
+            signal.connect(
+                _stat_child_changed,
+                sender=model,
+                dispatch_uid=f"dienst_stats_{model.__name__}_{signal is post_save}",
+            )
+    post_save.connect(_dienst_saved_stats, sender=Dienst, dispatch_uid="dienst_stats")
+    # vor der Kaskade, damit die Zeilen-Signale den gelöschten Dienst überspringen
+    pre_delete.connect(_dienst_pre_delete, sender=Dienst, dispatch_uid="dienst_loeschen")
+    post_delete.connect(_dienst_post_delete, sender=Dienst, dispatch_uid="dienst_loeschen_ende")
+    post_save.connect(_mitglied_saved, sender=Mitglied, dispatch_uid="dienst_stats_mitglied")
+    post_save.connect(_dienst_created_or_deleted, sender=Dienst, dispatch_uid="dienst_jahresuebersicht")
+    post_delete.connect(_dienst_created_or_deleted, sender=Dienst, dispatch_uid="dienst_jahresuebersicht_delete")
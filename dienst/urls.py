@@ -7,6 +7,7 @@ urlpatterns = [
     path("neu", views.dienst_neu, name="dienst_neu"),
     path("<int:pk>", views.dienst_detail, name="dienst_detail"),
     path("<int:pk>/pdf", views.dienst_pdf, name="dienst_pdf"),
+    path("export.zip", views.dienst_export_zip, name="dienst_export_zip"),
     path("htmx/fahrzeug/add", views.htmx_add_fahrzeug, name="dienst_htmx_add_fahrzeug"),
     path("htmx/abroll/add", views.htmx_add_abroll, name="dienst_htmx_add_abroll"),  # neu
     path("htmx/anhaenger/add", views.htmx_add_anhaenger, name="dienst_htmx_add_anhaenger"),
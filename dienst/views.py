@@ -6,24 +6,24 @@ from django.db.models import Max
 from django.forms import inlineformset_factory, NumberInput, Select, TextInput, CheckboxInput
 from django.forms import formset_factory  # neu
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
-from django.core.paginator import Paginator
 from django.db.models import Q
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.conf import settings
-from django.templatetags.static import static
-from weasyprint import HTML, CSS
-from django.contrib.staticfiles import finders
 from django.http import HttpResponse
+from core.utils import conditional, htmx, keyset
 from core.utils.files import safe_filename
+from pdfs import archive as pdf_archive, cache as pdf_cache, profiles as pdf_profiles
+from pdfs.export import zip_response
 
 from core.models import Mitglied                     # neu
 from core.forms import TeilnahmeAlleMitgliederForm   # neu
-from core.services.mail import send_mail_with_pdf_to_active
+from core.services import auftraege, jahresuebersicht, nummernkreis, postausgang, statistik, teilnahme
 
-from .services import assign_running_number, render_html_to_pdf_bytes
+from .services import iter_dienst_zip, render_dienst_pdf
 
 from .models import (
     Dienst,
@@ -120,47 +120,22 @@ def dienst_neu(request):
         tn_formset = TeilnahmeFS(request.POST, prefix="tn")
 
         if form.is_valid() and fv_formset.is_valid() and ab_formset.is_valid() and an_formset.is_valid() and tn_formset.is_valid():
-            with transaction.atomic():
+            # Kennzahlen (stat_*) einmal am Ende statt je gespeicherter Zeile neu berechnen
+            with transaction.atomic(), statistik.gesammelt():
                 d = form.save(commit=False)
-                assign_running_number(d); d.full_clean(); d.save()
+                nummernkreis.save_with_number(d)
 
                 fv_formset.instance = d; fv_formset.save()
                 ab_formset.instance = d; ab_formset.save()
                 an_formset.instance = d; an_formset.save()
 
-                members = {m.id: m for m in Mitglied.objects.all()}
-                existing = {t.mitglied_id: t for t in d.dienstteilnahme_set.all()}
-                for cd in tn_formset.cleaned_data:
-                    mid = cd["mitglied_id"]
-                    selected = bool(cd.get("selected"))
-                    funk = cd.get("fahrzeug_funktion") or ""
-                    agt_min = cd.get("agt_minuten")
-                    is_agt = bool(members.get(mid) and members[mid].agt)
-
-                    if selected:
-                        obj = existing.get(mid) or DienstTeilnahme(dienst=d, mitglied_id=mid)
-                        obj.fahrzeug_funktion = funk
-                        obj.agt_minuten = agt_min if is_agt and agt_min is not None else None
-                        obj.full_clean(); obj.save()
-                    else:
-                        if mid in existing:
-                            existing[mid].delete()
-
-            css_url = request.build_absolute_uri(static('css/print.css'))
-            html = render_to_string("dienst/pdf.html", {"obj": d, "print_css_url": css_url})
-            pdf_bytes = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
-            try:
-                send_mail_with_pdf_to_active(
-                    subject="Neue Dienstliste eingegangen",
-                    body_text="Automatische Nachricht: Eine neue Dienstliste wurde erfasst.",
-                    pdf_bytes=pdf_bytes,
-                    filename=f"Dienst_{d.nummer_formatiert}.pdf",
-                    fail_silently=False,
-                )
-            except Exception:
-                import logging
-                logging.getLogger(__name__).exception("Mailversand Dienst %s fehlgeschlagen", d.nummer_formatiert)
-                messages.warning(request, "Dienst gespeichert, aber E-Mail-Versand fehlgeschlagen. Bitte Admin informieren.")
+                # Teilnahme: eine Mitglieder-Abfrage, Schreiben per bulk_create/bulk_update
+                teilnahme.speichern(d, DienstTeilnahme, tn_formset.cleaned_data)
+
+                # PDF + Mail laufen im Hintergrund (manage.py auftrag_worker)
+                auftraege.enqueue("dienst.services.mail_dienst_pdf", d)
+
+            messages.success(request, f"Dienst {d.nummer_formatiert} gespeichert. PDF und E-Mail werden im Hintergrund erstellt.")
             return redirect(reverse("dienst_detail", args=[d.id]))
         else:
             members_active = list(Mitglied.objects.filter(jugendfeuerwehr=False).order_by("name", "vorname"))
@@ -206,40 +181,146 @@ def dienst_neu(request):
         "tn_rows_jf": tn_rows_jf,
     })
 
+def _dienst_badges(request, obj):
+    # PDF-Auftrag und Mail je Request einmal – ETag und Detailseite zeigen denselben Stand
+    if not hasattr(request, "_badges"):
+        request._badges = (auftraege.latest_for(obj), postausgang.latest_for(obj))
+    return request._badges
+
+
+def _dienst_detail_etag(request, pk: int):
+    # Bericht + Stand von PDF-Auftrag und Mail (Badges auf der Detailseite)
+    row = Dienst.objects.filter(pk=pk).values_list("updated_at", "pdf_sha256").first()
+    if row is None:
+        return None
+    auftrag, mail = _dienst_badges(request, Dienst(pk=pk))
+    return conditional.page_etag(
+        request, "dienst_detail", pk, *row, conditional.app_version(), conditional.stammdaten_version(),
+        auftrag and (auftrag.pk, auftrag.status, auftrag.aktualisiert_am),
+        postausgang.stand(mail),
+    )
+
+
+def _dienst_pdf_stand(request, pk: int):
+    # je Request einmal; archiviert nur, wenn auch die Datei da ist – sonst rendert die View neu
+    if not hasattr(request, "_pdf_stand"):
+        obj = Dienst.objects.only("pk", "year", "updated_at", "pdf_sha256", "pdf_archiviert_am").filter(pk=pk).first()
+        request._pdf_stand = (obj, obj is not None and pdf_archive.is_archived(obj))
+    return request._pdf_stand
+
+
+def _dienst_pdf_etag(request, pk: int):
+    obj, archiviert = _dienst_pdf_stand(request, pk)
+    if obj is None:
+        return None
+    # archiviertes PDF: dasselbe ETag wie pdfs.archive.serve
+    if archiviert:
+        return obj.pdf_sha256
+    # frisch gerendert: hängt auch an Stammdaten-Namen, print.css und Templates
+    return conditional.fingerprint(
+        "dienst_pdf", pk, obj.updated_at.isoformat(), pdf_profiles.signature(), pdf_cache.print_css_version(),
+        conditional.app_version(), conditional.stammdaten_version(),
+    )
+
+
+def _dienst_pdf_last_modified(request, pk: int):
+    obj, archiviert = _dienst_pdf_stand(request, pk)
+    if obj is None:
+        return None
+    return obj.pdf_archiviert_am if archiviert else obj.updated_at
+
+
+def _dienst_liste_stand(request) -> tuple:
+    # neue/gelöschte Berichte (Jahresübersicht), jede Änderung an einem Bericht (updated_at),
+    # Stammdaten-Namen und Templates; je Request einmal – ETag und Fragment-Cache verwenden
+    # denselben Stand, damit ein neues ETag nie mit einem veralteten Fragment ausgeliefert wird
+    if not hasattr(request, "_liste_stand"):
+        request._liste_stand = (
+            jahresuebersicht.version("dienst"), Dienst.objects.aggregate(stand=Max("updated_at"))["stand"],
+            conditional.app_version(), conditional.stammdaten_version(),
+        )
+    return request._liste_stand
+
+
+def _dienst_liste_etag(request):
+    return conditional.page_etag(
+        request, "dienst_liste", *_dienst_liste_stand(request),
+        sorted(request.GET.lists()), htmx.is_partial(request),
+    )
+
+
 @login_required
+@condition(etag_func=_dienst_detail_etag)
+@cache_control(private=True, no_cache=True)
 def dienst_detail(request, pk: int):
     obj = get_object_or_404(Dienst, pk=pk)
-    return render(request, "dienst/detail.html", {"obj": obj})
+    auftrag, mail = _dienst_badges(request, obj)
+    return render(request, "dienst/detail.html", {"obj": obj, "auftrag": auftrag, "mail": mail})
 
 @login_required
+@condition(etag_func=_dienst_pdf_etag, last_modified_func=_dienst_pdf_last_modified)
+@cache_control(private=True, no_cache=True)
 def dienst_pdf(request, pk: int):
     obj = get_object_or_404(Dienst, pk=pk)
-    html = render_to_string("dienst/pdf.html", {"obj": obj})
-    pdf_bytes = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
+    if pdf_archive.is_archived(obj):
+        # eingefrorenes PDF (nach Versand) – mit ETag/Last-Modified bzw. per Webserver
+        return pdf_archive.serve(request, obj, f"Dienst_{obj.nummer_formatiert}.pdf")
+    pdf_bytes = render_dienst_pdf(obj, base_url=request.build_absolute_uri("/"))
     resp = HttpResponse(pdf_bytes, content_type="application/pdf")
     safe_name = safe_filename(f"Dienst_{obj.nummer_formatiert}.pdf")  # <-- safe
     resp["Content-Disposition"] = f'attachment; filename="{safe_name}"'
     return resp
 
-@login_required
-def dienst_liste(request):
+def _filtered_dienst_qs(request):
+    """Jahr-/Suchfilter der Dienstliste (auch für den ZIP-Export genutzt)."""
     q = request.GET.get("q", "").strip()
     year = request.GET.get("year", "").strip()
     qs = Dienst.objects.order_by("-year", "-seq")
-    years_qs = Dienst.objects.order_by("-year").values_list("year", flat=True).distinct()
-    years = [y for y in years_qs if y is not None]
     if year.isdigit():
         qs = qs.filter(year=int(year))
     if q:
         qs = qs.filter(Q(titel__icontains=q))
+    return qs, q, year
 
-    paginator = Paginator(qs, 20)
-    page_obj = paginator.get_page(request.GET.get("page"))
+@login_required
+@condition(etag_func=_dienst_liste_etag)
+@cache_control(private=True, no_cache=True)
+def dienst_liste(request):
+    qs, q, year = _filtered_dienst_qs(request)
+    years = jahresuebersicht.years("dienst")
+
+    def context():
+        # Blättern per Cursor über (year, seq); Kennzahlen der Seite per Unterabfrage in derselben Query
+        page_obj = keyset.paginate(
+            qs.with_stats(), ("-year", "-seq"),
+            nach=request.GET.get("nach", ""), vor=request.GET.get("vor", ""),
+            per_page=20, count_cap=settings.LISTE_ANZAHL_OBERGRENZE,
+        )
+        return {"page_obj": page_obj, "q": q, "year": year, "years": years}
+
+    if htmx.is_partial(request):
+        # Suche während der Eingabe: nur Ergebnis + Jahres-Tabs (out-of-band), kurz gecacht
+        key = htmx.cache_key("dienst_liste", conditional.fingerprint(*_dienst_liste_stand(request)), request.GET)
+        return htmx.partial_response(request, "dienst/_liste.html", lambda: {**context(), "oob": True}, key)
+    return htmx.vary(render(request, "dienst/list.html", context()))
 
-    return render(request, "dienst/list.html", {
-        "page_obj": page_obj, "q": q, "year": year,
-        "years": years,
-    })
+@login_required
+def dienst_export_zip(request):
+    """ZIP mit den PDFs der angehakten Dienste (?id=…) bzw. der aktuell gefilterten Liste."""
+    qs, q, year = _filtered_dienst_qs(request)
+    ids = [i for i in request.GET.getlist("id") if i.isdigit()]
+    if ids:
+        qs = qs.filter(pk__in=ids)
+    limit = settings.EXPORT_ZIP_MAX_BERICHTE
+    if not keyset.approx_count(qs, limit)[1]:
+        # Rendern läuft im gunicorn-Worker (Timeout) – große Auswahl im Hintergrund über den Admin
+        return HttpResponse(
+            f"Mehr als {limit} Dienste: bitte Auswahl eingrenzen oder den ZIP-Export in der "
+            "Verwaltung starten (die PDFs werden dort im Hintergrund vorbereitet).",
+            status=413, content_type="text/plain; charset=utf-8",
+        )
+    name = f"Dienste_{year}.zip" if year.isdigit() else "Dienste.zip"
+    return zip_response(iter_dienst_zip(qs), name)
 
 # ---------- HTMX Add-Row ----------
 
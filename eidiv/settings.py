@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Projektbasis und .env
@@ -53,6 +54,89 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Media (Uploads); im PDF lokal von Platte aufgelöst
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# PDF-Cache (gerenderte Berichte auf Platte, gemeinsam für alle Worker, LRU nach Größe)
+PDF_CACHE_ENABLED = os.environ.get("PDF_CACHE_ENABLED", "1") == "1"
+PDF_CACHE_DIR = Path(os.environ.get("PDF_CACHE_DIR", BASE_DIR / "var" / "pdf_cache"))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_MB", "200")) * 1024 * 1024
+# PDF-Engine beim Worker-Start vorwärmen (eidiv/wsgi.py)
+PDF_WARMUP = os.environ.get("PDF_WARMUP", "1") == "1"
+# Basis-URL für relative Links im PDF-Template, wenn kein Request vorliegt.
+# /static/ und /media/ werden ohnehin lokal von Platte gelesen (pdfs.fetcher).
+PDF_BASE_URL = os.environ.get("PDF_BASE_URL", SITE_URL or "http://localhost/")
+
+# PDF-Ausgabeprofile (Optionen für WeasyPrint write_pdf). WeasyPrint bettet Schriften ohnehin als
+# Teilmenge ein und komprimiert Streams; "kompakt" optimiert und verkleinert zusätzlich Rasterbilder.
+# Vergleich: manage.py bench_pdf --profile standard --profile kompakt
+PDF_PROFILES = {
+    "standard": {},
+    "kompakt": {
+        "full_fonts": False,
+        "uncompressed_pdf": False,
+        "optimize_images": True,
+        "jpeg_quality": int(os.environ.get("PDF_KOMPAKT_JPEG_QUALITY", "70")),
+        "dpi": int(os.environ.get("PDF_KOMPAKT_DPI", "150")),
+    },
+}
+PDF_PROFILE_DEFAULT = "standard"
+# Profil für Mail-Anhänge (und damit auch für das archivierte PDF)
+PDF_MAIL_PROFILE = os.environ.get("PDF_MAIL_PROFILE", "kompakt")
+
+# Archiv: eingefrorenes PDF je Einsatz/Dienst (wird beim Versand nach Neuanlage geschrieben)
+PDF_ARCHIVE_DIR = Path(os.environ.get("PDF_ARCHIVE_DIR", BASE_DIR / "var" / "pdf_archiv"))
+# Auslieferung durch den Webserver statt Python: "" (aus), "x-accel" (nginx) oder "x-sendfile" (Apache/lighttpd)
+PDF_ARCHIVE_SENDFILE = os.environ.get("PDF_ARCHIVE_SENDFILE", "").strip().lower()
+# nginx: interne Location, die auf PDF_ARCHIVE_DIR zeigt (location /_pdf_archiv/ { internal; alias …; })
+PDF_ARCHIVE_ACCEL_PREFIX = os.environ.get("PDF_ARCHIVE_ACCEL_PREFIX", "/_pdf_archiv/")
+
+# Prozess-Pool für PDF-Rendering außerhalb des Requests (Standard: CPU-Kerne - 1)
+PDF_POOL_PROCESSES = int(os.environ.get("PDF_POOL_PROCESSES", "0")) or None
+# Einsatzbuch im Browser: läuft synchron im gunicorn-Worker (--timeout 120) – größere Auswahl
+# nur über manage.py einsatzbuch
+EINSATZBUCH_MAX_EINSAETZE = int(os.environ.get("EINSATZBUCH_MAX_EINSAETZE", "300"))
+# ZIP-Export im Request ebenso begrenzt – größere Auswahl rendert der auftrag_worker vorab
+# (Admin-Aktion "PDFs als ZIP herunterladen"), der Download kommt dann aus dem PDF-Cache
+EXPORT_ZIP_MAX_BERICHTE = int(os.environ.get("EXPORT_ZIP_MAX_BERICHTE", "300"))
+
+# Hintergrundaufträge (manage.py auftrag_worker): Wiederholungen mit exponentiellem Backoff
+AUFTRAG_MAX_VERSUCHE = int(os.environ.get("AUFTRAG_MAX_VERSUCHE", "5"))
+AUFTRAG_RETRY_BASIS_SEKUNDEN = int(os.environ.get("AUFTRAG_RETRY_BASIS_SEKUNDEN", "60"))
+
+# Postausgang (manage.py mail_worker): Wiederholungen mit Backoff, begrenzte Parallelität
+MAIL_MAX_VERSUCHE = int(os.environ.get("MAIL_MAX_VERSUCHE", "8"))
+MAIL_RETRY_BASIS_SEKUNDEN = int(os.environ.get("MAIL_RETRY_BASIS_SEKUNDEN", "60"))
+MAIL_WORKER_THREADS = int(os.environ.get("MAIL_WORKER_THREADS", "2"))
+# Sammelmail statt Einzelmails für diese Stichwort-Kategorien (brand, thl, abc, info, sonstig;
+# "dienst" für Dienstberichte). Alle übrigen werden weiterhin sofort versendet.
+MAIL_SAMMEL_KATEGORIEN = split_csv("MAIL_SAMMEL_KATEGORIEN")
+# Sammelfenster: so lange nach dem ersten vorgemerkten Bericht wird gesammelt (1440 = täglich)
+MAIL_SAMMEL_FENSTER_MINUTEN = int(os.environ.get("MAIL_SAMMEL_FENSTER_MINUTEN", "60"))
+
+# Django-Cache: dateibasiert, damit alle gunicorn- und Hintergrund-Worker denselben Stand sehen
+# (z. B. Mail-Empfänger, per Signal invalidiert)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_DIR", str(BASE_DIR / "var" / "cache")),
+        "KEY_PREFIX": "eidiv",
+        "TIMEOUT": 3600,
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    }
+}
+# Empfängertabelle höchstens so lange cachen (Sicherheitsnetz, falls eine Änderung am Signal vorbei geht)
+MAIL_EMPFAENGER_CACHE_SEKUNDEN = int(os.environ.get("MAIL_EMPFAENGER_CACHE_SEKUNDEN", "3600"))
+# Jahresübersicht (Startseite, Jahres-Tabs) höchstens so lange cachen (Sicherheitsnetz neben den Signalen)
+JAHRESUEBERSICHT_CACHE_SEKUNDEN = int(os.environ.get("JAHRESUEBERSICHT_CACHE_SEKUNDEN", "3600"))
+
+# Einsatz-/Dienstliste: Blättern per Cursor (ohne COUNT/OFFSET); Gesamtzahl nur bis zu dieser
+# Grenze zählen ("1000+ Einträge"), 0 = keine Gesamtzahl anzeigen
+LISTE_ANZAHL_OBERGRENZE = int(os.environ.get("LISTE_ANZAHL_OBERGRENZE", "1000"))
+# Suche während der Eingabe (HTMX): Ergebnisseiten so lange cachen, 0 = aus
+LISTE_CACHE_SEKUNDEN = int(os.environ.get("LISTE_CACHE_SEKUNDEN", "30"))
+
 # Proxy-Setup (NPM setzt X-Forwarded-Proto/Host)
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 USE_X_FORWARDED_HOST = True
@@ -117,10 +201,35 @@ WSGI_APPLICATION = 'eidiv.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite für mehrere gunicorn- und Hintergrund-Worker: PRAGMAs auf jeder neuen Verbindung
+# (WAL statt Rollback-Journal, Warten statt "database is locked"), Schreibtransaktionen als
+# BEGIN IMMEDIATE (kein Lock-Upgrade-Konflikt mitten in der Transaktion).
+# Effektive Werte prüfen: manage.py check --database default
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "wal"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "normal"),
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "cache_size": -int(os.environ.get("SQLITE_CACHE_MB", "32")) * 1024,  # negativ = KiB
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_MB", "128")) * 1024 * 1024,
+    "temp_store": "memory",
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Verbindungen je Worker wiederverwenden (PRAGMAs/mmap nicht bei jedem Request neu)
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ";".join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+        # Tests gegen eine Datei, damit WAL/busy_timeout wie im Betrieb greifen; je Prozess eine
+        # eigene, damit parallele Testläufe (z. B. zwei Checkouts) sich die Datei nicht löschen
+        'TEST': {'NAME': Path(tempfile.gettempdir()) / f'eidiv_test_{os.getpid()}.sqlite3'},
     }
 }
 
@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eidiv.settings')
 
 application = get_wsgi_application()
+
+# PDF-Engine pro Worker vorwärmen (print.css/Fonts laden), damit das erste PDF nicht hängt
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, "PDF_WARMUP", False):
+    import logging
+
+    try:
+        from pdfs.engine import warmup
+        warmup()
+    except Exception:
+        logging.getLogger(__name__).exception("PDF-Engine: Warmup fehlgeschlagen")
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.db import transaction
 from django.db.models import Max
 from django.utils import timezone
@@ -6,8 +8,6 @@ from django.urls import path, reverse
 from django.utils.html import format_html
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
-from django.template.loader import render_to_string
-from django.templatetags.static import static
 from core.utils.files import safe_filename
 
 from .models import (
@@ -23,10 +23,15 @@ from .models import (
     EinsatzTeilnahme,
 )
 
-# PDF-Renderer aus der App
-from .services import render_html_to_pdf_bytes
+# PDF-Renderer aus der App (mit PDF-Cache)
+from pdfs.export import zip_response
+
+from . import suche
+from .services import iter_einsatz_zip, mail_einsatz_pdf, render_einsatz_pdf, with_pdf_relations
 # Zentraler Mail-Service (alle Empfänger/BCC/Timeout etc.)
-from core.services.mail import send_mail_with_pdf_to_active
+from core.services import auftraege, statistik
+from core.utils import keyset
+from core.services.mail import get_all_active_recipients
 
 
 # Inlines
@@ -94,11 +99,22 @@ class EinsatzTeilnahmeInline(admin.TabularInline):
     fields = ("mitglied", "fahrzeug_funktion", "agt_minuten")
     autocomplete_fields = ("mitglied",)
 
+class EinsatzChangeList(ChangeList):
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        # Suche ohne gewählte Spalte: beste Treffer (such_rang aus einsatz.suche) zuerst
+        if "such_rang" in queryset.query.annotations and ORDER_VAR not in self.params:
+            ordering.insert(0, "such_rang")
+        return ordering
+
+
 @admin.register(Einsatz)
 class EinsatzAdmin(admin.ModelAdmin):
     date_hierarchy = "start_dt"
-    list_display = ("nummer_formatiert", "stichwort", "start_dt", "ende_dt", "einsatzgemeinde", "obj_actions")
+    list_display = ("nummer_formatiert", "stichwort", "start_dt", "ende_dt", "einsatzgemeinde", "personal", "summe_km", "obj_actions")
     list_filter = ("year", "stichwort__kategorie")
+    list_select_related = ("stichwort",)
+    # Suche über den Volltextindex (get_search_results); die Felder stehen auch dort
     search_fields = (
         "objektname",
         "strasse_hausnr",
@@ -109,7 +125,7 @@ class EinsatzAdmin(admin.ModelAdmin):
         "stichwort__bezeichnung",
         "stichwort__code",
     )
-    readonly_fields = ("year", "seq", "nummer_formatiert", "dauer_stunden")
+    readonly_fields = ("year", "seq", "nummer_formatiert", "dauer_stunden", "pdf_sha256", "pdf_archiviert_am")
     autocomplete_fields = ("stichwort", "einsatzleiter", "meldende_stelle")
 
     fieldsets = (
@@ -134,7 +150,7 @@ class EinsatzAdmin(admin.ModelAdmin):
         }),
         ("Maßnahmen/Material", {"fields": ("einsatzmassnahmen",)}),
         ("Nummer/Meta", {
-            "fields": ("year", "seq", "nummer_formatiert", "dauer_stunden"),
+            "fields": ("year", "seq", "nummer_formatiert", "dauer_stunden", "pdf_archiviert_am", "pdf_sha256"),
             "classes": ("collapse",),
         }),
     )
@@ -161,6 +177,33 @@ class EinsatzAdmin(admin.ModelAdmin):
         )
     obj_actions.short_description = "Aktionen"
 
+    def get_queryset(self, request):
+        # Kennzahlen der Liste per Unterabfrage in derselben Query (sortierbar)
+        return super().get_queryset(request).with_stats()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return suche.filter_queryset(queryset, search_term.strip()), False
+
+    def get_changelist(self, request, **kwargs):
+        return EinsatzChangeList
+
+    def personal(self, obj):
+        return obj.teilnehmer_anzahl
+    personal.short_description = "Personal"
+    personal.admin_order_field = "live_teilnehmer"
+
+    def summe_km(self, obj):
+        return obj.summe_kilometer
+    summe_km.short_description = "km"
+    summe_km.admin_order_field = "live_kilometer"
+
+    def save_related(self, request, form, formsets, change):
+        # Inlines: Kennzahlen (stat_*) einmal statt je Zeile neu berechnen
+        with statistik.gesammelt():
+            super().save_related(request, form, formsets, change)
+
     # Eigene Admin-URLs
     def get_urls(self):
         urls = super().get_urls()
@@ -172,44 +215,64 @@ class EinsatzAdmin(admin.ModelAdmin):
 
     # PDF inline anzeigen
     def view_pdf(self, request, pk: int, *args, **kwargs):
-        obj = get_object_or_404(Einsatz, pk=pk)
-        html = render_to_string("einsatz/pdf.html", {"obj": obj})
-        pdf = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
+        obj = get_object_or_404(with_pdf_relations(), pk=pk)
+        pdf = render_einsatz_pdf(obj, base_url=request.build_absolute_uri("/"))
         resp = HttpResponse(pdf, content_type="application/pdf")
         safe_name = safe_filename(f"Einsatz_{obj.nummer_formatiert}.pdf")  # <-- safe
         resp["Content-Disposition"] = f'inline; filename="{safe_name}"'
         return resp
 
-    # Mail erneut mit PDF-Anhang verschicken (zentraler Mail-Service)
+    # Mail erneut mit dem archivierten PDF verschicken (über den Postausgang, blockiert nicht auf SMTP)
     def resend_mail(self, request, pk: int, *args, **kwargs):
-        obj = get_object_or_404(Einsatz, pk=pk)
-        css_url = request.build_absolute_uri(static('css/print.css'))
-        html = render_to_string("einsatz/pdf.html", {"obj": obj})
-        pdf = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
-        sent = send_mail_with_pdf_to_active(
-            subject="Neue Einsatzliste eingegangen",
-            body_text="Automatische Nachricht: Eine neue Einsatzliste wurde erfasst.",
-            pdf_bytes=pdf,
-            filename=f"Einsatz_{obj.nummer_formatiert}.pdf",
-            fail_silently=False,  # im Admin Fehler anzeigen
-        )
-        messages.success(request, f"E-Mail für Einsatz {obj.nummer_formatiert} erneut versendet ({sent} Empfänger).")
+        obj = get_object_or_404(with_pdf_relations(), pk=pk)
+        n = mail_einsatz_pdf(obj)
+        if n:
+            messages.success(request, f"E-Mail für Einsatz {obj.nummer_formatiert} in den Postausgang gelegt ({n} Empfänger).")
+        else:
+            messages.warning(request, "Keine aktiven Mail-Empfänger hinterlegt – nichts versendet.")
         return HttpResponseRedirect(reverse("admin:einsatz_einsatz_change", args=[obj.pk]))
 
-    # Bulk-Action: Mails erneut senden
+    # Bulk-Action: Mails erneut senden – als Sammelauftrag im Hintergrund (auftrag_worker rendert
+    # die PDFs im Prozess-Pool, mail_worker versendet gebündelt); der Request kehrt sofort zurück.
     @admin.action(description="PDF per Mail erneut senden")
     def action_resend_mail(self, request, queryset):
-        total_sent = 0
-        for obj in queryset:
-            html = render_to_string("einsatz/pdf.html", {"obj": obj})
-            pdf = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
-            total_sent += send_mail_with_pdf_to_active(
-                subject="Neue Einsatzliste eingegangen",
-                body_text="Automatische Nachricht: Eine neue Einsatzliste wurde erfasst.",
-                pdf_bytes=pdf,
-                filename=f"Einsatz_{obj.nummer_formatiert}.pdf",
-                fail_silently=False,
-            )
-        messages.success(request, f"E-Mails erneut versendet für {queryset.count()} Einsatz(e) (Summe Empfänger: {total_sent}).")
-
-    actions = ["action_resend_mail"]
+        if not get_all_active_recipients():
+            messages.warning(request, "Keine aktiven Mail-Empfänger hinterlegt – nichts versendet.")
+            return
+        gruppe = auftraege.enqueue_many(
+            "einsatz.services.mail_einsatz_pdf",
+            queryset,
+            bezeichnung=f"Mail erneut senden: {queryset.count()} Einsätze",
+            user=request.user,
+        )
+        messages.success(request, "Versand wird im Hintergrund vorbereitet.")
+        return HttpResponseRedirect(reverse("admin:core_sammelauftrag_fortschritt", args=[gruppe.pk]))
+
+    @admin.action(description="PDFs als ZIP herunterladen")
+    def action_export_zip(self, request, queryset):
+        if keyset.approx_count(queryset, settings.EXPORT_ZIP_MAX_BERICHTE)[1]:
+            return zip_response(iter_einsatz_zip(queryset), "Einsaetze.zip")
+        # große Auswahl: PDFs rendert der auftrag_worker vorab in den PDF-Cache, der Download
+        # (Link auf der Fortschrittsseite) braucht danach keinen Prozess-Pool im Request
+        gruppe = auftraege.enqueue_many(
+            "einsatz.services.cache_einsatz_pdf",
+            queryset,
+            bezeichnung=f"ZIP-Export: {queryset.count()} Einsätze",
+            user=request.user,
+        )
+        messages.success(request, "PDFs werden im Hintergrund vorbereitet – danach steht hier der ZIP-Download bereit.")
+        return HttpResponseRedirect(reverse("admin:core_sammelauftrag_fortschritt", args=[gruppe.pk]))
+
+    # wie "erneut senden": Rendern übernimmt der auftrag_worker, der Request kehrt sofort zurück
+    @admin.action(description="Archiv-PDF neu erzeugen (nach Korrektur)")
+    def action_rearchive_pdf(self, request, queryset):
+        gruppe = auftraege.enqueue_many(
+            "einsatz.services.rearchive_einsatz_pdf",
+            queryset,
+            bezeichnung=f"Archiv-PDF neu erzeugen: {queryset.count()} Einsätze",
+            user=request.user,
+        )
+        messages.success(request, "Archiv-PDFs werden im Hintergrund neu erzeugt.")
+        return HttpResponseRedirect(reverse("admin:core_sammelauftrag_fortschritt", args=[gruppe.pk]))
+
+    actions = ["action_resend_mail", "action_export_zip", "action_rearchive_pdf"]
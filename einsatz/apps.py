@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EinsatzConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'einsatz'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
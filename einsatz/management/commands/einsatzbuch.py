@@ -0,0 +1,37 @@
+# einsatz/management/commands/einsatzbuch.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from einsatz import suche
+from einsatz.models import Einsatz
+from einsatz.services import write_einsatzbuch
+
+
+class Command(BaseCommand):
+    help = "Erzeugt das Einsatzbuch (ein Sammel-PDF) für ein Jahr, parallel gerendert."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Jahr (Standard: alle Einsätze)")
+        parser.add_argument("--q", default="", help="Suchbegriff wie in der Einsatzliste")
+        parser.add_argument("-o", "--output", help="Zieldatei (Standard: Einsatzbuch_<Jahr>.pdf)")
+        parser.add_argument("--processes", type=int, default=None, help="Anzahl Pool-Prozesse")
+        parser.add_argument("--chunk", type=int, default=None, help="Berichte pro Pool-Aufgabe")
+
+    def handle(self, *args, **opts):
+        qs = Einsatz.objects.all()
+        if opts["year"]:
+            qs = qs.filter(year=opts["year"])
+        q = opts["q"].strip()
+        if q:
+            # dieselbe Volltextsuche wie die Einsatzliste (Reihenfolge bleibt chronologisch)
+            qs = suche.filter_queryset(qs, q)
+        if not qs.exists():
+            raise CommandError("Keine Einsätze für diese Auswahl.")
+
+        output = opts["output"] or (f"Einsatzbuch_{opts['year']}.pdf" if opts["year"] else "Einsatzbuch.pdf")
+        started = time.perf_counter()
+        with open(output, "wb") as fh:
+            count = write_einsatzbuch(qs, fh, processes=opts["processes"], chunk_size=opts["chunk"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} Einsätze → {output} ({time.perf_counter() - started:.1f} s)"
+        ))
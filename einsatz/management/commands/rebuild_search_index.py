@@ -0,0 +1,20 @@
+# einsatz/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from einsatz import suche
+
+
+class Command(BaseCommand):
+    help = "Baut den Volltextindex der Einsatzsuche (FTS5, Tabelle einsatz_suche) neu auf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500, help="Einsätze je Schreibvorgang")
+
+    def handle(self, *args, **opts):
+        if not suche.available():
+            self.stdout.write(self.style.WARNING("Kein SQLite – die Suche nutzt icontains, kein Index nötig."))
+            return
+        with transaction.atomic():
+            total = suche.rebuild(batch=max(opts["batch"], 1))
+        self.stdout.write(self.style.SUCCESS(f"Suchindex für {total} Einsätze neu aufgebaut."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('einsatz', '0002_alter_einsatzteilnahme_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='einsatz',
+            name='pdf_archiviert_am',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='einsatz',
+            name='pdf_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
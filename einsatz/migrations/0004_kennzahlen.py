@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:44
+
+from django.db import migrations, models
+
+from core.services import statistik
+
+
+def kennzahlen_berechnen(apps, schema_editor):
+    # Bestand einmal aus den Zeilen berechnen – sonst zeigen alle Berichte 0 bis rebuild_stats
+    Einsatz = apps.get_model("einsatz", "Einsatz")
+    pks = list(Einsatz.objects.order_by("pk").values_list("pk", flat=True))
+    for i in range(0, len(pks), 500):
+        statistik.refresh(Einsatz, pks[i:i + 500])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('einsatz', '0003_pdf_archiv'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='einsatz',
+            name='stat_fahrzeugstunden',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='einsatz',
+            name='stat_hauptamtlich',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='einsatz',
+            name='stat_kilometer',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='einsatz',
+            name='stat_teilnehmer',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(kennzahlen_berechnen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Volltextindex (SQLite FTS5) für die Einsatzsuche, siehe einsatz/suche.py
+
+from django.db import migrations
+
+CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS einsatz_suche USING fts5("
+    "stichwort, objektname, einsatzgemeinde, strasse_hausnr, plz_ort, landkreis, einsatzmassnahmen, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+FILL = """
+INSERT INTO einsatz_suche (rowid, stichwort, objektname, einsatzgemeinde, strasse_hausnr, plz_ort, landkreis, einsatzmassnahmen)
+SELECT e.id,
+       COALESCE(s.code, '') || ' ' || COALESCE(s.bezeichnung, ''),
+       COALESCE(e.objektname, ''), COALESCE(e.einsatzgemeinde, ''), COALESCE(e.strasse_hausnr, ''),
+       COALESCE(e.plz_ort, ''), COALESCE(e.landkreis, ''), COALESCE(e.einsatzmassnahmen, '')
+FROM einsatz_einsatz e LEFT JOIN core_einsatzstichwort s ON s.id = e.stichwort_id
+"""
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE)
+    schema_editor.execute(FILL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS einsatz_suche")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('einsatz', '0004_kennzahlen'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
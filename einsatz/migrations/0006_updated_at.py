@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('einsatz', '0005_suche'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='einsatz',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -1,5 +1,4 @@
 from django.db import models
-from django.db.models import Sum, Q
 
 # Create your models here.
 # einsatz/models.py
@@ -8,7 +7,7 @@ from django.db import models
 from django.utils import timezone
 
 from core.models import (
-    Mitglied, Fahrzeug, Abrollbehaelter, Anhaenger, Zusatzstelle, Einsatzmittel,
+    BerichtQuerySet, Mitglied, Fahrzeug, Abrollbehaelter, Anhaenger, Zusatzstelle, Einsatzmittel,
     MeldendeStelle, Brandumfang, Brandausbreitung, Brandgut, Brandobjekt,
     Loeschwasserentnahmestelle, Schadensereignis, PersonenrettungTyp,
     Sicherheitswache, Fehlalarm, Sonstige, Ortsfeuerwehr, Einsatzstichwort
@@ -62,6 +61,21 @@ class Einsatz(models.Model):
     teilnahmen = models.ManyToManyField(Mitglied, through="EinsatzTeilnahme", related_name="einsatz_teilnahmen", blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Änderungsstempel für ETag/If-None-Match; Zeilen-Änderungen setzen ihn per Signal (touch)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Archiviertes (eingefrorenes) PDF, siehe pdfs.archive
+    pdf_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    pdf_archiviert_am = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Gespeicherte Kennzahlen (aktualisiert per Signal in derselben Transaktion, siehe
+    # core.services.statistik; Backfill/Prüfung: manage.py rebuild_stats)
+    stat_teilnehmer = models.PositiveIntegerField(default=0, editable=False)
+    stat_hauptamtlich = models.PositiveIntegerField(default=0, editable=False)
+    stat_kilometer = models.PositiveIntegerField(default=0, editable=False)
+    stat_fahrzeugstunden = models.DecimalField(max_digits=9, decimal_places=2, default=0, editable=False)
+
+    objects = BerichtQuerySet.as_manager()
 
     class Meta:
         constraints = [models.UniqueConstraint(fields=["year", "seq"], name="unique_einsatz_year_seq")]
@@ -93,13 +107,14 @@ class Einsatz(models.Model):
         if self.personenrettung_anzahl is not None and self.personenrettung_anzahl < 0:
             raise ValidationError("Personenrettung: Anzahl darf nicht negativ sein.")
     
+    # Kennzahlen: Annotation aus with_stats() (live_*), sonst die gespeicherten Spalten (stat_*)
     @property
     def teilnehmer_anzahl(self):
-        return self.einsatzteilnahme_set.count()
+        return getattr(self, "live_teilnehmer", self.stat_teilnehmer)
 
     @property
     def teilnehmer_hauptamtlich(self):
-        return self.einsatzteilnahme_set.filter(mitglied__hauptamtlich=True).count()
+        return getattr(self, "live_hauptamtlich", self.stat_hauptamtlich)
 
     @property
     def teilnehmer_ehrenamtlich(self):
@@ -112,16 +127,12 @@ class Einsatz(models.Model):
 
     @property
     def summe_kilometer(self):
-        ef_km = self.einsatzfahrzeug_set.aggregate(s=Sum("kilometer"))["s"] or 0
-        ea_km = self.einsatzanhaenger_set.aggregate(s=Sum("kilometer"))["s"] or 0
-        return (ef_km or 0) + (ea_km or 0)
+        return getattr(self, "live_kilometer", self.stat_kilometer)
 
     @property
     def summe_fahrzeugstunden(self):
-        ef_st = self.einsatzfahrzeug_set.aggregate(s=Sum("stunden"))["s"] or 0
-        ea_st = self.einsatzanhaenger_set.aggregate(s=Sum("stunden"))["s"] or 0
         # Decimal -> float für Anzeige ok
-        return float(ef_st or 0) + float(ea_st or 0)
+        return float(getattr(self, "live_fahrzeugstunden", self.stat_fahrzeugstunden) or 0)
 
 class EinsatzPerson(models.Model):
     TYP_CHOICES = [
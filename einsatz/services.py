@@ -1,58 +1,181 @@
 # einsatz/services.py
-from django.db import transaction
-from django.db.models import Max
+from django.db.models import Prefetch
 from django.utils import timezone
-from django.core.mail import EmailMessage
-from weasyprint import HTML, CSS
-from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
 
-from core.models import MailEmpfaenger
+from core.services import nummernkreis, postausgang
+from core.utils.files import safe_filename
+from pdfs import archive as pdf_archive
+from pdfs import cache as pdf_cache
+from pdfs import profiles as pdf_profiles
+from pdfs.engine import render_html_to_document, render_html_to_pdf_bytes, write_documents  # zentrale WeasyPrint-Engine
+from pdfs.export import iter_pdfs, iter_zip
+from pdfs.merge import write_combined_pdf
 
+from .models import (
+    Einsatz, EinsatzAbrollbehaelter, EinsatzAnhaenger, EinsatzEinsatzmittel, EinsatzFahrzeug,
+    EinsatzLoeschwasser, EinsatzOrtsfeuerwehr, EinsatzTeilnahme, EinsatzZusatzstelle,
+)
 
-def assign_running_number(instance, model_cls):
+
+def assign_running_number(instance, model_cls=None):
+    """Vergibt year/seq über den Nummernkreis (core.services.nummernkreis); model_cls ist nur noch aus Kompatibilität da."""
+    nummernkreis.assign_running_number(instance)
+
+
+# Alles, was einsatz/pdf.html anfasst – per JOIN bzw. je eine Prefetch-Query pro Relation
+_PDF_SELECT = (
+    "stichwort", "einsatzleiter", "meldende_stelle", "person",
+    "brandumfang", "brandausbreitung", "brandgut", "brandobjekt",
+    "schadensereignis", "personenrettung_typ", "sicherheitswache", "fehlalarm", "sonstige",
+)
+_PDF_PREFETCH = (
+    Prefetch("loeschwasser", queryset=EinsatzLoeschwasser.objects.select_related("entnahmestelle").order_by("pk")),
+    Prefetch("einsatzfahrzeug_set", queryset=EinsatzFahrzeug.objects.select_related("fahrzeug").order_by("pk")),
+    Prefetch("einsatzanhaenger_set", queryset=EinsatzAnhaenger.objects.select_related("anhaenger").order_by("pk")),
+    Prefetch("einsatzabrollbehaelter_set", queryset=EinsatzAbrollbehaelter.objects.select_related("abrollbehaelter").order_by("pk")),
+    Prefetch("einsatzortsfeuerwehr_set", queryset=EinsatzOrtsfeuerwehr.objects.select_related("ortsfeuerwehr").order_by("pk")),
+    Prefetch("einsatzzusatzstelle_set", queryset=EinsatzZusatzstelle.objects.select_related("zusatzstelle").order_by("pk")),
+    Prefetch("einsatzeinsatzmittel_set", queryset=EinsatzEinsatzmittel.objects.select_related("einsatzmittel").order_by("pk")),
+    Prefetch("einsatzteilnahme_set", queryset=EinsatzTeilnahme.objects.select_related("mitglied")),
+)
+
+
+def with_pdf_relations(queryset=None):
     """
-    Vergibt eine laufende Nummer pro Jahr (seq) transaktional.
-    model_cls ist die Modelklasse (z. B. Einsatz).
+    QuerySet mit allen Relationen für Bericht/PDF vorgeladen: feste Query-Anzahl,
+    unabhängig von der Zahl der Fahrzeuge und Teilnehmenden.
     """
-    if getattr(instance, "year", None) and getattr(instance, "seq", None):
-        return
-    with transaction.atomic():
-        # Jahr ableiten aus start_dt, falls vorhanden (z. B. bei Erfassung)
-        year = None
-        try:
-            if getattr(instance, "start_dt", None):
-                year = instance.start_dt.year
-        except Exception:
-            year = None
-        if not year:
-            year = timezone.now().year
-        max_seq = model_cls.objects.select_for_update().filter(year=year).aggregate(Max("seq"))["seq__max"] or 0
-        instance.year = year
-        instance.seq = max_seq + 1
+    qs = Einsatz.objects.all() if queryset is None else queryset
+    return qs.select_related(*_PDF_SELECT).prefetch_related(*_PDF_PREFETCH)
+
 
+def einsatz_stats(obj) -> dict:
+    """
+    Kennzahlen wie die Model-Properties (teilnehmer_anzahl, summe_kilometer, …),
+    aber aus den vorgeladenen Relationen statt mit je einer Aggregat-Query.
+    """
+    teilnahmen = obj.einsatzteilnahme_set.all()
+    fahrzeuge = obj.einsatzfahrzeug_set.all()
+    anhaenger = obj.einsatzanhaenger_set.all()
+    anzahl = len(teilnahmen)
+    hauptamtlich = sum(1 for t in teilnahmen if t.mitglied.hauptamtlich)
+    return {
+        "teilnehmer_anzahl": anzahl,
+        "teilnehmer_hauptamtlich": hauptamtlich,
+        "teilnehmer_ehrenamtlich": anzahl - hauptamtlich,
+        "gesamtstunden": round(obj.dauer_stunden * anzahl, 2),
+        "summe_kilometer": sum(f.kilometer or 0 for f in fahrzeuge) + sum(a.kilometer or 0 for a in anhaenger),
+        # wie summe_fahrzeugstunden: je Tabelle Decimal summieren, dann float
+        "summe_fahrzeugstunden": float(sum(f.stunden or 0 for f in fahrzeuge)) + float(sum(a.stunden or 0 for a in anhaenger)),
+    }
 
-def render_html_to_pdf_bytes(html: str, base_url=None, extra_css_paths: list[str] | None = None) -> bytes:
-    stylesheets = []
 
-    # print.css aus dem Static-Finder holen (funktioniert auch in Prod nach collectstatic)
-    css_path = finders.find('css/print.css')
-    if css_path:
-        stylesheets.append(CSS(filename=css_path))
+def einsatz_context(obj) -> dict:
+    """Template-Kontext für einsatz/pdf.html; lädt `obj` bei Bedarf einmal mit allen Relationen nach."""
+    if "einsatzteilnahme_set" not in getattr(obj, "_prefetched_objects_cache", {}):
+        obj = with_pdf_relations().get(pk=obj.pk)
+    teilnahmen = obj.einsatzteilnahme_set.all()
+    return {
+        "obj": obj,
+        "stats": einsatz_stats(obj),
+        "teilnahmen_aktive": [t for t in teilnahmen if not t.mitglied.jugendfeuerwehr],
+        "teilnahmen_jugend": [t for t in teilnahmen if t.mitglied.jugendfeuerwehr],
+    }
+
+
+def render_einsatz_html(obj) -> str:
+    return render_to_string("einsatz/pdf.html", einsatz_context(obj))
+
+
+def render_einsatz_pdf(obj, base_url=None, profile=None) -> bytes:
+    """
+    PDF zum Einsatz – über den PDF-Cache (gleiches HTML + gleiche print.css + gleiches Profil = gleiches PDF).
+    """
+    html = render_einsatz_html(obj)
+    return pdf_cache.get_or_render(
+        html,
+        lambda: render_html_to_pdf_bytes(html, base_url=base_url, profile=profile),
+        tag=pdf_cache.tag_for(obj),
+        profile=profile,
+    )
+
 
-    # optional weitere lokale CSS-Pfade akzeptieren
-    if extra_css_paths:
-        for p in extra_css_paths:
-            if p:
-                stylesheets.append(CSS(filename=p))
+def render_einsatz_pdf_by_pk(pk: int) -> bytes:
+    """Pool-Aufgabe: PDF zu einem Einsatz (nutzt und füllt den gemeinsamen PDF-Cache)."""
+    return render_einsatz_pdf(with_pdf_relations().get(pk=pk))
 
-    return HTML(string=html, base_url=base_url).write_pdf(stylesheets=stylesheets)
 
+def cache_einsatz_pdf(obj) -> None:
+    """Hintergrundauftrag für große ZIP-Exporte: PDF vorab in den PDF-Cache rendern."""
+    render_einsatz_pdf(obj)
 
-def send_mail_with_pdf(subject, body_text, pdf_bytes, filename):
-    recipients = list(MailEmpfaenger.objects.filter(aktiv=True).values_list("email", flat=True))
-    if not recipients:
-        return 0
-    msg = EmailMessage(subject=subject, body=body_text, to=recipients)
-    msg.attach(filename, pdf_bytes, "application/pdf")
-    return msg.send(fail_silently=True)
 
+def iter_einsatz_zip(queryset, processes=None):
+    """ZIP-Datenstrom mit je einem PDF pro Einsatz (chronologisch)."""
+    objs = with_pdf_relations(queryset.order_by("year", "seq")).iterator(chunk_size=50)
+    entries = (
+        (safe_filename(f"Einsatz_{obj.nummer_formatiert}.pdf"), data)
+        for obj, data in iter_pdfs(objs, render_einsatz_html, render_einsatz_pdf_by_pk, processes=processes)
+    )
+    return iter_zip(entries)
+
+
+def render_einsatz_chunk(pks: list[int], target_path: str) -> str:
+    """Pool-Aufgabe fürs Einsatzbuch: mehrere Einsätze layouten und seitenweise in eine Datei schreiben."""
+    by_pk = with_pdf_relations().in_bulk(pks)
+    documents = [
+        render_html_to_document(render_einsatz_html(by_pk[pk]))
+        for pk in pks if pk in by_pk
+    ]
+    write_documents(documents, target_path)
+    return target_path
+
+
+def write_einsatzbuch(queryset, target, processes=None, chunk_size=None) -> int:
+    """Sammel-PDF aller Einsätze im QuerySet (chronologisch) nach `target`. Liefert die Anzahl."""
+    pks = list(queryset.order_by("year", "seq").values_list("pk", flat=True))
+    kwargs = {"processes": processes}
+    if chunk_size:
+        kwargs["chunk_size"] = chunk_size
+    return write_combined_pdf(render_einsatz_chunk, pks, target, **kwargs)
+
+
+def archive_einsatz_pdf(obj, refresh: bool = False) -> bytes:
+    """
+    Eingefrorenes PDF zum Einsatz (Mail-Profil): aus dem Archiv oder einmal rendern und archivieren.
+    refresh=True erzeugt es neu (z. B. nach einer Korrektur im Admin).
+    """
+    if not refresh and pdf_archive.is_archived(obj):
+        return pdf_archive.read(obj)
+    pdf_bytes = render_einsatz_pdf(obj, profile=pdf_profiles.mail_profile())
+    pdf_archive.store(obj, pdf_bytes)
+    return pdf_bytes
+
+
+def rearchive_einsatz_pdf(obj) -> None:
+    """Hintergrundauftrag (Admin-Sammelaktion): Archiv-PDF nach einer Korrektur neu erzeugen."""
+    archive_einsatz_pdf(obj, refresh=True)
+
+
+def mail_einsatz_pdf(obj) -> int:
+    """
+    Hintergrundauftrag nach Neuanlage: PDF archivieren und die Mail in den Postausgang legen.
+    Versand (mit Wiederholungen) übernimmt manage.py mail_worker. Liefert die Anzahl Empfänger.
+    """
+    archive_einsatz_pdf(obj)
+    item = postausgang.enqueue_pdf_to_active(
+        subject="Neue Einsatzliste eingegangen",
+        body_text="Automatische Nachricht: Eine neue Einsatzliste wurde erfasst.",
+        anhang_pfad=pdf_archive.relative_path(obj),
+        filename=safe_filename(f"Einsatz_{obj.nummer_formatiert}.pdf"),
+        obj=obj,
+        kategorie=obj.stichwort.kategorie,
+        kurztext=" · ".join(filter(None, [
+            f"Einsatz {obj.nummer_formatiert}",
+            f"{timezone.localtime(obj.start_dt):%d.%m.%Y %H:%M}",
+            str(obj.stichwort),
+            obj.einsatzgemeinde or obj.plz_ort,
+        ])),
+    )
+    return len(item.bcc) if item else 0
@@ -0,0 +1,138 @@
+# einsatz/signals.py
+import threading
+
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from core.models import Einsatzstichwort, Mitglied
+from core.services import jahresuebersicht, statistik
+from pdfs import cache as pdf_cache
+
+from . import suche
+
+from .models import (
+    Einsatz,
+    EinsatzPerson,
+    EinsatzLoeschwasser,
+    EinsatzEinsatzmittel,
+    EinsatzFahrzeug,
+    EinsatzAbrollbehaelter,
+    EinsatzAnhaenger,
+    EinsatzOrtsfeuerwehr,
+    EinsatzZusatzstelle,
+    EinsatzTeilnahme,
+)
+
+# Alle Modelle, die am Einsatz hängen und im PDF erscheinen
+EINSATZ_CHILD_MODELS = (
+    EinsatzPerson,
+    EinsatzLoeschwasser,
+    EinsatzEinsatzmittel,
+    EinsatzFahrzeug,
+    EinsatzAbrollbehaelter,
+    EinsatzAnhaenger,
+    EinsatzOrtsfeuerwehr,
+    EinsatzZusatzstelle,
+    EinsatzTeilnahme,
+)
+
+# Zeilen, aus denen die gespeicherten Kennzahlen (stat_*) berechnet werden
+EINSATZ_STAT_MODELS = (EinsatzTeilnahme, EinsatzFahrzeug, EinsatzAnhaenger)
+
+_local = threading.local()
+
+
+def _einsatz_changed(sender, instance, **kwargs):
+    pdf_cache.invalidate(pdf_cache.tag_for(instance))
+
+
+def _einsatz_pre_delete(sender, instance, **kwargs):
+    _geloescht().add(instance.pk)
+
+
+def _einsatz_post_delete(sender, instance, **kwargs):
+    _geloescht().discard(instance.pk)
+
+
+def _geloescht() -> set:
+    # Einsatz-pks, deren Löschung gerade läuft (pre_delete bis post_delete, je Thread)
+    pks = getattr(_local, "geloescht", None)
+    if pks is None:
+        pks = _local.geloescht = set()
+    return pks
+
+
+def _child_changed(sender, instance, **kwargs):
+    pk = instance.einsatz_id
+    if pk in _geloescht():
+        return  # Kaskade beim Löschen des Einsatzes: _einsatz_changed invalidiert einmal für alle Zeilen
+    statistik.danach(("einsatz_pdf", pk), lambda: _bericht_geaendert(pk))
+
+
+def _bericht_geaendert(pk):
+    pdf_cache.invalidate(pdf_cache.tag_for_pk(Einsatz, pk))
+    Einsatz.objects.filter(pk=pk).touch()
+
+
+def _einsatz_saved_stats(sender, instance, **kwargs):
+    statistik.refresh(Einsatz, [instance.pk])
+
+
+def _stat_child_changed(sender, instance, **kwargs):
+    if instance.einsatz_id not in _geloescht():
+        statistik.refresh(Einsatz, [instance.einsatz_id])
+
+
+def _mitglied_saved(sender, instance, **kwargs):
+    # "hauptamtlich" fließt in die Kennzahlen aller Berichte des Mitglieds ein
+    pks = list(EinsatzTeilnahme.objects.filter(mitglied=instance).values_list("einsatz_id", flat=True))
+    statistik.refresh(Einsatz, pks)
+    # Name/Status erscheinen in Detailseite und PDF
+    Einsatz.objects.filter(Q(pk__in=pks) | Q(einsatzleiter=instance)).touch()
+
+
+def _einsatz_saved_search(sender, instance, **kwargs):
+    suche.index([instance.pk])
+
+
+def _einsatz_deleted_search(sender, instance, **kwargs):
+    suche.remove(instance.pk)
+
+
+def _stichwort_saved(sender, instance, **kwargs):
+    # Code/Bezeichnung stehen im Suchindex jedes Einsatzes mit diesem Stichwort
+    suche.index(Einsatz.objects.filter(stichwort=instance).values_list("pk", flat=True))
+    Einsatz.objects.filter(stichwort=instance).touch()
+
+
+def _einsatz_created_or_deleted(sender, instance, created=True, **kwargs):
+    # Jahresübersicht (Startseite, Jahres-Tabs) hängt nur an Anlegen/Löschen
+    if created:
+        jahresuebersicht.invalidate("einsatz")
+
+
+def connect():
+    for signal in (post_save, post_delete):
+        signal.connect(_einsatz_changed, sender=Einsatz, dispatch_uid=f"einsatz_pdf_cache_{signal is post_save}")
+        for model in EINSATZ_CHILD_MODELS:
+            signal.connect(
+                _child_changed,
+                sender=model,
+                dispatch_uid=f"einsatz_pdf_cache_{model.__name__}_{signal is post_save}",
+            )
+        for model in EINSATZ_STAT_MODELS:
+            signal.connect(
+                _stat_child_changed,
+                sender=model,
+                dispatch_uid=f"einsatz_stats_{model.__name__}_{signal is post_save}",
+            )
+    post_save.connect(_einsatz_saved_stats, sender=Einsatz, dispatch_uid="einsatz_stats")
+    # vor der Kaskade, damit die Zeilen-Signale den gelöschten Einsatz überspringen
+    pre_delete.connect(_einsatz_pre_delete, sender=Einsatz, dispatch_uid="einsatz_loeschen")
+    post_delete.connect(_einsatz_post_delete, sender=Einsatz, dispatch_uid="einsatz_loeschen_ende")
+    post_save.connect(_mitglied_saved, sender=Mitglied, dispatch_uid="einsatz_stats_mitglied")
+    post_save.connect(_einsatz_created_or_deleted, sender=Einsatz, dispatch_uid="einsatz_jahresuebersicht")
+    post_delete.connect(_einsatz_created_or_deleted, sender=Einsatz, dispatch_uid="einsatz_jahresuebersicht_delete")
+    post_save.connect(_einsatz_saved_search, sender=Einsatz, dispatch_uid="einsatz_suche")
+    post_delete.connect(_einsatz_deleted_search, sender=Einsatz, dispatch_uid="einsatz_suche_delete")
+    post_save.connect(_stichwort_saved, sender=Einsatzstichwort, dispatch_uid="einsatz_suche_stichwort")
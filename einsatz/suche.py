@@ -0,0 +1,120 @@
+# einsatz/suche.py
+"""
+Volltextsuche über Einsätze (SQLite FTS5, Tabelle `einsatz_suche`, rowid = Einsatz.id).
+
+Indiziert werden Stichwort (Code + Bezeichnung), Objekt, Gemeinde, Straße, PLZ/Ort, Landkreis
+und Einsatzmaßnahmen. Jedes Suchwort wird als Präfix gesucht ("haupt" findet "Hauptstraße"),
+alle Wörter müssen vorkommen; sortiert wird nach Relevanz (bm25, Stichwort/Objekt gewichtet).
+
+Der Index wird über Signale aktuell gehalten (einsatz.signals). Änderungen an Signalen vorbei
+(queryset.update, bulk_create, Rohdaten-Import) → `manage.py rebuild_search_index`.
+Die Tabelle legt Migration einsatz.0005_suche an (Tokenizer unicode61, remove_diacritics:
+"muhldorf" findet "Mühldorf"). Auf anderen Datenbanken fällt die Suche auf icontains zurück.
+"""
+import re
+from typing import Iterable
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Einsatz
+
+TABLE = "einsatz_suche"
+
+# (Spalte im Index, Gewicht für bm25)
+SPALTEN = (
+    ("stichwort", 4.0),
+    ("objektname", 3.0),
+    ("einsatzgemeinde", 2.0),
+    ("strasse_hausnr", 1.0),
+    ("plz_ort", 1.0),
+    ("landkreis", 1.0),
+    ("einsatzmassnahmen", 0.5),
+)
+
+# Rückfall ohne FTS5 (gleiche Felder wie der Index)
+ICONTAINS_FELDER = (
+    "stichwort__code", "stichwort__bezeichnung", "objektname", "einsatzgemeinde",
+    "strasse_hausnr", "plz_ort", "landkreis", "einsatzmassnahmen",
+)
+
+_WORT = re.compile(r"\w+")
+
+
+def available() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def match_expression(q: str) -> str:
+    """Suchtext → FTS5-Ausdruck: jedes Wort als Präfix, alle Wörter erforderlich."""
+    return " ".join(f'"{wort}"*' for wort in _WORT.findall(q))
+
+
+def _rows(pks: Iterable[int]):
+    for e in (
+        Einsatz.objects.filter(pk__in=pks)
+        .select_related("stichwort")
+        .only("pk", "objektname", "einsatzgemeinde", "strasse_hausnr", "plz_ort", "landkreis",
+              "einsatzmassnahmen", "stichwort__code", "stichwort__bezeichnung")
+    ):
+        stichwort = f"{e.stichwort.code} {e.stichwort.bezeichnung}" if e.stichwort_id else ""
+        yield (e.pk, stichwort, *(getattr(e, name) or "" for name, _ in SPALTEN[1:]))
+
+
+def index(pks: Iterable[int]) -> int:
+    """Indexeinträge der Einsätze `pks` neu schreiben (gelöschte Einsätze verschwinden aus dem Index)."""
+    pks = [pk for pk in set(pks) if pk is not None]
+    if not pks or not available():
+        return 0
+    rows = list(_rows(pks))
+    spalten = ", ".join(name for name, _ in SPALTEN)
+    platzhalter = ", ".join(["%s"] * (len(SPALTEN) + 1))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks)
+        cursor.executemany(f"INSERT INTO {TABLE} (rowid, {spalten}) VALUES ({platzhalter})", rows)
+    return len(rows)
+
+
+def remove(pk: int) -> None:
+    if available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pk])
+
+
+def rebuild(batch: int = 500) -> int:
+    """Index komplett neu aufbauen."""
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    pks = list(Einsatz.objects.order_by("pk").values_list("pk", flat=True))
+    total = 0
+    for i in range(0, len(pks), batch):
+        total += index(pks[i:i + batch])
+    return total
+
+
+def filter_queryset(queryset, q: str):
+    """
+    Schränkt `queryset` auf Treffer für `q` ein und annotiert `such_rang` (bm25, kleiner = besser).
+    Die Sortierung bleibt dem Aufrufer überlassen – z. B. order_by("such_rang", "-year", "-seq").
+    """
+    expr = match_expression(q)
+    if not available() or not expr:
+        cond = Q()
+        for feld in ICONTAINS_FELDER:
+            cond |= Q(**{f"{feld}__icontains": q})
+        return queryset.filter(cond).annotate(such_rang=Value(0.0, output_field=FloatField()))
+
+    gewichte = ", ".join(str(g) for _, g in SPALTEN)
+    einsatz_id = f'"{Einsatz._meta.db_table}"."{Einsatz._meta.pk.column}"'
+    return queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", [expr]),
+    ).annotate(
+        such_rang=RawSQL(
+            f"SELECT bm25({TABLE}, {gewichte}) FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid = {einsatz_id}",
+            [expr],
+            output_field=FloatField(),
+        ),
+    )
@@ -7,6 +7,8 @@ urlpatterns = [
     path("neu", views.einsatz_neu, name="einsatz_neu"),
     path("<int:pk>", views.einsatz_detail, name="einsatz_detail"),
     path("<int:pk>/pdf", views.einsatz_pdf, name="einsatz_pdf"),
+    path("buch.pdf", views.einsatz_buch, name="einsatz_buch"),
+    path("export.zip", views.einsatz_export_zip, name="einsatz_export_zip"),
 
     path("stichwort/<int:pk>/kategorie", views.stichwort_kategorie_api, name="einsatz_stichwort_kategorie"),
     path("stichwort/options", views.stichwort_options, name="einsatz_stichwort_options"),
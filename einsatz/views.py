@@ -1,21 +1,25 @@
 # einsatz/views.py (Ausschnitt: Imports – optional EinsatzTeilnahmeFormSet entfernen)
+import tempfile
+
 from django.contrib import messages
 from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import render_to_string
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.http import FileResponse, JsonResponse, HttpResponse
 from django.contrib.auth.decorators import login_required
+from django.db.models import Max
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.forms import formset_factory
 from django.conf import settings
-from django.templatetags.static import static
 
 from core.forms import TeilnahmeAlleMitgliederForm
 from core.models import Mitglied, Einsatzstichwort
-from core.services.mail import send_mail_with_pdf_to_active
+from core.services import auftraege, jahresuebersicht, nummernkreis, postausgang, statistik, teilnahme
+from core.utils import conditional, htmx, keyset
 from core.utils.files import safe_filename
+from pdfs import archive as pdf_archive, cache as pdf_cache, profiles as pdf_profiles
+from pdfs.export import zip_response
 
 from .models import Einsatz, EinsatzTeilnahme
 
@@ -25,7 +29,8 @@ from .forms import (
     EinsatzFahrzeugFormSet, EinsatzAbrollFormSet, EinsatzAnhaengerFormSet, EinsatzOrtsfeuerwehrFormSet, ZusatzstelleFormSet,
     # EinsatzTeilnahmeFormSet,  # <- NICHT MEHR VERWENDEN
 )
-from .services import assign_running_number, render_html_to_pdf_bytes
+from . import suche
+from .services import iter_einsatz_zip, render_einsatz_pdf, write_einsatzbuch
 
 def _build_grouped_rows(forms, members):
     rows = []
@@ -64,10 +69,10 @@ def einsatz_neu(request):
         ])
 
         if forms_valid:
-            with transaction.atomic():
+            # Kennzahlen (stat_*) einmal am Ende statt je gespeicherter Zeile neu berechnen
+            with transaction.atomic(), statistik.gesammelt():
                 e = form.save(commit=False)
-                assign_running_number(e, type(e))
-                e.full_clean(); e.save(); form.save_m2m()
+                nummernkreis.save_with_number(e); form.save_m2m()
 
                 person = person_form.save(commit=False)
                 person.einsatz = e
@@ -81,39 +86,13 @@ def einsatz_neu(request):
                 of_fs.instance = e; of_fs.save()
                 zs_fs.instance = e; zs_fs.save()
 
-                members = {m.id: m for m in Mitglied.objects.all()}
-                existing = {t.mitglied_id: t for t in e.einsatzteilnahme_set.all()}
-                for cd in tn_formset.cleaned_data:
-                    mid = cd["mitglied_id"]
-                    selected = bool(cd.get("selected"))
-                    funk = cd.get("fahrzeug_funktion") or ""
-                    agt_min = cd.get("agt_minuten")
-                    is_agt = bool(members.get(mid) and members[mid].agt)
-
-                    if selected:
-                        obj = existing.get(mid) or EinsatzTeilnahme(einsatz=e, mitglied_id=mid)
-                        obj.fahrzeug_funktion = funk
-                        obj.agt_minuten = agt_min if is_agt and agt_min is not None else None
-                        obj.full_clean(); obj.save()
-                    else:
-                        if mid in existing:
-                            existing[mid].delete()
-
-            css_url = request.build_absolute_uri(static('css/print.css'))
-            html = render_to_string("einsatz/pdf.html", {"obj": e})
-            pdf_bytes = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
-            try:
-                send_mail_with_pdf_to_active(
-                    subject="Neue Einsatzliste eingegangen",
-                    body_text="Automatische Nachricht: Eine neue Einsatzliste wurde erfasst.",
-                    pdf_bytes=pdf_bytes,
-                    filename=f"Einsatz_{e.nummer_formatiert}.pdf",
-                    fail_silently=False,  # Fehler explizit fangen
-                )
-            except Exception:
-                import logging
-                logging.getLogger(__name__).exception("Mailversand Einsatz %s fehlgeschlagen", e.nummer_formatiert)
-                messages.warning(request, "Einsatz gespeichert, aber E-Mail-Versand fehlgeschlagen. Bitte Admin informieren.")
+                # Teilnahme: eine Mitglieder-Abfrage, Schreiben per bulk_create/bulk_update
+                teilnahme.speichern(e, EinsatzTeilnahme, tn_formset.cleaned_data)
+
+                # PDF + Mail laufen im Hintergrund (manage.py auftrag_worker)
+                auftraege.enqueue("einsatz.services.mail_einsatz_pdf", e)
+
+            messages.success(request, f"Einsatz {e.nummer_formatiert} gespeichert. PDF und E-Mail werden im Hintergrund erstellt.")
             return redirect(reverse("einsatz_detail", args=[e.id]))
         else:
             # Sortiert nach Nachname, Vorname; aktive oben, JF unten
@@ -172,47 +151,176 @@ def einsatz_neu(request):
     })
 
 
+def _einsatz_badges(request, obj):
+    # PDF-Auftrag und Mail je Request einmal – ETag und Detailseite zeigen denselben Stand
+    if not hasattr(request, "_badges"):
+        request._badges = (auftraege.latest_for(obj), postausgang.latest_for(obj))
+    return request._badges
+
+
+def _einsatz_detail_etag(request, pk: int):
+    # Bericht + Stand von PDF-Auftrag und Mail (Badges auf der Detailseite)
+    row = Einsatz.objects.filter(pk=pk).values_list("updated_at", "pdf_sha256").first()
+    if row is None:
+        return None
+    auftrag, mail = _einsatz_badges(request, Einsatz(pk=pk))
+    return conditional.page_etag(
+        request, "einsatz_detail", pk, *row, conditional.app_version(), conditional.stammdaten_version(),
+        auftrag and (auftrag.pk, auftrag.status, auftrag.aktualisiert_am),
+        postausgang.stand(mail),
+    )
+
+
+def _einsatz_pdf_stand(request, pk: int):
+    # je Request einmal; archiviert nur, wenn auch die Datei da ist – sonst rendert die View neu
+    if not hasattr(request, "_pdf_stand"):
+        obj = Einsatz.objects.only("pk", "year", "updated_at", "pdf_sha256", "pdf_archiviert_am").filter(pk=pk).first()
+        request._pdf_stand = (obj, obj is not None and pdf_archive.is_archived(obj))
+    return request._pdf_stand
+
+
+def _einsatz_pdf_etag(request, pk: int):
+    obj, archiviert = _einsatz_pdf_stand(request, pk)
+    if obj is None:
+        return None
+    # archiviertes PDF: dasselbe ETag wie pdfs.archive.serve
+    if archiviert:
+        return obj.pdf_sha256
+    # frisch gerendert: hängt auch an Stammdaten-Namen, print.css und Templates
+    return conditional.fingerprint(
+        "einsatz_pdf", pk, obj.updated_at.isoformat(), pdf_profiles.signature(), pdf_cache.print_css_version(),
+        conditional.app_version(), conditional.stammdaten_version(),
+    )
+
+
+def _einsatz_pdf_last_modified(request, pk: int):
+    obj, archiviert = _einsatz_pdf_stand(request, pk)
+    if obj is None:
+        return None
+    return obj.pdf_archiviert_am if archiviert else obj.updated_at
+
+
+def _einsatz_liste_stand(request) -> tuple:
+    # neue/gelöschte Berichte (Jahresübersicht), jede Änderung an einem Bericht (updated_at),
+    # Stammdaten-Namen und Templates; je Request einmal – ETag und Fragment-Cache verwenden
+    # denselben Stand, damit ein neues ETag nie mit einem veralteten Fragment ausgeliefert wird
+    if not hasattr(request, "_liste_stand"):
+        request._liste_stand = (
+            jahresuebersicht.version("einsatz"), Einsatz.objects.aggregate(stand=Max("updated_at"))["stand"],
+            conditional.app_version(), conditional.stammdaten_version(),
+        )
+    return request._liste_stand
+
+
+def _einsatz_liste_etag(request):
+    return conditional.page_etag(
+        request, "einsatz_liste", *_einsatz_liste_stand(request),
+        sorted(request.GET.lists()), htmx.is_partial(request),
+    )
+
+
 @login_required
+@condition(etag_func=_einsatz_detail_etag)
+@cache_control(private=True, no_cache=True)
 def einsatz_detail(request, pk: int):
-    obj = get_object_or_404(Einsatz, pk=pk)
-    return render(request, "einsatz/detail.html", {"obj": obj})
+    obj = get_object_or_404(Einsatz.objects.select_related("stichwort", "einsatzleiter"), pk=pk)
+    auftrag, mail = _einsatz_badges(request, obj)
+    return render(request, "einsatz/detail.html", {"obj": obj, "auftrag": auftrag, "mail": mail})
 
 @login_required
+@condition(etag_func=_einsatz_pdf_etag, last_modified_func=_einsatz_pdf_last_modified)
+@cache_control(private=True, no_cache=True)
 def einsatz_pdf(request, pk: int):
     obj = get_object_or_404(Einsatz, pk=pk)
-    html = render_to_string("einsatz/pdf.html", {"obj": obj})
-    pdf_bytes = render_html_to_pdf_bytes(html, base_url=request.build_absolute_uri("/"))
+    if pdf_archive.is_archived(obj):
+        # eingefrorenes PDF (nach Versand) – mit ETag/Last-Modified bzw. per Webserver
+        return pdf_archive.serve(request, obj, f"Einsatz_{obj.nummer_formatiert}.pdf")
+    pdf_bytes = render_einsatz_pdf(obj, base_url=request.build_absolute_uri("/"))
     resp = HttpResponse(pdf_bytes, content_type="application/pdf")
     safe_name = safe_filename(f"Einsatz_{obj.nummer_formatiert}.pdf")  # <-- safe
     resp["Content-Disposition"] = f'attachment; filename="{safe_name}"'
     return resp
 
-@login_required
-def einsatz_liste(request):
+def _filtered_einsatz_qs(request):
+    """Jahr-/Suchfilter der Einsatzliste (auch fürs Einsatzbuch genutzt)."""
     q = request.GET.get("q", "").strip()
     year = request.GET.get("year", "").strip()
-    # Alle Einträge (ggf. nach Jahr/Filter eingeschränkt) und verfügbare Jahre für Tabs
     qs = Einsatz.objects.select_related("stichwort").order_by("-year", "-seq")
-    years_qs = Einsatz.objects.order_by("-year").values_list("year", flat=True).distinct()
-    years = [y for y in years_qs if y is not None]
     if year.isdigit():
         qs = qs.filter(year=int(year))
     if q:
-        qs = qs.filter(
-            Q(stichwort__bezeichnung__icontains=q) |
-            Q(objektname__icontains=q) |
-            Q(einsatzgemeinde__icontains=q) |
-            Q(strasse_hausnr__icontains=q) |
-            Q(plz_ort__icontains=q)
+        # Volltextindex (FTS5, Präfixsuche); annotiert such_rang für die Relevanz-Sortierung
+        qs = suche.filter_queryset(qs, q)
+    return qs, q, year
+
+@login_required
+@condition(etag_func=_einsatz_liste_etag)
+@cache_control(private=True, no_cache=True)
+def einsatz_liste(request):
+    # Alle Einträge (ggf. nach Jahr/Filter eingeschränkt) und verfügbare Jahre für Tabs
+    qs, q, year = _filtered_einsatz_qs(request)
+    years = jahresuebersicht.years("einsatz")
+
+    # Suche: beste Treffer zuerst (Einsatzbuch/ZIP bleiben chronologisch)
+    ordering = ("such_rang", "-year", "-seq") if q else ("-year", "-seq")
+
+    def context():
+        # Blättern per Cursor über (year, seq); Kennzahlen der Seite per Unterabfrage in derselben Query
+        page_obj = keyset.paginate(
+            qs.with_stats(), ordering,
+            nach=request.GET.get("nach", ""), vor=request.GET.get("vor", ""),
+            per_page=20, count_cap=settings.LISTE_ANZAHL_OBERGRENZE,
         )
+        return {"page_obj": page_obj, "q": q, "year": year, "years": years}
 
-    paginator = Paginator(qs, 20)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    if htmx.is_partial(request):
+        # Suche während der Eingabe: nur Ergebnis + Jahres-Tabs (out-of-band), kurz gecacht
+        key = htmx.cache_key("einsatz_liste", conditional.fingerprint(*_einsatz_liste_stand(request)), request.GET)
+        return htmx.partial_response(request, "einsatz/_liste.html", lambda: {**context(), "oob": True}, key)
+    return htmx.vary(render(request, "einsatz/list.html", context()))
 
-    return render(request, "einsatz/list.html", {
-        "page_obj": page_obj, "q": q, "year": year,
-        "years": years,
-    })
+@login_required
+def einsatz_buch(request):
+    """
+    Einsatzbuch: ein Sammel-PDF für die aktuell gefilterte Liste (z. B. ?year=2025).
+    Wird im Request gerendert (Prozess-Pool je Aufruf), daher höchstens EINSATZBUCH_MAX_EINSAETZE.
+    """
+    qs, q, year = _filtered_einsatz_qs(request)
+    limit = settings.EINSATZBUCH_MAX_EINSAETZE
+    anzahl, genau = keyset.approx_count(qs, limit)
+    if not anzahl:
+        return HttpResponse("Keine Einsätze für diese Auswahl.", status=404, content_type="text/plain; charset=utf-8")
+    if not genau:
+        # Rendern läuft synchron im gunicorn-Worker (Timeout) – große Auswahl über die Kommandozeile
+        return HttpResponse(
+            f"Mehr als {limit} Einsätze: bitte nach Jahr oder Suchbegriff eingrenzen "
+            "oder das Einsatzbuch mit manage.py einsatzbuch erzeugen.",
+            status=413, content_type="text/plain; charset=utf-8",
+        )
+    # Auf Platte schreiben und von dort streamen – nicht im Speicher aufbauen
+    tmp = tempfile.NamedTemporaryFile(prefix="einsatzbuch-", suffix=".pdf")
+    write_einsatzbuch(qs, tmp)
+    tmp.seek(0)
+    name = f"Einsatzbuch_{year}.pdf" if year.isdigit() else "Einsatzbuch.pdf"
+    return FileResponse(tmp, as_attachment=True, filename=safe_filename(name), content_type="application/pdf")
+
+@login_required
+def einsatz_export_zip(request):
+    """ZIP mit den PDFs der angehakten Einsätze (?id=…) bzw. der aktuell gefilterten Liste."""
+    qs, q, year = _filtered_einsatz_qs(request)
+    ids = [i for i in request.GET.getlist("id") if i.isdigit()]
+    if ids:
+        qs = qs.filter(pk__in=ids)
+    limit = settings.EXPORT_ZIP_MAX_BERICHTE
+    if not keyset.approx_count(qs, limit)[1]:
+        # Rendern läuft im gunicorn-Worker (Timeout) – große Auswahl im Hintergrund über den Admin
+        return HttpResponse(
+            f"Mehr als {limit} Einsätze: bitte Auswahl eingrenzen oder den ZIP-Export in der "
+            "Verwaltung starten (die PDFs werden dort im Hintergrund vorbereitet).",
+            status=413, content_type="text/plain; charset=utf-8",
+        )
+    name = f"Einsaetze_{year}.zip" if year.isdigit() else "Einsaetze.zip"
+    return zip_response(iter_einsatz_zip(qs), name)
 
 @login_required
 def stichwort_kategorie_api(request, pk: int):
@@ -0,0 +1,89 @@
+# pdfs/archive.py
+"""
+Archiv der eingefrorenen Berichts-PDFs.
+
+Nach der Neuanlage wird das PDF einmal erzeugt, unter PDF_ARCHIVE_DIR abgelegt und der
+SHA-256 am Datensatz gespeichert (Felder `pdf_sha256`, `pdf_archiviert_am`). Danach wird
+genau diese Datei ausgeliefert – auch wenn sich Stammdaten später ändern.
+
+`serve()` liefert die Datei als FileResponse mit ETag/Last-Modified (Revalidierung ohne
+Datenübertragung). Optional übernimmt der Webserver die Auslieferung
+(PDF_ARCHIVE_SENDFILE = "x-accel" für nginx bzw. "x-sendfile" für Apache/lighttpd).
+"""
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.utils.files import atomic_write, safe_filename
+
+
+def _archive_dir() -> Path:
+    return Path(settings.PDF_ARCHIVE_DIR)
+
+
+def relative_path(obj) -> str:
+    # z. B. "einsatz/2025/einsatz-12.pdf" – pk statt Nummer, damit der Pfad stabil bleibt
+    return f"{obj._meta.app_label}/{obj.year}/{obj._meta.model_name}-{obj.pk}.pdf"
+
+
+def archive_path(obj) -> Path:
+    return _archive_dir() / relative_path(obj)
+
+
+def is_archived(obj) -> bool:
+    return bool(obj.pdf_sha256) and archive_path(obj).is_file()
+
+
+def store(obj, data: bytes) -> str:
+    """Legt das PDF im Archiv ab und speichert Hash + Zeitpunkt am Datensatz. Liefert den Hash."""
+    digest = hashlib.sha256(data).hexdigest()
+    atomic_write(archive_path(obj), data)
+    now = timezone.now()
+    # update() statt save(): keine Signale, keine Cache-Invalidierung für ein reines Archiv-Feld
+    type(obj)._default_manager.filter(pk=obj.pk).update(pdf_sha256=digest, pdf_archiviert_am=now)
+    obj.pdf_sha256 = digest
+    obj.pdf_archiviert_am = now
+    return digest
+
+
+def read(obj) -> bytes:
+    return archive_path(obj).read_bytes()
+
+
+def serve(request, obj, filename: str, as_attachment: bool = True) -> HttpResponse:
+    """Archiv-PDF ausliefern; beantwortet If-None-Match/If-Modified-Since mit 304."""
+    etag = quote_etag(obj.pdf_sha256)
+    last_modified = int(obj.pdf_archiviert_am.timestamp()) if obj.pdf_archiviert_am else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    filename = safe_filename(filename)
+    mode = getattr(settings, "PDF_ARCHIVE_SENDFILE", "")
+    if mode in ("x-accel", "x-sendfile"):
+        resp = HttpResponse(content_type="application/pdf")
+        if mode == "x-accel":
+            prefix = settings.PDF_ARCHIVE_ACCEL_PREFIX.rstrip("/")
+            resp["X-Accel-Redirect"] = f"{prefix}/{relative_path(obj)}"
+        else:
+            resp["X-Sendfile"] = str(archive_path(obj))
+        disposition = "attachment" if as_attachment else "inline"
+        resp["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    else:
+        resp = FileResponse(
+            archive_path(obj).open("rb"),
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type="application/pdf",
+        )
+    resp["ETag"] = etag
+    if last_modified is not None:
+        resp["Last-Modified"] = http_date(last_modified)
+    # private: nur im Browser cachen (Login nötig); no-cache: jedes Mal per ETag revalidieren (304)
+    resp["Cache-Control"] = "private, no-cache"
+    return resp
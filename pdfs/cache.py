@@ -0,0 +1,192 @@
+# pdfs/cache.py
+"""
+Plattenbasierter PDF-Cache.
+
+Schlüssel ist ein SHA-256 über das gerenderte HTML, die Version der print.css und das
+Ausgabeprofil (pdfs.profiles). Ändert sich Inhalt (auch indirekt, z. B. umbenanntes
+Mitglied), Layout oder Profil, ändert sich der Schlüssel – ein veralteter Treffer ist
+damit ausgeschlossen.
+
+Zusätzlich wird pro Datensatz und Profil ein "Tag" (z. B. "einsatz.einsatz-12@kompakt")
+auf den zuletzt erzeugten Schlüssel gemerkt. Ändert sich der Datensatz, entfernt `invalidate()` das
+alte PDF sofort, statt es bis zur LRU-Verdrängung liegen zu lassen.
+
+Der Cache liegt auf Platte und ist damit für alle Gunicorn-Worker gemeinsam.
+Verdrängung: Größenlimit (PDF_CACHE_MAX_BYTES), älteste mtime zuerst;
+ein Treffer setzt die mtime neu (LRU).
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+from core.utils.files import atomic_write
+
+from . import profiles
+
+logger = logging.getLogger(__name__)
+
+_css_version_memo: dict = {}
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "PDF_CACHE_ENABLED", True))
+
+
+def _cache_dir() -> Path:
+    return Path(settings.PDF_CACHE_DIR)
+
+
+def print_css_version() -> str:
+    """Kurzer Hash der print.css; wird nur bei geänderter Datei neu berechnet."""
+    path = finders.find("css/print.css")
+    if not path:
+        return "none"
+    st = os.stat(path)
+    memo_key = (path, st.st_mtime_ns, st.st_size)
+    version = _css_version_memo.get(memo_key)
+    if version is None:
+        with open(path, "rb") as fh:
+            version = hashlib.sha256(fh.read()).hexdigest()[:16]
+        _css_version_memo.clear()
+        _css_version_memo[memo_key] = version
+    return version
+
+
+def make_key(html: str, profile: Optional[str] = None) -> str:
+    h = hashlib.sha256()
+    h.update(print_css_version().encode("ascii"))
+    h.update(b"\0")
+    h.update(profiles.signature(profile).encode("utf-8"))
+    h.update(b"\0")
+    h.update(html.encode("utf-8"))
+    return h.hexdigest()
+
+
+def tag_for(obj) -> str:
+    return tag_for_pk(type(obj), obj.pk)
+
+
+def tag_for_pk(model_cls, pk) -> str:
+    return f"{model_cls._meta.label_lower}-{pk}"
+
+
+def _pdf_path(key: str) -> Path:
+    return _cache_dir() / key[:2] / f"{key}.pdf"
+
+
+def _tag_path(tag: str) -> Path:
+    return _cache_dir() / "tags" / tag
+
+
+def get(key: str) -> Optional[bytes]:
+    path = _pdf_path(key)
+    try:
+        data = path.read_bytes()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    try:
+        os.utime(path, None)  # LRU: Treffer "verjüngt" den Eintrag
+    except OSError:
+        pass
+    return data
+
+
+def put(key: str, data: bytes, tag: Optional[str] = None) -> None:
+    atomic_write(_pdf_path(key), data)
+    if tag:
+        tag_path = _tag_path(tag)
+        try:
+            old_key = tag_path.read_text().strip()
+        except (FileNotFoundError, NotADirectoryError):
+            old_key = ""
+        atomic_write(tag_path, key.encode("ascii"))
+        if old_key and old_key != key:
+            _pdf_path(old_key).unlink(missing_ok=True)
+    evict()
+
+
+def _profile_tag(tag: str, profile: Optional[str]) -> str:
+    return f"{tag}@{profiles.resolve(profile)}"
+
+
+def invalidate(tag: str) -> None:
+    """Entfernt die zuletzt für `tag` erzeugten PDFs aller Profile (z. B. nach Änderung des Datensatzes)."""
+    if not _enabled():
+        return
+    for tag_path in (_cache_dir() / "tags").glob(f"{tag}@*"):
+        try:
+            key = tag_path.read_text().strip()
+            if key:
+                _pdf_path(key).unlink(missing_ok=True)
+            tag_path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            continue
+        except OSError:
+            logger.warning("PDF-Cache: Invalidierung für %s fehlgeschlagen", tag_path.name, exc_info=True)
+
+
+def evict(max_bytes: Optional[int] = None) -> int:
+    """Verdrängt die ältesten Einträge, bis das Größenlimit eingehalten ist. Liefert Anzahl gelöschter PDFs."""
+    if max_bytes is None:
+        max_bytes = int(getattr(settings, "PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+    entries = []
+    total = 0
+    for path in _cache_dir().glob("??/*.pdf"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def lookup(html: str, profile: Optional[str] = None) -> Optional[bytes]:
+    """Nur nachsehen: PDF zum HTML, falls schon im Cache – sonst None."""
+    if not _enabled():
+        return None
+    try:
+        return get(make_key(html, profile))
+    except OSError:
+        return None
+
+
+def get_or_render(
+    html: str, render: Callable[[], bytes], tag: Optional[str] = None, profile: Optional[str] = None
+) -> bytes:
+    """
+    Liefert das PDF zum HTML (im Ausgabeprofil `profile`) aus dem Cache oder rendert es über
+    `render()` und legt es ab. Fehler beim Cache-Zugriff werden geloggt, aber nie an den
+    Aufrufer durchgereicht.
+    """
+    if not _enabled():
+        return render()
+    key = make_key(html, profile)
+    try:
+        data = get(key)
+    except OSError:
+        logger.warning("PDF-Cache: Lesen fehlgeschlagen (%s)", key, exc_info=True)
+        data = None
+    if data is not None:
+        return data
+    data = render()
+    try:
+        put(key, data, tag=_profile_tag(tag, profile) if tag else None)
+    except OSError:
+        logger.warning("PDF-Cache: Schreiben fehlgeschlagen (%s)", key, exc_info=True)
+    return data
@@ -0,0 +1,114 @@
+# pdfs/engine.py
+"""
+Zentrale WeasyPrint-Anbindung für alle PDF-Pfade (Einsatz, Dienst, Admin).
+
+print.css und die Font-Konfiguration werden einmal pro Worker-Prozess geladen und für
+jeden Render wiederverwendet. `warmup()` wird beim Worker-Start aufgerufen (eidiv/wsgi.py),
+damit das erste PDF nach einem Neustart nicht das langsamste ist.
+
+Assets unter /static/ und /media/ werden über `pdfs.fetcher.url_fetcher` direkt von Platte
+gelesen. Ohne übergebene base_url wird PDF_BASE_URL genutzt, damit relative Links im
+Template auch ohne Request (Worker, Management-Commands) aufgelöst werden.
+
+`profile` wählt ein Ausgabeprofil aus PDF_PROFILES (z. B. "kompakt" für Mail-Anhänge).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+from . import profiles
+from .fetcher import url_fetcher
+
+logger = logging.getLogger(__name__)
+
+PRINT_CSS = "css/print.css"
+
+_lock = threading.Lock()
+_font_config = None
+_base_stylesheets = None
+_extra_stylesheets: dict = {}
+
+_WARMUP_HTML = "<!doctype html><html><body><h1>EiDiV</h1><p>Warmup ÄÖÜ äöü ß – 0123456789</p></body></html>"
+
+
+def _load():
+    """Parst print.css genau einmal pro Prozess (threadsicher)."""
+    global _font_config, _base_stylesheets
+    if _base_stylesheets is not None:
+        return _font_config, _base_stylesheets
+    with _lock:
+        if _base_stylesheets is None:
+            font_config = FontConfiguration()
+            stylesheets = []
+            # print.css aus dem Static-Finder holen (funktioniert auch in Prod nach collectstatic)
+            css_path = finders.find(PRINT_CSS)
+            if css_path:
+                stylesheets.append(CSS(filename=css_path, font_config=font_config, url_fetcher=url_fetcher))
+            else:
+                logger.warning("PDF-Engine: %s nicht gefunden – rendere ohne Druck-CSS", PRINT_CSS)
+            _font_config = font_config
+            _base_stylesheets = stylesheets
+    return _font_config, _base_stylesheets
+
+
+def _extra_stylesheet(path: str, font_config):
+    sheet = _extra_stylesheets.get(path)
+    if sheet is None:
+        with _lock:
+            sheet = _extra_stylesheets.get(path)
+            if sheet is None:
+                sheet = CSS(filename=path, font_config=font_config, url_fetcher=url_fetcher)
+                _extra_stylesheets[path] = sheet
+    return sheet
+
+
+def reset():
+    """Verwirft die geladenen Stylesheets (z. B. nach Änderung der print.css im laufenden Prozess)."""
+    global _font_config, _base_stylesheets
+    with _lock:
+        _font_config = None
+        _base_stylesheets = None
+        _extra_stylesheets.clear()
+
+
+def _prepare(html: str, base_url, extra_css_paths):
+    font_config, stylesheets = _load()
+    # optional weitere lokale CSS-Pfade akzeptieren
+    if extra_css_paths:
+        stylesheets = stylesheets + [_extra_stylesheet(p, font_config) for p in extra_css_paths if p]
+    if not base_url:
+        base_url = getattr(settings, "PDF_BASE_URL", None)
+    return HTML(string=html, base_url=base_url, url_fetcher=url_fetcher), stylesheets, font_config
+
+
+def render_html_to_pdf_bytes(
+    html: str, base_url=None, extra_css_paths: list[str] | None = None, profile: str | None = None
+) -> bytes:
+    document, stylesheets, font_config = _prepare(html, base_url, extra_css_paths)
+    return document.write_pdf(stylesheets=stylesheets, font_config=font_config, **profiles.options(profile))
+
+
+def render_html_to_document(html: str, base_url=None, extra_css_paths: list[str] | None = None):
+    """Gelayoutetes WeasyPrint-Dokument (z. B. um mehrere Berichte seitenweise zusammenzuführen)."""
+    document, stylesheets, font_config = _prepare(html, base_url, extra_css_paths)
+    return document.render(stylesheets=stylesheets, font_config=font_config)
+
+
+def write_documents(documents, target, profile: str | None = None) -> None:
+    """Führt WeasyPrint-Dokumente seitenweise zu einem PDF zusammen und schreibt es nach `target`."""
+    pages = [page for doc in documents for page in doc.pages]
+    documents[0].copy(pages).write_pdf(target, **profiles.options(profile))
+
+
+def warmup() -> float:
+    """Lädt CSS/Fonts und rendert ein Mini-Dokument. Liefert die Dauer in Sekunden."""
+    started = time.perf_counter()
+    render_html_to_pdf_bytes(_WARMUP_HTML)
+    elapsed = time.perf_counter() - started
+    logger.info("PDF-Engine aufgewärmt in %.2f s", elapsed)
+    return elapsed
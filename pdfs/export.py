@@ -0,0 +1,101 @@
+# pdfs/export.py
+"""
+Streaming-ZIP vieler Berichts-PDFs (Listen- und Admin-Export).
+
+Das ZIP wird Datei für Datei in einen StreamingHttpResponse geschrieben; PDFs sind bereits
+komprimiert und werden daher nur abgelegt (ZIP_STORED). Bereits gecachte PDFs werden direkt
+übernommen, fehlende in einem Prozess-Pool gerendert. Es sind höchstens `window` PDFs
+gleichzeitig in Arbeit bzw. im Speicher – unabhängig von der Größe der Auswahl.
+
+Der Pool läuft im Request (gunicorn --timeout 120): die Views begrenzen die Auswahl auf
+EXPORT_ZIP_MAX_BERICHTE, größere Exporte rendert der auftrag_worker vorab in den PDF-Cache.
+"""
+import io
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Iterable, Iterator
+
+from django.http import StreamingHttpResponse
+
+from core.utils.files import safe_filename
+from core.utils.pool import default_processes, process_pool, terminate
+
+from . import cache as pdf_cache
+
+
+class _ZipSink(io.RawIOBase):
+    """Nicht-seekbarer Schreibpuffer; zipfile nutzt dann Data-Descriptors statt Zurückspringen."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Erzeugt ein ZIP aus (Dateiname, Inhalt)-Paaren stückweise."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    tail = sink.take()
+    if tail:
+        yield tail
+
+
+def iter_pdfs(
+    objs: Iterable,
+    html_for: Callable[[object], str],
+    render_task: Callable[[int], bytes],
+    processes: int | None = None,
+    window: int | None = None,
+) -> Iterator[tuple[object, bytes]]:
+    """
+    Liefert (obj, pdf_bytes) in Eingabereihenfolge. Cache-Treffer kommen direkt aus dem
+    PDF-Cache, Fehlendes rendert `render_task(pk)` (picklebare Modulfunktion) im Pool.
+    """
+    processes = processes or default_processes()
+    window = window or 2 * processes
+    pool = None
+    pending = deque()
+    try:
+        for obj in objs:
+            data = pdf_cache.lookup(html_for(obj))
+            if data is None:
+                if pool is None:
+                    pool = process_pool(processes)
+                pending.append((obj, pool.submit(render_task, obj.pk)))
+            else:
+                pending.append((obj, data))
+            # Fertiges am Kopf sofort ausliefern, sonst erst bei vollem Fenster warten
+            while pending and (len(pending) >= window or not isinstance(pending[0][1], Future)):
+                head, result = pending.popleft()
+                yield head, result.result() if isinstance(result, Future) else result
+        while pending:
+            head, result = pending.popleft()
+            yield head, result.result() if isinstance(result, Future) else result
+    finally:
+        if pool is not None:
+            # Abbruch (Client weg, Fehler): keine Renderprozesse ohne Abnehmer weiterlaufen lassen
+            terminate(pool)
+
+
+def zip_response(chunks: Iterator[bytes], filename: str) -> StreamingHttpResponse:
+    resp = StreamingHttpResponse(chunks, content_type="application/zip")
+    resp["Content-Disposition"] = f'attachment; filename="{safe_filename(filename)}"'
+    return resp
@@ -0,0 +1,87 @@
+# pdfs/fetcher.py
+"""
+url_fetcher für WeasyPrint.
+
+URLs unter STATIC_URL bzw. MEDIA_URL werden direkt von Platte gelesen (Static-Finder,
+dann STATIC_ROOT bzw. MEDIA_ROOT) und im Prozess zwischengespeichert. Damit holt sich ein
+Worker während des Renderns keine Assets per HTTP beim eigenen Gunicorn (bei --workers 3
+droht sonst ein Aushungern/Deadlock des Pools). Alles andere geht an den Standard-Fetcher.
+"""
+import mimetypes
+import os
+import threading
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from weasyprint import default_url_fetcher
+
+# Nur kleine Dateien im Speicher halten (Logo, CSS, Schriften)
+MAX_CACHED_BYTES = 5 * 1024 * 1024
+
+_lock = threading.Lock()
+_cache: dict = {}  # Dateipfad -> (mtime_ns, bytes)
+
+
+def _url_path(setting_name: str) -> str:
+    value = getattr(settings, setting_name, "") or ""
+    path = urlsplit(value).path
+    return path if path.endswith("/") else ""
+
+
+def _local_path(path: str) -> str | None:
+    """Bildet einen URL-Pfad auf eine Datei unter Static/Media ab – oder None."""
+    static_prefix = _url_path("STATIC_URL")
+    media_prefix = _url_path("MEDIA_URL")
+    try:
+        if static_prefix and path.startswith(static_prefix):
+            rel = path[len(static_prefix):]
+            found = finders.find(rel)
+            if found:
+                return found
+            static_root = getattr(settings, "STATIC_ROOT", None)
+            if static_root:
+                candidate = safe_join(static_root, rel)
+                if os.path.isfile(candidate):
+                    return candidate
+        if media_prefix and path.startswith(media_prefix) and getattr(settings, "MEDIA_ROOT", None):
+            candidate = safe_join(settings.MEDIA_ROOT, path[len(media_prefix):])
+            if os.path.isfile(candidate):
+                return candidate
+    except SuspiciousFileOperation:
+        return None
+    return None
+
+
+def _read_cached(file_path: str) -> bytes:
+    mtime = os.stat(file_path).st_mtime_ns
+    hit = _cache.get(file_path)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with open(file_path, "rb") as fh:
+        data = fh.read()
+    if len(data) <= MAX_CACHED_BYTES:
+        with _lock:
+            _cache[file_path] = (mtime, data)
+    return data
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def url_fetcher(url, *args, **kwargs):
+    parts = urlsplit(url)
+    if parts.scheme in ("http", "https", ""):
+        file_path = _local_path(unquote(parts.path))
+        if file_path:
+            mime_type, _encoding = mimetypes.guess_type(file_path)
+            return {
+                "string": _read_cached(file_path),
+                "mime_type": mime_type or "application/octet-stream",
+                "redirected_url": url,
+            }
+    return default_url_fetcher(url, *args, **kwargs)
@@ -0,0 +1,188 @@
+# pdfs/management/commands/bench_pdf.py
+import json
+import math
+import resource
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Anhaenger, Einsatzstichwort, Fahrzeug, Loeschwasserentnahmestelle, Mitglied
+from core.services import statistik
+from dienst.models import Dienst, DienstAnhaenger, DienstFahrzeug, DienstTeilnahme
+from dienst.services import assign_running_number as assign_dienst_number, render_dienst_html
+from einsatz.models import Einsatz, EinsatzAnhaenger, EinsatzFahrzeug, EinsatzLoeschwasser, EinsatzTeilnahme
+from einsatz.services import assign_running_number as assign_einsatz_number, render_einsatz_html
+from pdfs import profiles as pdf_profiles
+from pdfs.engine import render_html_to_pdf_bytes, warmup
+
+LOREM = (
+    "Erkundung der Lage, Absicherung der Einsatzstelle, Aufbau der Wasserversorgung, "
+    "Brandbekämpfung mit zwei C-Rohren unter schwerem Atemschutz, Belüftung, Nachkontrolle mit Wärmebildkamera. "
+)
+
+
+def _percentile(values, p):
+    """Nächster Rang (ohne Interpolation) – bei wenigen Läufen aussagekräftiger als Mittelwerte."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p * len(ordered)) - 1, 0)]
+
+
+def _peak_rss_kb() -> int:
+    # Linux: ru_maxrss in KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Misst das Rendern von Einsatz-/Dienst-PDFs mit synthetischen Daten (werden per Rollback verworfen). "
+        "Ausgabe als JSON je Ausgabeprofil: p50/p95 Laufzeit, Queries, Peak-RSS, PDF-Größe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=10, help="Messläufe je Berichtsart")
+        parser.add_argument("--teilnehmer", type=int, default=30, help="Teilnehmende je Bericht")
+        parser.add_argument("--fahrzeuge", type=int, default=6, help="Fahrzeuge (und ebenso viele Anhänger) je Bericht")
+        parser.add_argument("--loeschwasser", type=int, default=3, help="Löschwasser-Zeilen je Einsatz")
+        parser.add_argument("--text-kb", type=int, default=4, help="Länge von Einsatzmaßnahmen/Beschreibung in KB")
+        parser.add_argument("--only", choices=["einsatz", "dienst"], help="nur eine Berichtsart messen")
+        parser.add_argument(
+            "--profile", action="append", dest="profiles",
+            help="Ausgabeprofil aus PDF_PROFILES (mehrfach möglich; Standard: alle)",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["runs"] < 1:
+            raise CommandError("--runs muss mindestens 1 sein.")
+        profile_names = opts["profiles"] or pdf_profiles.names()
+        try:
+            for name in profile_names:
+                pdf_profiles.options(name)
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        warmup_s = warmup()  # Erstaufruf (CSS/Fonts) nicht in die Messung einrechnen
+        result = {
+            "params": {k: opts[k] for k in ("runs", "teilnehmer", "fahrzeuge", "loeschwasser", "text_kb")},
+            "profiles": {name: pdf_profiles.options(name) for name in profile_names},
+            "warmup_ms": round(warmup_s * 1000, 1),
+        }
+        try:
+            with transaction.atomic():
+                einsatz, dienst = self._create_data(opts)
+                if opts["only"] != "dienst":
+                    result["einsatz"] = self._bench_profiles(
+                        lambda: render_einsatz_html(Einsatz.objects.get(pk=einsatz.pk)), opts["runs"], profile_names
+                    )
+                if opts["only"] != "einsatz":
+                    result["dienst"] = self._bench_profiles(
+                        lambda: render_dienst_html(Dienst.objects.get(pk=dienst.pk)), opts["runs"], profile_names
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+        result["peak_rss_kb"] = _peak_rss_kb()
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _bench_profiles(self, build_html, runs: int, profile_names) -> dict:
+        results = {name: self._bench(build_html, runs, name) for name in profile_names}
+        # Größe/Laufzeit relativ zum ersten Profil (Standard: "standard")
+        base = results[profile_names[0]]
+        for res in results.values():
+            res["pdf_bytes_ratio"] = round(res["pdf_bytes"] / base["pdf_bytes"], 3) if base["pdf_bytes"] else None
+            res["p50_ratio"] = round(res["p50_ms"] / base["p50_ms"], 3) if base["p50_ms"] else None
+        return results
+
+    def _bench(self, build_html, runs: int, profile: str) -> dict:
+        """Misst Laden + Template + PDF je Lauf; der PDF-Cache wird dabei bewusst umgangen."""
+        total_ms, html_ms, queries = [], [], []
+        size = 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                html = build_html()
+            rendered = time.perf_counter()
+            pdf = render_html_to_pdf_bytes(html, profile=profile)
+            finished = time.perf_counter()
+            total_ms.append((finished - started) * 1000)
+            html_ms.append((rendered - started) * 1000)
+            queries.append(len(ctx))
+            size = len(pdf)
+        return {
+            "p50_ms": round(_percentile(total_ms, 0.50), 1),
+            "p95_ms": round(_percentile(total_ms, 0.95), 1),
+            "html_p50_ms": round(_percentile(html_ms, 0.50), 1),
+            "queries": max(queries),
+            "pdf_bytes": size,
+            "html_bytes": len(html.encode("utf-8")),
+        }
+
+    def _create_data(self, opts):
+        now = timezone.now()
+        text = (LOREM * (opts["text_kb"] * 1024 // len(LOREM) + 1))[: opts["text_kb"] * 1024]
+
+        stichwort = Einsatzstichwort.objects.create(
+            code="BENCH", bezeichnung="Benchmark", kategorie=Einsatzstichwort.KAT_BRAND
+        )
+        mitglieder = Mitglied.objects.bulk_create([
+            Mitglied(name=f"Bench{i:03d}", vorname="Test", agt=i % 3 == 0,
+                     hauptamtlich=i % 7 == 0, jugendfeuerwehr=i % 10 == 9)
+            for i in range(opts["teilnehmer"])
+        ])
+        fahrzeuge = Fahrzeug.objects.bulk_create([
+            Fahrzeug(typ="HLF 20", funkrufname=f"Florian Bench {i}/1") for i in range(opts["fahrzeuge"])
+        ])
+        anhaenger = Anhaenger.objects.bulk_create([
+            Anhaenger(typ=f"Anhänger {i}") for i in range(opts["fahrzeuge"])
+        ])
+        stellen = Loeschwasserentnahmestelle.objects.bulk_create([
+            Loeschwasserentnahmestelle(typ=f"Hydrant {i}") for i in range(opts["loeschwasser"])
+        ])
+
+        einsatz = Einsatz(
+            stichwort=stichwort, start_dt=now - timedelta(hours=3), ende_dt=now,
+            einsatzleiter=mitglieder[0] if mitglieder else None, einsatzleiter_text="Benchmark",
+            objektname="Lagerhalle", strasse_hausnr="Hauptstraße 1", plz_ort="84453 Mühldorf",
+            einsatzgemeinde="Mühldorf", einsatzmassnahmen=text,
+        )
+        assign_einsatz_number(einsatz, Einsatz)
+        einsatz.save()
+        EinsatzTeilnahme.objects.bulk_create([
+            EinsatzTeilnahme(einsatz=einsatz, mitglied=m, fahrzeug_funktion="Truppführer",
+                             agt_minuten=25 if m.agt else None)
+            for m in mitglieder
+        ])
+        EinsatzFahrzeug.objects.bulk_create([
+            EinsatzFahrzeug(einsatz=einsatz, fahrzeug=f, kilometer=12, stunden=Decimal("3.00")) for f in fahrzeuge
+        ])
+        EinsatzAnhaenger.objects.bulk_create([
+            EinsatzAnhaenger(einsatz=einsatz, anhaenger=a, kilometer=12, stunden=Decimal("3.00")) for a in anhaenger
+        ])
+        EinsatzLoeschwasser.objects.bulk_create([
+            EinsatzLoeschwasser(einsatz=einsatz, entnahmestelle=s, menge=Decimal("12.50")) for s in stellen
+        ])
+
+        dienst = Dienst(titel="Benchmark-Übung", start_dt=now - timedelta(hours=2), ende_dt=now, beschreibung=text)
+        assign_dienst_number(dienst)
+        dienst.save()
+        DienstTeilnahme.objects.bulk_create([
+            DienstTeilnahme(dienst=dienst, mitglied=m, fahrzeug_funktion="Maschinist") for m in mitglieder
+        ])
+        DienstFahrzeug.objects.bulk_create([
+            DienstFahrzeug(dienst=dienst, fahrzeug=f, kilometer=8, stunden=Decimal("2.00")) for f in fahrzeuge
+        ])
+        DienstAnhaenger.objects.bulk_create([
+            DienstAnhaenger(dienst=dienst, anhaenger=a, kilometer=8, stunden=Decimal("2.00")) for a in anhaenger
+        ])
+        # bulk_create sendet keine Signale – Kennzahlen selbst nachziehen
+        statistik.refresh(Einsatz, [einsatz.pk])
+        statistik.refresh(Dienst, [dienst.pk])
+        return einsatz, dienst
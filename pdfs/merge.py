@@ -0,0 +1,71 @@
+# pdfs/merge.py
+"""
+Sammel-PDFs aus vielen Einzelberichten (z. B. Einsatzbuch eines Jahres).
+
+Die Berichte werden in Blöcken auf einen Prozess-Pool verteilt. Jeder Pool-Prozess
+layoutet seinen Block als WeasyPrint-Dokumente, führt sie seitenweise zusammen und
+schreibt eine Teil-Datei – das Layout (der speicherintensive Teil) liegt nie für alle
+Berichte gleichzeitig im Speicher. Zum Schluss fügt pypdf die Teil-Dateien zusammen:
+PdfWriter hält dabei alle Seitenobjekte (Streams komprimiert) bis zum Schreiben, der
+Elternprozess braucht also etwa die Größe des fertigen PDFs an Speicher. Im Browser ist
+die Auswahl deshalb begrenzt (EINSATZBUCH_MAX_EINSAETZE), große Bücher über
+`manage.py einsatzbuch`.
+"""
+import os
+import tempfile
+from typing import Callable
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PyPdfError
+
+from core.utils.pool import default_processes, process_pool
+
+DEFAULT_CHUNK_SIZE = 20
+
+
+def check_pdf_file(path) -> str:
+    """Leer, wenn `path` ein lesbares PDF ist – sonst der Grund (fehlt, beschädigt, abgeschnitten)."""
+    try:
+        reader = PdfReader(path)
+        for page in reader.pages:
+            page.get_contents()
+    except (OSError, ValueError, PyPdfError) as exc:
+        return f"{type(exc).__name__}: {exc}"
+    return ""
+
+
+def concat_pdf_files(paths: list[str], target) -> None:
+    """Fügt die PDFs `paths` nach `target` zusammen (Speicherbedarf ≈ Größe des Ergebnisses)."""
+    writer = PdfWriter()
+    for path in paths:
+        # Lesezeichen der Teile werden nicht gebraucht – nur die Seiten übernehmen
+        writer.append(path, import_outline=False)
+    writer.write(target)
+    writer.close()
+
+
+def write_combined_pdf(
+    render_chunk: Callable[[list[int], str], str],
+    pks: list[int],
+    target,
+    processes: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Rendert die Datensätze `pks` über `render_chunk(pks, pfad)` (picklebare Modulfunktion)
+    und schreibt das Sammel-PDF nach `target` (Pfad oder Dateiobjekt). Liefert die Anzahl Berichte.
+    """
+    if not pks:
+        raise ValueError("Keine Datensätze für das Sammel-PDF.")
+    chunk_size = max(1, chunk_size)
+    chunks = [pks[i:i + chunk_size] for i in range(0, len(pks), chunk_size)]
+    with tempfile.TemporaryDirectory(prefix="eidiv-sammel-") as tmp:
+        paths = [os.path.join(tmp, f"teil_{n:04d}.pdf") for n in range(len(chunks))]
+        if len(chunks) == 1:
+            # Kleiner Satz: Pool-Start lohnt nicht
+            render_chunk(chunks[0], paths[0])
+        else:
+            with process_pool(min(processes or default_processes(), len(chunks))) as pool:
+                list(pool.map(render_chunk, chunks, paths))
+        concat_pdf_files(paths, target)
+    return len(pks)
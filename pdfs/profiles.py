@@ -0,0 +1,43 @@
+# pdfs/profiles.py
+"""
+PDF-Ausgabeprofile: benannte Optionssätze für WeasyPrints write_pdf (siehe PDF_PROFILES).
+
+Das Profil gehört zum Cache-Schlüssel (`signature()`), damit z. B. das kompakte Mail-PDF
+und das Standard-PDF desselben Berichts getrennt gecacht werden – und eine geänderte
+Profil-Einstellung keine alten Treffer mehr liefert.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+STANDARD = "standard"
+
+
+def _profiles() -> dict:
+    return getattr(settings, "PDF_PROFILES", None) or {STANDARD: {}}
+
+
+def names() -> list[str]:
+    return list(_profiles())
+
+
+def resolve(name: str | None = None) -> str:
+    return name or getattr(settings, "PDF_PROFILE_DEFAULT", STANDARD)
+
+
+def options(name: str | None = None) -> dict:
+    name = resolve(name)
+    try:
+        return dict(_profiles()[name])
+    except KeyError:
+        raise ImproperlyConfigured(f"PDF-Profil '{name}' ist nicht in PDF_PROFILES definiert.") from None
+
+
+def signature(name: str | None = None) -> str:
+    name = resolve(name)
+    return json.dumps({"profil": name, **options(name)}, sort_keys=True)
+
+
+def mail_profile() -> str:
+    return getattr(settings, "PDF_MAIL_PROFILE", None) or resolve()
@@ -64,6 +64,52 @@ RestartSec=3
 WantedBy=multi-user.target
 UNIT
 
+# Hintergrund-Worker (PDF rendern + Mail nach Neuanlage)
+WORKER_FILE=/etc/systemd/system/eidiv-worker.service
+sudo tee "$WORKER_FILE" >/dev/null <<'UNIT'
+[Unit]
+Description=EiDiV Auftrag-Worker
+After=network.target
+Wants=network-online.target
+
+[Service]
+User=daniel
+Group=www-data
+WorkingDirectory=/home/daniel/eidiv
+EnvironmentFile=/home/daniel/eidiv/.env
+ExecStart=/home/daniel/eidiv/env/bin/python manage.py auftrag_worker
+Restart=always
+RestartSec=5
+
+[Install]
+WantedBy=multi-user.target
+UNIT
+
+# Mail-Worker (Postausgang mit Wiederholungen)
+MAIL_WORKER_FILE=/etc/systemd/system/eidiv-mail.service
+sudo tee "$MAIL_WORKER_FILE" >/dev/null <<'UNIT'
+[Unit]
+Description=EiDiV Mail-Worker
+After=network.target
+Wants=network-online.target
+
+[Service]
+User=daniel
+Group=www-data
+WorkingDirectory=/home/daniel/eidiv
+EnvironmentFile=/home/daniel/eidiv/.env
+ExecStart=/home/daniel/eidiv/env/bin/python manage.py mail_worker
+Restart=always
+RestartSec=5
+
+[Install]
+WantedBy=multi-user.target
+UNIT
+
 sudo systemctl daemon-reload
 sudo systemctl enable --now eidiv
+sudo systemctl enable --now eidiv-worker
+sudo systemctl enable --now eidiv-mail
 sudo systemctl status eidiv --no-pager
+sudo systemctl status eidiv-worker --no-pager
+sudo systemctl status eidiv-mail --no-pager
@@ -33,12 +33,17 @@ fi
 
 echo "[4/6] Django migrate/collectstatic"
 $PY manage.py migrate --noinput
+$PY manage.py rebuild_stats
 $PY manage.py collectstatic --noinput
 
 echo "[5/6] Service restart"
 sudo systemctl restart eidiv
+sudo systemctl restart eidiv-worker || true
+sudo systemctl restart eidiv-mail || true
 sleep 2
 sudo systemctl status eidiv --no-pager || true
+sudo systemctl status eidiv-worker --no-pager || true
+sudo systemctl status eidiv-mail --no-pager || true
 
 echo "[6/6] Fertig. Vorheriger Stand war: $CURRENT_REF"
 echo "Rollback: git checkout $CURRENT_REF && pip install -r requirements.txt && systemctl restart eidiv && DB-Backup zurückspielen (falls nötig)."